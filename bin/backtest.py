@@ -27,12 +27,19 @@ usage: backtest.py <manifest> <sector-map> <feedStart> <tradeStart> <tradeEnd>
         -t <model>  : model type ('breakout', 'macross', 'rsireversal', 
                                   'split7s', 'connorsrsi', default = 'breakout')
         -g          : no compounding of equity        
+        -w <number> : number of worker processes used to load the datafiles
+                      (default = 1, i.e. no worker processes)
         --tssb <name>: write out two files for tssb consumption - <name>_long.csv
                       and <name>_short.csv containing long and short trades
                       respectively.
-        --dump <symbol>: write a <symbol>.csv for the specified symbol that 
-                      contains the full data feed included indicators calculated
-                      by the strategy.
+        --dump <symbols>: write a <symbol>.csv for each of the specified 
+                      symbols (comma separated, or 'all' for every symbol in
+                      the sector map) that contains the full data feed 
+                      included indicators calculated by the strategy.
+        --npz       : with --dump, also write a <symbol>.npz for each symbol
+                      holding the same columns in numpy's binary format.
+        --indcache <dir>: keep computed indicator series in <dir> so that 
+                      later runs over the same data can reuse them.
         
     manifest   : file containing information on tradable instruments.  The file
                  is CSV format - see hedgeit.feeds.db for information
@@ -57,7 +64,7 @@ def parseParmString(str_):
 
 def main(argv=None):
     try:
-        opts, args = getopt.getopt(sys.argv[1:], "hc:p:t:g", ["tssb=","dump="])
+        opts, args = getopt.getopt(sys.argv[1:], "hc:p:t:gw:", ["tssb=","dump=","npz","indcache="])
     except getopt.GetoptError as err:
         # print help information and exit:
         print str(err) # will print something like "option -a not recognized"
@@ -70,6 +77,9 @@ def main(argv=None):
     tssb = None
     parms = None
     dump = None
+    npz = False
+    workers = 1
+    indcachedir = None
     for o, a in opts:
         if o == "-c":
             cash = float(a)
@@ -83,12 +93,19 @@ def main(argv=None):
         elif o == "-g":
             compounding = False
             Log.info('Compounding disabled')
+        elif o == "-w":
+            workers = int(a)
         elif o == "--tssb":
             tssb = a
             Log.info('Writing tssb files with base %s' % tssb)
         elif o == "--dump":
             dump = a
-            Log.info('Will output data feed to %s.csv' % dump)
+            Log.info('Will output data feeds for %s' % dump)
+        elif o == "--npz":
+            npz = True
+        elif o == "--indcache":
+            indcachedir = a
+            Log.info('Using indicator cache in %s' % indcachedir)
         else:
             usage()
             return
@@ -121,11 +138,13 @@ def main(argv=None):
                       equityFile = elog, 
                       returnsFile = rlog,
                       summaryFile = slog,
-                      parms = parms
+                      parms = parms,
+                      workers = workers,
+                      indcachedir = indcachedir
                       )
     ctrl.run(feedStart, tradeStart, tradeEnd)
     if dump:
-        ctrl.dumpFeed(dump)
+        ctrl.dumpFeeds(None if dump == 'all' else dump.split(','), npz=npz)
         
     tlog = 'trades.csv'
     ctrl.writeAllTrades(tlog)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+'''
+Created on Oct 18, 2026
+
+@author: rtw
+'''
+import sys
+import getopt
+import time
+import datetime
+import copy
+from hedgeit.broker.orders import Order
+from hedgeit.broker.brokers import BacktestingBroker, logger
+from hedgeit.broker.fillstrategy import DefaultStrategy
+from hedgeit.feeds.multifeed import MultiFeed
+from hedgeit.feeds.bar import Bar
+from hedgeit.feeds.bars import Bars
+
+def usage():
+    print '''
+usage: benchbroker.py [options]
+
+    Times BacktestingBroker.onBars against the previous list based order
+    handling as the number of markets grows, filling the stop orders one at
+    a time ('list' and 'book') and all at once ('batch').  Every market
+    holds a GTC trailing stop that is canceled and replaced on each bar, as
+    the trend following strategies do, and some of the stops are hit.  All
+    of the brokers must report the same order updates.
+
+    Options:
+        -h          : show usage
+        -m <list>   : comma separated list of market counts
+                      (default = 10,40,160,640)
+        -n <number> : number of bars (default = 250)
+'''
+
+class ListBroker(BacktestingBroker):
+    '''The active orders handling as previously done by BacktestingBroker.'''
+    def __init__(self, cash, barFeed):
+        BacktestingBroker.__init__(self, cash, barFeed)
+        self._activeOrders = []
+
+    def getActiveOrders(self):
+        return self._activeOrders
+
+    def placeOrder(self, order):
+        logger.debug('Placing: %s' % order)
+        if order.isAccepted():
+            if order not in self._activeOrders:
+                self._activeOrders.append(order)
+            order.setDirty(False)
+        else:
+            raise Exception("The order was already processed")
+
+    def onBars(self, bars):
+        activeOrders = copy.copy(self._activeOrders)
+        for order in activeOrders:
+            if bars.has_symbol(order.getInstrument()):
+                if order.isAccepted():
+                    order.tryExecute(self, bars)
+                    if not order.isAccepted():
+                        self._activeOrders.remove(order)
+                        self.getOrderUpdatedEvent().emit(self, order)
+                else:
+                    self._activeOrders.remove(order)
+                    self.getOrderUpdatedEvent().emit(self, order)
+
+class OneAtATime(DefaultStrategy):
+    batchFills = False
+
+class BookBroker(BacktestingBroker):
+    def __init__(self, cash, barFeed):
+        BacktestingBroker.__init__(self, cash, barFeed)
+        self.setFillStrategy(OneAtATime())
+
+def make_bars(markets, nbars):
+    ret = []
+    for i in range(0, nbars):
+        bars = Bars()
+        dt = datetime.datetime(2013,1,1) + datetime.timedelta(days=i)
+        for m in range(0, markets):
+            price = 100.0 + i * 0.1 + m
+            bars.add_bar('M%04d' % m, Bar(dt, price, price + 1.0, price - 1.0, price))
+        ret.append(bars)
+    return ret
+
+def run(brokerClass, allbars):
+    broker = brokerClass(1000000, MultiFeed())
+    updates = []
+    def onOrderUpdated(broker_, order):
+        price = order.getExecutionInfo().getPrice() if order.isFilled() else None
+        updates.append((order.getInstrument(), order.getState(), price))
+    broker.getOrderUpdatedEvent().subscribe(onOrderUpdated)
+    stops = {}
+    start = time.time()
+    for bars in allbars:
+        broker.onBars(bars)
+        for sym in bars.symbols():
+            if stops.has_key(sym) and stops[sym].isAccepted():
+                broker.cancelOrder(stops[sym])
+            # the stops for some of the markets are close enough to be hit
+            offset = 0.5 + (int(sym[1:]) % 10) * 0.1
+            o = broker.createStopOrder(Order.Action.SELL, sym, bars.get_bar(sym).close() - offset, 1)
+            o.setGoodTillCanceled(True)
+            broker.placeOrder(o)
+            stops[sym] = o
+    return (time.time() - start, updates)
+
+def main(argv=None):
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hm:n:")
+    except getopt.GetoptError as err:
+        print str(err)
+        usage()
+        sys.exit(2)
+
+    markets = [10, 40, 160, 640]
+    nbars = 250
+    for o, a in opts:
+        if o == "-m":
+            markets = [int(m) for m in a.split(',')]
+        elif o == "-n":
+            nbars = int(a)
+        else:
+            usage()
+            return
+
+    print '%-8s %10s %10s %10s %9s' % ('markets', 'list', 'book', 'batch', 'speedup')
+    for m in markets:
+        allbars = make_bars(m, nbars)
+        (listtime, expected) = run(ListBroker, allbars)
+        (booktime, book) = run(BookBroker, allbars)
+        (batchtime, batch) = run(BacktestingBroker, allbars)
+        print '%-8d %9.3fs %9.3fs %9.3fs %8.2fx  %s' % \
+            (m, listtime, booktime, batchtime, listtime / batchtime, 
+             'identical' if expected == book and expected == batch else 'MISMATCH')
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+'''
+Created on Oct 18, 2026
+
+@author: rtw
+'''
+import sys
+import getopt
+import time
+import numpy
+try:
+    import talib
+except ImportError:
+    talib = None
+from hedgeit.feeds.indicators import kernels
+
+def usage():
+    print '''
+usage: benchind.py [options]
+
+    Times the vectorized indicator kernels against the equivalent pure
+    python loops (or, for the multi-period kernels, one talib call per
+    period) on a synthetic random-walk price series and checks that the
+    results agree.  The multi-period kernels are skipped if TA-Lib is not
+    installed.
+
+    Options:
+        -h          : show usage
+        -n <number> : number of bars (default = 6000)
+        -r <number> : repetitions, the best time is reported (default = 5)
+'''
+
+def loop_atr(high, low, close, period):
+    '''ATR as previously computed by hedgeit.feeds.indicators.atr.'''
+    lastclose = None
+    trseries = numpy.zeros(len(close))
+    for i in range(0, len(close)):
+        if lastclose == None:
+            tr = high[i] - low[i]
+        else:
+            tr = max( lastclose, high[i] ) - min( lastclose, low[i] )
+        lastclose = close[i]
+        trseries[i] = tr
+    sum_ = 0.0
+    series = numpy.zeros(len(close))
+    for i in range(0, len(close)):
+        sum_ = sum_ + trseries[i]
+        if i < (period - 1):
+            series[i] = numpy.nan
+        else:
+            series[i] = sum_ / period
+            sum_ -= trseries[i-(period-1)]
+    return series
+
+def loop_cum(base, period):
+    '''CUM as previously computed by hedgeit.feeds.indicators.cum.'''
+    series = numpy.zeros(len(base))
+    cum = 0.0
+    for i in range(0, len(base)):
+        if not numpy.isnan(base[i]):
+            cum += base[i]
+        if i >= period and not numpy.isnan(base[i-period]):
+            cum -= base[i-period]
+        series[i] = cum
+    return series
+
+def loop_pvel(base, period):
+    '''PriceVelocity as previously computed by hedgeit.feeds.indicators.pvelocity.'''
+    series = numpy.zeros(len(base))
+    x = numpy.arange(0,period)
+    A = numpy.vstack([x, numpy.ones(len(x))]).T
+    for i in range(0, len(base)):
+        if i < (period - 1):
+            series[i] = numpy.NAN
+        else:
+            y = base[i-(period-1):i+1]
+            m, c = numpy.linalg.lstsq(A, y)[0]
+            series[i] = m
+    return series
+
+def loop_reduce(func, series, period):
+    ret = numpy.zeros(len(series))
+    for i in range(0, len(series)):
+        if i < period - 1:
+            ret[i] = numpy.nan
+        else:
+            ret[i] = func(series[i-period+1:i+1])
+    return ret
+
+def best(func, reps):
+    ret = None
+    for r in range(0, reps):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        if ret == None or elapsed < ret:
+            ret = elapsed
+    return ret
+
+def main(argv=None):
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hn:r:")
+    except getopt.GetoptError as err:
+        print str(err)
+        usage()
+        sys.exit(2)
+
+    bars = 6000
+    reps = 5
+    for o, a in opts:
+        if o == "-n":
+            bars = int(a)
+        elif o == "-r":
+            reps = int(a)
+        else:
+            usage()
+            return
+
+    numpy.random.seed(42)
+    close = 100.0 + numpy.cumsum(numpy.random.randn(bars))
+    high = close + numpy.random.rand(bars)
+    low = close - numpy.random.rand(bars)
+
+    cases = [
+        ('ATR(100)',
+         lambda: loop_atr(high, low, close, 100),
+         lambda: kernels.sma(kernels.true_range(high, low, close), 100)),
+        ('CUM(2)',
+         lambda: loop_cum(close, 2),
+         lambda: kernels.running_sum(close, 2)),
+        ('CUM(100)',
+         lambda: loop_cum(close, 100),
+         lambda: kernels.running_sum(close, 100)),
+        ('PVEL(10)',
+         lambda: loop_pvel(close, 10),
+         lambda: kernels.rolling_linregress(close, 10)[0]),
+        ('PVEL(100)',
+         lambda: loop_pvel(close, 100),
+         lambda: kernels.rolling_linregress(close, 100)[0]),
+        ('rolling sum(200)',
+         lambda: loop_reduce(numpy.sum, close, 200),
+         lambda: kernels.rolling_sum(close, 200)),
+        ('rolling max(50)',
+         lambda: loop_reduce(numpy.max, close, 50),
+         lambda: kernels.rolling_max(close, 50)),
+        ('rolling min(50)',
+         lambda: loop_reduce(numpy.min, close, 50),
+         lambda: kernels.rolling_min(close, 50)),
+        ]
+    periods = range(10, 210, 10)
+    multis = []
+    if talib != None:
+        multis = [('MAX', talib.MAX, kernels.multi_max),
+                  ('MIN', talib.MIN, kernels.multi_min)]
+    for (name, func, multi) in multis:
+        cases.append(('%s x%d periods' % (name, len(periods)),
+                      lambda func=func: numpy.array([func(close, p) for p in periods]),
+                      lambda multi=multi: multi(close, periods)))
+
+    print '%d bars, best of %d' % (bars, reps)
+    print '  %-18s %10s %10s %9s  %s' % ('', 'loop', 'kernel', 'speedup', 'max abs diff')
+    for (name, loop, kernel) in cases:
+        expected = loop()
+        actual = kernel()
+        mask = ~numpy.isnan(expected)
+        diff = numpy.abs(expected[mask] - actual[mask]).max()
+        tloop = best(loop, reps)
+        tkernel = best(kernel, reps)
+        print '  %-18s %8.2fms %8.3fms %8.0fx  %.2g' % \
+            (name, tloop * 1000, tkernel * 1000, tloop / tkernel, diff)
+
+if __name__ == "__main__":
+    sys.exit(main())
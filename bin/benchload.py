@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+'''
+Created on Oct 18, 2026
+
+@author: rtw
+'''
+import sys
+import getopt
+import glob
+import os
+import time
+import numpy
+from hedgeit.feeds.loader import load_columns
+
+def usage():
+    print '''
+usage: benchload.py [options] <datadir>
+
+    Times a cold (uncached) load of every datafile in <datadir> for a range
+    of worker counts and checks that each result is identical to a
+    sequential load.  Manifest files in <datadir> are skipped.  ex.
+        benchload.py data
+
+    Options:
+        -h            : show usage
+        -w <list>     : comma separated list of worker counts
+                        (default = 1,2,4,8)
+        -r <number>   : repetitions per worker count, the best time is
+                        reported (default = 1)
+        -t            : use threads rather than processes
+'''
+
+def is_manifest(filename):
+    f = open(filename)
+    try:
+        return 'datafile' in f.readline().strip().split(',')
+    finally:
+        f.close()
+
+def same(a, b):
+    for i in range(0, len(a)):
+        if (a[i] == None) != (b[i] == None):
+            return False
+        if a[i] != None:
+            for name in a[i]:
+                if not numpy.array_equal(a[i][name], b[i][name]):
+                    return False
+    return True
+
+def main(argv=None):
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hw:r:t")
+    except getopt.GetoptError as err:
+        print str(err)
+        usage()
+        sys.exit(2)
+
+    workers = [1, 2, 4, 8]
+    reps = 1
+    processes = True
+    for o, a in opts:
+        if o == "-w":
+            workers = [int(w) for w in a.split(',')]
+        elif o == "-r":
+            reps = int(a)
+        elif o == "-t":
+            processes = False
+        else:
+            usage()
+            return
+
+    if len(args) != 1:
+        usage()
+        sys.exit(1)
+
+    datafiles = [f for f in sorted(glob.glob(os.path.join(args[0], '*.csv'))) if not is_manifest(f)]
+    print 'Loading %d datafiles from %s using %s' % \
+        (len(datafiles), args[0], 'processes' if processes else 'threads')
+
+    reference = None
+    base = None
+    for w in workers:
+        best = None
+        for r in range(0, reps):
+            start = time.time()
+            cols = load_columns(datafiles, workers=w, processes=processes)
+            elapsed = time.time() - start
+            if best == None or elapsed < best:
+                best = elapsed
+        if reference == None:
+            reference = load_columns(datafiles, workers=1)
+            base = best
+        print '  workers=%-3d %7.2fs  speedup %5.2fx  %s' % \
+            (w, best, base / best, 'identical' if same(reference, cols) else 'MISMATCH')
+
+if __name__ == "__main__":
+    sys.exit(main())
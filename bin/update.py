@@ -278,7 +278,8 @@ usage: update.py [-cmd:]
                           equityFile = elog, 
                           returnsFile = rlog,
                           summaryFile = slog,
-                          parms = parms
+                          parms = parms,
+                          indcachedir = os.path.join(os.path.dirname(manifest), 'cache', 'indicators')
                           )
         
         ctrl.run(feedStart, tradeStart, tradeEnd)
@@ -52,7 +52,7 @@ class Broker(object):
         raise NotImplementedError()
 
     def getActiveOrders(self):
-        """Returns a sequence with the orders that are still active."""
+        """Returns a new list with the orders that are still active, in the order they were placed (or last modified with modifyOrder).  Changing the list does not change the broker's orders - use cancelOrder or modifyOrder for that."""
         raise NotImplementedError()
 
     # Return True if there are not more events to dispatch.
@@ -159,3 +159,20 @@ class Broker(object):
         :type order: :class:`Order`.
         """
         raise NotImplementedError()
+
+    def modifyOrder(self, order, stopPrice = None, limitPrice = None, goodTillCanceled = None):
+        """Updates the prices of an active order in place, rather than canceling it and placing a new one.
+
+        :param order: The order to modify.
+        :type order: :class:`Order`.
+        :param stopPrice: The new trigger price, or None to leave it. Only for stop and stop-limit orders.
+        :type stopPrice: float
+        :param limitPrice: The new limit price, or None to leave it. Only for limit and stop-limit orders.
+        :type limitPrice: float
+        :param goodTillCanceled: True if the order is good till canceled, or None to leave it.
+        :type goodTillCanceled: boolean
+
+        .. note::
+            If the order is not active, or does not have the price, an exception will be raised.
+        """
+        raise NotImplementedError()
@@ -22,14 +22,17 @@ from fillstrategy import *
 import orders
 from hedgeit.common.logger import getLogger
 from hedgeit.feeds.db import InstrumentDb
-import copy
+import collections
+import numpy
 
 logger = getLogger("broker.backtesting")
 ######################################################################
 ## These are backtest-specific orders derived from the base classes
 ## in the orders module.
 
-class BacktestingOrder:
+class BacktestingOrder(object):
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -55,6 +58,8 @@ class BacktestingOrder:
             self.checkCanceled(broker, bars)
 
 class MarketOrder(orders.MarketOrder, BacktestingOrder):
+    __slots__ = ()
+
     def __init__(self, action, instrument, quantity, onClose):
         orders.MarketOrder.__init__(self, action, instrument, quantity, onClose)
         BacktestingOrder.__init__(self)
@@ -65,6 +70,8 @@ class MarketOrder(orders.MarketOrder, BacktestingOrder):
             broker_.commitOrderExecution(self, price, self.getQuantity(), bar_.datetime())
 
 class LimitOrder(orders.LimitOrder, BacktestingOrder):
+    __slots__ = ()
+
     def __init__(self, action, instrument, limitPrice, quantity):
         orders.LimitOrder.__init__(self, action, instrument, limitPrice, quantity)
         BacktestingOrder.__init__(self)
@@ -75,6 +82,8 @@ class LimitOrder(orders.LimitOrder, BacktestingOrder):
             broker_.commitOrderExecution(self, price, self.getQuantity(), bar_.datetime())
 
 class StopOrder(orders.StopOrder, BacktestingOrder):
+    __slots__ = ()
+
     def __init__(self, action, instrument, stopPrice, quantity):
         orders.StopOrder.__init__(self, action, instrument, stopPrice, quantity)
         BacktestingOrder.__init__(self)
@@ -87,6 +96,8 @@ class StopOrder(orders.StopOrder, BacktestingOrder):
 # http://www.sec.gov/answers/stoplim.htm
 # http://www.interactivebrokers.com/en/trading/orders/stopLimit.php
 class StopLimitOrder(orders.StopLimitOrder, BacktestingOrder):
+    __slots__ = ()
+
     def __init__(self, action, instrument, limitPrice, stopPrice, quantity):
         orders.StopLimitOrder.__init__(self, action, instrument, limitPrice, stopPrice, quantity)
         BacktestingOrder.__init__(self)
@@ -124,6 +135,15 @@ class StopLimitOrder(orders.StopLimitOrder, BacktestingOrder):
                 broker_.commitOrderExecution(self, price, self.getQuantity(), bar_.datetime())
 
 
+_RESTING_TYPES = (orders.Order.Type.LIMIT, orders.Order.Type.STOP)
+
+def _triggerPrice(order):
+    if order.getType() == orders.Order.Type.STOP:
+        return order.getStopPrice()
+    elif order.getType() == orders.Order.Type.LIMIT:
+        return order.getLimitPrice()
+    return None
+
 class BacktestingBroker(broker.Broker):
     '''
     Backtesting broker.
@@ -148,7 +168,14 @@ class BacktestingBroker(broker.Broker):
         else:
             self.__commission = commission
         self.__shares = {}
-        self.__activeOrders = []
+        # active orders by instrument, each a dict of order to the sequence
+        # number it was placed with, so that orders are added and removed in
+        # O(1) and can still be processed in the order they were placed.
+        # All of the active orders are also kept in the order they were 
+        # placed (or last modified) for getActiveOrders.
+        self.__orderBook = {}
+        self.__activeOrders = collections.OrderedDict()
+        self.__orderSeq = 0
         self.__useAdjustedValues = False
         self.__fillStrategy = DefaultStrategy()
 
@@ -197,7 +224,12 @@ class BacktestingBroker(broker.Broker):
         self.__useAdjustedValues = useAdjusted
 
     def getActiveOrders(self):
-        return self.__activeOrders
+        return self.__activeOrders.keys()
+
+    def getActiveOrdersFor(self, instrument):
+        '''Returns the orders for instrument that are still active.'''
+        book = self.__orderBook.get(instrument, {})
+        return [order for (seq, order) in sorted([(seq, order) for (order, seq) in book.iteritems()])]
 
     def getShares(self, instrument):
         self.__shares.setdefault(instrument, 0)
@@ -261,25 +293,77 @@ class BacktestingBroker(broker.Broker):
     def placeOrder(self, order):
         logger.debug('Placing: %s' % order)
         if order.isAccepted():
-            if order not in self.__activeOrders:
-                self.__activeOrders.append(order)
+            book = self.__orderBook.setdefault(order.getInstrument(), {})
+            if not book.has_key(order):
+                self.__orderSeq += 1
+                book[order] = self.__orderSeq
+                self.__activeOrders[order] = self.__orderSeq
             order.setDirty(False)
         else:
             raise Exception("The order was already processed")
 
-    def onBars(self, bars):
-        activeOrders = copy.copy(self.__activeOrders)
+    def __fillRestingOrders(self, activeOrders, bars):
+        '''
+        Returns a dict of each accepted limit and stop order to a tuple of 
+        its price, fill price (or None) and bar, priced all at once by the
+        fill strategy.  Empty unless the fill strategy sets batchFills.
+        '''
+        if not self.__fillStrategy.batchFills:
+            return {}
+        resting = []
+        restingBars = []
+        for (seq, order) in activeOrders:
+            if order.getType() in _RESTING_TYPES and order.isAccepted():
+                resting.append(order)
+                restingBars.append(bars.get_bar(order.getInstrument()))
+        if len(resting) == 0:
+            return {}
+        prices = self.__fillStrategy.fillRestingOrders(resting, self, restingBars)
+        if prices == None:
+            return {}
+        ret = {}
+        for i in xrange(0, len(resting)):
+            ret[resting[i]] = (_triggerPrice(resting[i]), prices[i], restingBars[i])
+        return ret
 
-        for order in activeOrders:
-            if order.getInstrument() in bars.symbols():
-                if order.isAccepted():
-                    order.tryExecute(self, bars)
-                    if not order.isAccepted():
-                        self.__activeOrders.remove(order)
-                        self.getOrderUpdatedEvent().emit(self, order)
+    def onBars(self, bars):
+        # only the orders for instruments with a bar are visited, in the 
+        # order they were placed.  Orders placed while processing are left
+        # for the next bars.
+        activeOrders = []
+        for instrument in bars.symbols():
+            book = self.__orderBook.get(instrument)
+            if book != None:
+                activeOrders.extend([(seq, order) for (order, seq) in book.iteritems()])
+        activeOrders.sort()
+        fills = self.__fillRestingOrders(activeOrders, bars)
+
+        for (seq, order) in activeOrders:
+            if order.isAccepted():
+                fill = fills.get(order)
+                if fill != None and fill[0] == _triggerPrice(order):
+                    # as tryExecute, with the fill price calculated up front
+                    (trigger, price, bar_) = fill
+                    if price != None:
+                        self.commitOrderExecution(order, price, order.getQuantity(), bar_.datetime())
+                    order.checkCanceled(self, bars)
                 else:
-                    self.__activeOrders.remove(order)
+                    # not a resting order, or modified since it was priced
+                    order.tryExecute(self, bars)
+                if not order.isAccepted():
+                    self.__removeOrder(order)
                     self.getOrderUpdatedEvent().emit(self, order)
+            else:
+                self.__removeOrder(order)
+                self.getOrderUpdatedEvent().emit(self, order)
+
+    def __removeOrder(self, order):
+        '''Removes order from its book, and the book once it is empty.'''
+        book = self.__orderBook[order.getInstrument()]
+        del book[order]
+        del self.__activeOrders[order]
+        if not book:
+            del self.__orderBook[order.getInstrument()]
                 
     def executeSessionClose(self):
         '''
@@ -291,7 +375,7 @@ class BacktestingBroker(broker.Broker):
         Note that it is the responsibility of the strategy to ensure that only
         Market orders that should be executed are currently active/accepted
         '''
-        for order in self.__activeOrders:
+        for order in self.getActiveOrders():
             if order.getType() == order.Type.MARKET:
                 order.setFillOnClose(True)
         self.onBars(self.__barFeed.get_current_bars())
@@ -313,6 +397,30 @@ class BacktestingBroker(broker.Broker):
             raise Exception("Can't cancel order that has already been filled")
         order.setState(orders.Order.State.CANCELED)
 
+    def modifyOrder(self, order, stopPrice = None, limitPrice = None, goodTillCanceled = None):
+        logger.debug('Modifying: %s stop:%s limit:%s gtc:%s' % (order, stopPrice, limitPrice, goodTillCanceled))
+        if not order.isAccepted():
+            raise Exception("Can't modify order that is no longer active")
+        if stopPrice != None:
+            if order.getType() not in [orders.Order.Type.STOP, orders.Order.Type.STOP_LIMIT]:
+                raise Exception("Can't set the stop price of a %s order" % orders.Order.Type.type_strs[order.getType()])
+            order.setStopPrice(stopPrice)
+        if limitPrice != None:
+            if order.getType() not in [orders.Order.Type.LIMIT, orders.Order.Type.STOP_LIMIT]:
+                raise Exception("Can't set the limit price of a %s order" % orders.Order.Type.type_strs[order.getType()])
+            order.setLimitPrice(limitPrice)
+        if goodTillCanceled != None:
+            order.setGoodTillCanceled(goodTillCanceled)
+        # the modified order is processed where a replacement placed now 
+        # would have been
+        book = self.__orderBook.get(order.getInstrument(), {})
+        if book.has_key(order):
+            self.__orderSeq += 1
+            book[order] = self.__orderSeq
+            del self.__activeOrders[order]
+            self.__activeOrders[order] = self.__orderSeq
+        order.setDirty(False)
+
     def getBarOpen(self, bar_):
         return bar_.open()
     
@@ -333,24 +441,98 @@ class BacktestingBroker(broker.Broker):
     def getBarClose(self, bar_):
         return bar_.close()
 
+def _sum_in_order(start, terms):
+    '''
+    Returns start + terms[0] + terms[1] + ... added in that order, as a loop
+    would (numpy.sum adds in a different order and may differ in the last 
+    bit).
+    '''
+    return numpy.cumsum(numpy.concatenate(([start], terms)))[-1]
+
+def _cents(amount):
+    '''Returns a dollar amount as a whole number of cents.'''
+    return int(round(amount * 100))
+
 class BacktestingFuturesBroker(BacktestingBroker):
     '''
     Backtesting broker for futures trades
+    
+    The positions, settlement prices and point values are kept in parallel
+    numpy arrays with a slot for each instrument that has been traded, so 
+    the daily mark-to-market is one expression over the open positions.  
+    Sums are accumulated in the order that getPositions() iterates, so the
+    cash is exactly what adding up each position in turn gives.
+
+    The maintenance margin is kept as a running total, in all and for each
+    sector, that is adjusted whenever an order execution changes a
+    position.  The margin check and the margin reports don't have to add
+    up the open positions again.  The totals are integer cents, so they are
+    exact whatever order the positions change in (a margin that isn't a
+    whole number of cents is rounded to one).
     '''
     
-    def __init__(self, cash, barFeed, commission = None):
+    def __init__(self, cash, barFeed, commission = None, sectors = None):
         '''
         Constructor.
         
         :param number cash: The initial amount of cash.
         :param MultiFeed barFeed: The bar feed that will provide the bars.
         :param Commission commission: An object responsible for calculating order commissions.
+        :param dict sectors: Maps a sector name to the list of symbols in it, 
+                             for the sector margins.  Symbols that aren't 
+                             listed are in the sector of the instrument.
         
         :raises: AssertionError if cash is a negative number
         '''
         BacktestingBroker.__init__(self, cash, barFeed, commission)
-        self._last_marktomarket = {}
         self._db = InstrumentDb.Instance()
+        self._slots = {}
+        self._symbols = []
+        self._shares = numpy.zeros(0)
+        self._settlement = numpy.zeros(0)
+        self._pointValue = numpy.zeros(0)
+        self._sectorOf = {}
+        if sectors != None:
+            for sec in sectors:
+                for sym in sectors[sec]:
+                    self._sectorOf[sym] = sec
+        self._slotSectors = []
+        # maintenance margins in cents: per contract and per position for
+        # each slot, and the totals
+        self._maintCents = []
+        self._positionCents = []
+        self._marginCents = 0
+        self._sectorCents = {}
+        # slots of the positions in the order getPositions() iterates them,
+        # which only changes when a position is added
+        self._order = numpy.zeros(0, dtype=int)
+        self._orderLen = 0
+
+    def _slot(self, instrument):
+        '''Returns the array slot for instrument, adding one if needed.'''
+        ret = self._slots.get(instrument)
+        if ret == None:
+            inst = self._db.get(instrument)
+            ret = len(self._symbols)
+            self._slots[instrument] = ret
+            self._symbols.append(instrument)
+            self._shares = numpy.append(self._shares, 0.0)
+            self._settlement = numpy.append(self._settlement, numpy.nan)
+            self._pointValue = numpy.append(self._pointValue, inst.point_value())
+            self._maintCents.append(_cents(inst.maint_margin()))
+            self._positionCents.append(0)
+            sector = self._sectorOf.get(instrument, inst.sector())
+            self._slotSectors.append(sector)
+            self._sectorCents.setdefault(sector, 0)
+        return ret
+
+    def _position_slots(self):
+        '''Returns the slots of the positions in the order of getPositions().'''
+        positions = self.getPositions()
+        if len(positions) != self._orderLen:
+            self._order = numpy.array([self._slot(sym) for sym in positions.iterkeys()], dtype=int)
+            self._orderLen = len(positions)
+        return self._order
 
     def calc_margin(self, instrument=None, quantity=0):
         '''
@@ -361,10 +543,8 @@ class BacktestingFuturesBroker(BacktestingBroker):
         
         :returns number:margin requirement
         '''
-        ret = 0.0;
         # first we need to consider maintenance margin on all current positions
-        for instrument, shares in self.getPositions().iteritems():
-            ret += self._db.get(instrument).maint_margin() * abs(shares)
+        ret = self._marginCents / 100.0
             
         # now, check for initial margin against this new position
         if instrument != None:
@@ -372,6 +552,34 @@ class BacktestingFuturesBroker(BacktestingBroker):
 
         return ret
         
+    def get_symbol_margin(self, instrument):
+        '''
+        Returns the maintenance margin of the position in instrument, 0 if 
+        there is none.
+        '''
+        slot = self._slots.get(instrument)
+        if slot == None:
+            return 0.0
+        return self._positionCents[slot] / 100.0
+
+    def get_sector_margin(self, sector):
+        '''Returns the maintenance margin of the positions in sector.'''
+        return self._sectorCents.get(sector, 0) / 100.0
+
+    def get_sector_margins(self):
+        '''Returns a dict of the maintenance margin for each sector traded.'''
+        return dict([(sec, cents / 100.0) for (sec, cents) in self._sectorCents.iteritems()])
+
+    def _update_margin(self, slot, shares):
+        '''Adjusts the running margin totals for a position change.'''
+        self._shares[slot] = shares
+        cents = int(round(self._maintCents[slot] * abs(shares)))
+        change = cents - self._positionCents[slot]
+        if change != 0:
+            self._positionCents[slot] = cents
+            self._marginCents += change
+            self._sectorCents[self._slotSectors[slot]] += change
+
     def margin_check(self, instrument=None, quantity=0):
         '''
         Performs a margin check.  It is assumed that the current cash position in 
@@ -396,21 +604,33 @@ class BacktestingFuturesBroker(BacktestingBroker):
         price which may or may not be technically accurate, but nevertheless
         all that we have.
         '''
-        cash = self.getCash()
-        for instrument, shares in self.getPositions().iteritems():
-            if instrument in bars.symbols():
-                close = self.getBarClose(self.getBar(bars, instrument))            
-                delta = (close - self._last_marktomarket[instrument]) * self._db.get(instrument).point_value() 
-                self._last_marktomarket[instrument] = close
-                cash += delta * shares            
-        self.setCash(cash)
+        slots = self._position_slots()
+        marked = []
+        closes = []
+        for slot in slots[self._shares[slots] != 0]:
+            instrument = self._symbols[slot]
+            if bars.has_symbol(instrument):
+                marked.append(slot)
+                closes.append(self.getBarClose(bars.get_bar(instrument)))
+        if len(marked) == 0:
+            return
+        closes = numpy.array(closes, dtype=float)
+        delta = (closes - self._settlement[marked]) * self._pointValue[marked]
+        self._settlement[marked] = closes
+        self.setCash(_sum_in_order(self.getCash(), delta * self._shares[marked]))
     
     def get_last_mark_to_market(self):
-        return self._last_marktomarket
+        '''
+        Returns a dict of the settlement price for each instrument that has
+        been traded.  Only the open positions are marked to market each bar,
+        a closed position keeps the price it was closed at.
+        '''
+        return dict([(self._symbols[i], self._settlement[i]) for i in range(0, len(self._symbols))])
     
     # Tries to commit an order execution. Returns True if the order was commited, or False is there is not enough cash.
     def commitOrderExecution(self, order, price, quantity, dateTime):
         instrument = order.getInstrument()
+        slot = self._slot(instrument)
         # first determine if we need a margin check and execute one        
         if order.getAction() in [orders.Order.Action.BUY, orders.Order.Action.SELL_SHORT]:
             if not self.margin_check(instrument, quantity):
@@ -425,12 +645,12 @@ class BacktestingFuturesBroker(BacktestingBroker):
 
         if order.getAction() in [orders.Order.Action.SELL, orders.Order.Action.BUY_TO_COVER]:
             # we are closing a position and need to update the account equity
-            delta = (price - self._last_marktomarket[instrument]) * self._db.get(instrument).point_value() 
+            delta = (price - self._settlement[slot]) * self._pointValue[slot]
             self.setCash(self.getCash() - delta * sharesDelta)
 
              
         # initialize the marktomarket reference as our order price
-        self._last_marktomarket[instrument] = price
+        self._settlement[slot] = price
         
         commission = self.getCommission().calculate(order, price, quantity)
         resultingCash = self.getCash() - commission
@@ -442,6 +662,7 @@ class BacktestingFuturesBroker(BacktestingBroker):
         # Commit the order execution.
         self.setCash(resultingCash)
         self.getPositions()[instrument] = self.getShares(instrument) + sharesDelta
+        self._update_margin(slot, self.getPositions()[instrument])
 
         # Update the order.
         orderExecutionInfo = orders.OrderExecutionInfo(price, quantity, commission, dateTime)
@@ -16,9 +16,20 @@
 ######################################################################
 ## Order filling strategies
 from orders import Order
+import numpy
+
+_BUY_ACTIONS = (Order.Action.BUY, Order.Action.BUY_TO_COVER)
+_SELL_ACTIONS = (Order.Action.SELL, Order.Action.SELL_SHORT)
 
 class FillStrategy:
-    """Base class for order filling strategies."""
+    """Base class for order filling strategies.
+
+    Limit and stop orders are filled one at a time with fillLimitOrder and fillStopOrder unless batchFills is True,
+    in which case the broker fills them all with one call to fillRestingOrders per bar.
+    """
+
+    # True if fillRestingOrders fills limit and stop orders exactly as fillLimitOrder and fillStopOrder would.
+    batchFills = False
 
     # Return the fill price for a MarketOrder or None.
     def fillMarketOrder(self, order, broker_, bar):
@@ -78,6 +89,20 @@ class FillStrategy:
         """
         raise NotImplementedError()
 
+    # Return the fill prices for a list of LimitOrders and StopOrders, or None.
+    def fillRestingOrders(self, orders_, broker_, bars):
+        """Override, along with setting batchFills, to return the fill prices for a batch of limit and stop orders at once, rather than have fillLimitOrder and fillStopOrder called for each order.
+
+        :param orders_: The orders.
+        :type orders_: list of :class:`pyalgotrade.broker.LimitOrder` and :class:`pyalgotrade.broker.StopOrder`.
+        :param broker_: The broker.
+        :type broker_: :class:`Broker`.
+        :param bars: The current bar for each order.
+        :type bars: list of :class:`pyalgotrade.bar.Bar`.
+        :rtype: A list with the fill price or None for each order, or None if the orders should be filled one at a time.
+        """
+        return None
+
 class DefaultStrategy(FillStrategy):
     """
     This strategy works as follows:
@@ -98,8 +123,12 @@ class DefaultStrategy(FillStrategy):
             * If the limit order was activated at a previous bar then the limit fill price (as described earlier) is used.
 
     .. note::
-        This is the default strategy used by the Broker.
+        This is the default strategy used by the Broker.  Limit and stop orders are filled in one batch per bar
+        (see batchFills), so a subclass that overrides fillLimitOrder or fillStopOrder must set batchFills to False
+        to have them called.
     """
+    batchFills = True
+
     def __getLimitOrderFillPrice(self, broker_, bar_, action, limitPrice):
         ret = None
         open_ = broker_.getBarOpen(bar_)
@@ -173,6 +202,59 @@ class DefaultStrategy(FillStrategy):
             assert(False)
         return ret
 
+    # Return the fill prices for a list of LimitOrders and StopOrders.
+    def fillRestingOrders(self, orders_, broker_, bars):
+        # The same rules as fillLimitOrder and fillStopOrder, evaluated for
+        # all of the orders at once.  Buy limits and sell stops are negated,
+        # along with the bar, so that every order fills at or above its price
+        # and the one set of comparisons applies to all of them.
+        prices = []
+        negate = []
+        opens = []
+        highs = []
+        lows = []
+        getOpen = broker_.getBarOpen
+        getHigh = broker_.getBarHigh
+        getLow = broker_.getBarLow
+        # the orders for an instrument share its bar, which is only read once
+        ohlc = {}
+        for (order, bar_) in zip(orders_, bars):
+            action = order.getAction()
+            if order.getType() == Order.Type.STOP:
+                prices.append(order.getStopPrice())
+                negate.append(action in _SELL_ACTIONS)
+            else:
+                prices.append(order.getLimitPrice())
+                negate.append(action in _BUY_ACTIONS)
+            assert(action in _BUY_ACTIONS or action in _SELL_ACTIONS)
+            values = ohlc.get(id(bar_))
+            if values == None:
+                values = (getOpen(bar_), getHigh(bar_), getLow(bar_))
+                ohlc[id(bar_)] = values
+            opens.append(values[0])
+            highs.append(values[1])
+            lows.append(values[2])
+
+        negate = numpy.array(negate, dtype=bool)
+        sign = numpy.where(negate, -1.0, 1.0)
+        price = sign * numpy.array(prices, dtype=float)
+        open_ = sign * numpy.array(opens, dtype=float)
+        high = numpy.array(highs, dtype=float)
+        low = numpy.array(lows, dtype=float)
+        (low, high) = (numpy.where(negate, -high, low), numpy.where(negate, -low, high))
+
+        # the bar is beyond the price, or it includes the price and the
+        # price was penetrated on open
+        gapped = low > price
+        inrange = ~gapped & (price <= high)
+        penetrated = open_ > price
+        ret = [None] * len(prices)
+        for i in numpy.flatnonzero(gapped | (inrange & penetrated)):
+            ret[i] = opens[i]
+        for i in numpy.flatnonzero(inrange & ~penetrated):
+            ret[i] = prices[i]
+        return ret
+
     # Return the fill price for a StopLimitOrder or None.
     def fillStopLimitOrder(self, order, broker_, bar, justHitStopPrice):
         ret = self.__getLimitOrderFillPrice(broker_, bar, order.getAction(), order.getLimitPrice())
@@ -19,7 +19,7 @@
 ## http://stocks.about.com/od/tradingbasics/a/markords.htm
 ## http://www.interactivebrokers.com/en/software/tws/usersguidebook/ordertypes/basic_order_types.htm
 
-class Order:
+class Order(object):
     """Base class for orders. 
 
     :param type_: The order type
@@ -41,6 +41,10 @@ class Order:
          * Order.Action.SELL_SHORT
 
         This is a base class and should not be used directly.
+
+        Orders (and OrderExecutionInfo) use __slots__ since a long backtest
+        creates a great many of them.  Subclasses should declare __slots__
+        as well.
     """
 
     class Action:
@@ -83,6 +87,9 @@ class Order:
             'STOP_LIMIT'
             ]
     
+    __slots__ = ('__type', '__action', '__instrument', '__quantity', '__executionInfo',
+                 '__goodTillCanceled', '__allOrNone', '__state', '__dirty')
+
     def __init__(self, type_, action, instrument, quantity):
         self.__type = type_
         self.__action = action
@@ -215,6 +222,8 @@ class MarketOrder(Order):
         This is a base class and should not be used directly.
     """
 
+    __slots__ = ('__onClose',)
+
     def __init__(self, action, instrument, quantity, onClose):
         Order.__init__(self, Order.Type.MARKET, action, instrument, quantity)
         self.__onClose = onClose
@@ -241,6 +250,8 @@ class LimitOrder(Order):
         This is a base class and should not be used directly.
     """
 
+    __slots__ = ('__limitPrice',)
+
     def __init__(self, action, instrument, limitPrice, quantity):
         Order.__init__(self, Order.Type.LIMIT, action, instrument, quantity)
         self.__limitPrice = limitPrice
@@ -267,6 +278,8 @@ class StopOrder(Order):
         This is a base class and should not be used directly.
     """
 
+    __slots__ = ('__stopPrice',)
+
     def __init__(self, action, instrument, stopPrice, quantity):
         Order.__init__(self, Order.Type.STOP, action, instrument, quantity)
         self.__stopPrice = stopPrice
@@ -293,6 +306,8 @@ class StopLimitOrder(Order):
         This is a base class and should not be used directly.
     """
 
+    __slots__ = ('__limitPrice', '__stopPrice', '__limitOrderActive')
+
     def __init__(self, action, instrument, limitPrice, stopPrice, quantity):
         Order.__init__(self, Order.Type.STOP_LIMIT, action, instrument, quantity)
         self.__limitPrice = limitPrice
@@ -329,8 +344,10 @@ class StopLimitOrder(Order):
         str_ = str_[:-1] + ',stop:%0.3f,limit:%0.3f' % (self.__stopPrice,self.__limitPrice) + ')'
         return str_
 
-class OrderExecutionInfo:
+class OrderExecutionInfo(object):
     """Execution information for a filled order."""
+    __slots__ = ('__price', '__quantity', '__commission', '__dateTime')
+
     def __init__(self, price, quantity, commission, dateTime):
         self.__price = price
         self.__quantity = quantity
@@ -6,6 +6,7 @@ Contains:
 '''
 from hedgeit.analyzer.istrategy import InstrumentedStrategy
 from hedgeit.feeds.feed import Feed
+from hedgeit.feeds.indcache import IndicatorCache, DiskIndicatorCache
 from hedgeit.feeds.db import InstrumentDb
 from hedgeit.feeds.multifeed import MultiFeed
 from hedgeit.strategy.factory import StrategyFactory
@@ -23,7 +24,8 @@ class Controller(object):
     def __init__(self, sectorMap, 
                  modelType=None, cash = 1000000, tradeStart=None, compounding = True,
                  positionsFile=None, equityFile=None, returnsFile=None, summaryFile=None,
-                 parms = None
+                 parms = None, store = None, workers = 1, indcachedir = None,
+                 indcache = None
                 ):
 
         self._runGroups = {}
@@ -31,11 +33,22 @@ class Controller(object):
 
         self._db = InstrumentDb.Instance()
         self._feed = MultiFeed()
-        self._broker = BacktestingFuturesBroker(cash, self._feed, commission=FuturesCommission(2.50))
+        # one cache for all feeds so that indicator reuse can be reported.
+        # With indcachedir, indicator series are also reused across runs.
+        # A parameter sweep may pass the same cache to each Controller.
+        if indcache == None:
+            disk = DiskIndicatorCache(indcachedir) if indcachedir != None else None
+            indcache = IndicatorCache(disk=disk)
+        self._indcache = indcache
+        self._broker = BacktestingFuturesBroker(cash, self._feed, commission=FuturesCommission(2.50), sectors=sectorMap)
         show = True 
+        if store == None:
+            self._db.preload([sym for sec in sectorMap for sym in sectorMap[sec]], workers=workers)
         for sec in sectorMap:
             for sym in sectorMap[sec]:
-                self._feed.register_feed(Feed(self._db.get(sym)))
+                # when running from a FeedStore (e.g. many processes in a 
+                # parameter sweep) all price data is shared via memory-mapping
+                self._feed.register_feed(Feed(self._db.get(sym), store=store, indcache=self._indcache))
         
             # if desired can instantiate a strategy per symbol - may actually
             # want to think about this as a default behavior.  The only thing
@@ -125,11 +138,39 @@ class Controller(object):
             
         self._handle_trade_end(lastEmitDate)
         
-    def dumpFeed(self, symbol):
+    def indicator_cache(self):
+        '''Returns the IndicatorCache shared by all of the feeds.'''
+        return self._indcache
+
+    def dumpFeed(self, symbol, npz=False):
+        '''
+        Writes <symbol>.csv with the full data feed, including the indicators
+        calculated by the strategy.
+
+        :param str symbol: symbol to dump
+        :param bool npz: also write the columns to <symbol>.npz
+        '''
         feed = self._feed.get_feed(symbol)
         of = open('%s.csv' % symbol,'w')
         feed.write_csv(of)
         of.close()
+        if npz:
+            of = open('%s.npz' % symbol,'wb')
+            feed.write_npz(of)
+            of.close()
+
+    def dumpFeeds(self, symbols=None, npz=False):
+        '''
+        Dumps several feeds, see dumpFeed.
+
+        :param list symbols: symbols to dump, or None for all of the symbols
+                             in the sector map
+        :param bool npz: also write the columns to <symbol>.npz
+        '''
+        if symbols == None:
+            symbols = self._feed.symbols()
+        for sym in symbols:
+            self.dumpFeed(sym, npz=npz)
         
     def writeAllTrades(self, filename):
         # get one list with all trades
@@ -385,7 +426,11 @@ class Controller(object):
         total_margin = 0.0
         for sec in sorted(self._runGroups):
             equity = self._runGroups[sec].getEquity()
-            margin = self._runGroups[sec].calc_margin()
+            # the margin is taken from the broker's positions.  The trades
+            # analyzer loses the new position when one fill reverses a 
+            # position (e.g. a long entry and the cover of a larger short 
+            # filled on the same bar), so its open positions can't be used.
+            margin = self._broker.get_sector_margin(sec)
             str_ = str_ + '%0.2f,%0.2f,' % (equity,margin)
             total_equity += equity
             total_margin += margin
@@ -3,18 +3,34 @@ hedgeit.feeds.bar
 
 Contains:
   class Bar
+  class BarView
 '''
 import numpy
 
+# marks a slot of the layout that has not been set on a given Bar
+_UNSET = object()
+
+def _slot_accessor(slot):
+    return lambda self: self._ud_values[slot]
+
 class Bar(object):
     '''
     Bar represents information about a tradable instrument (stock, option,
     futures contract, etc.).  It always contains price information and may
-    additionally carry volume and/or open interest information
+    additionally carry volume and/or open interest information.
+
+    Bar uses __slots__ and keeps any user-defined values in a list indexed
+    through a layout dict (name -> slot) rather than a per-instance dict to
+    keep each instance small.  The bars of one instrument share a single
+    layout so that each name is only stored once.
     '''
+    __slots__ = ('_datetime', '_open', '_high', '_low', '_close', '_volume',
+                 '_open_interest', '_adj_close', '_ud_layout', '_ud_values')
 
+    # one accessor function per slot, shared by all layouts
+    _accessors = []
 
-    def __init__(self, datetime_, open_, high, low, close, volume = None, open_interest = None, adj_close = None):
+    def __init__(self, datetime_, open_, high, low, close, volume = None, open_interest = None, adj_close = None, layout = None):
         '''
         Bar Constructor.
         
@@ -29,6 +45,9 @@ class Bar(object):
         :type open_interest: int or None
         :param adj_close: adjusted close
         :type adj_close: float or None
+        :param layout: name -> slot dict for the user-defined values, shared 
+                       with the other bars of the same instrument
+        :type layout: dict or None
         
         :raises AssertionError: if price information is inconsistent (low > high, etc.)
         '''
@@ -44,17 +63,27 @@ class Bar(object):
         self._volume = volume
         self._open_interest = open_interest
         self._adj_close = adj_close
-        self._user_defined = {}
+        if layout == None:
+            layout = {}
+        self._ud_layout = layout
+        self._ud_values = [_UNSET] * len(layout)
         
     def set_user_defined(self, name, value):
         '''Interface to set any additional generic value associated with the bar.'''
-        self._user_defined[name] = value
+        slot = self._ud_layout.get(name)
+        if slot == None:
+            slot = len(self._ud_layout)
+            self._ud_layout[name] = slot
+        if slot >= len(self._ud_values):
+            # the layout has grown since this bar was created
+            self._ud_values.extend([_UNSET] * (len(self._ud_layout) - len(self._ud_values)))
+        self._ud_values[slot] = value
         
     def has_nan(self):
         # we only have to check the user-defined values since none of the 
         # standard open, high, low, close, etc. can be NAN
-        for val in self._user_defined.itervalues():
-            if numpy.isnan(val):
+        for val in self._ud_values:
+            if val is not _UNSET and numpy.isnan(val):
                 return True
         return False
     
@@ -62,7 +91,7 @@ class Bar(object):
         '''
         This intercepts access to undefined attributes.  We use this to enable 
         callers to be able to access any user-defined values stored in the
-        self._user_defined dict as a method.  
+        user-defined values as a method.  
         
         Ex.
         b = Bar(...)
@@ -70,9 +99,19 @@ class Bar(object):
         print b.foo()
         > 42
         '''
-        if not self._user_defined.has_key(attr):
+        slot = self._ud_layout.get(attr)
+        if slot == None or slot >= len(self._ud_values) or self._ud_values[slot] is _UNSET:
             raise Exception("Bar has no user-defined attribute named %s" % attr)
-        return lambda: self._user_defined.get(attr) 
+        accessors = Bar._accessors
+        while len(accessors) <= slot:
+            accessors.append(_slot_accessor(len(accessors)))
+        return accessors[slot].__get__(self, Bar)
+
+    def _ud_items(self):
+        names = sorted(self._ud_layout, key=self._ud_layout.get)
+        return [(name, self._ud_values[self._ud_layout[name]]) for name in names
+                if self._ud_layout[name] < len(self._ud_values) and 
+                   self._ud_values[self._ud_layout[name]] is not _UNSET]
 
     def __str__(self):
         '''Returns formatted string representation of Bar.'''
@@ -84,8 +123,8 @@ class Bar(object):
             str_ += ',open_interest:%s' % self._open_interest
         if self._adj_close != None:
             str_ += ',adjusted_close:%s' % self._adj_close
-        for val in self._user_defined:
-            str_ += ',%s:%s' % (val, self._user_defined[val])
+        for (name, value) in self._ud_items():
+            str_ += ',%s:%s' % (name, value)
         return str_
         
     def datetime(self):
@@ -118,4 +157,129 @@ class Bar(object):
 
     def adj_close(self):
         '''Returns adjusted close.'''
-        return self._adj_close
\ No newline at end of file
+        return self._adj_close
+
+class BarView(object):
+    '''
+    BarView is a read-only Bar for one row of a Feed.  Rather than copying
+    the prices and indicator values for the row it only holds the row index
+    and reads them from the Feed's data series on access.
+    
+    BarView itself is never instantiated - each Feed uses a subclass built
+    by view_class() that binds its series and has one method per indicator,
+    so that user-defined values are accessed in the same way as with Bar
+    (ex. bar.atr()) without any per-access lookup.
+    '''
+    __slots__ = ('_index',)
+    
+    _datetimes = ()
+    _open = _high = _low = _close = _volume = None
+    _indicators = ()
+    _pending = ()
+
+    def __init__(self, index):
+        '''
+        Constructor.
+        
+        :param int index: index of the row in the Feed's series
+        '''
+        self._index = index
+
+    @staticmethod
+    def view_class(datetimes, open_, high, low, close, volume, indicators, pending=(), resolve=None):
+        '''
+        Returns a BarView subclass bound to a set of data series.
+        
+        :param list datetimes: datetime of each row
+        :param open_, high, low, close, volume: price/volume series
+        :param list indicators: (name, series) tuples for the user-defined 
+                                values
+        :param list pending: names of user-defined values whose series are 
+                             not calculated yet
+        :param resolve: function that returns the series for one of the 
+                        pending names, calculating it on first call
+        '''
+        attrs = { '__slots__' : (),
+                  '_datetimes' : datetimes,
+                  '_open' : open_,
+                  '_high' : high,
+                  '_low' : low,
+                  '_close' : close,
+                  '_volume' : volume,
+                  '_indicators' : tuple(indicators),
+                  '_pending' : tuple(pending),
+                  '_resolve' : staticmethod(resolve) }
+        for (name, series) in indicators:
+            # as with Bar, the standard accessors take precedence
+            if not hasattr(BarView, name):
+                attrs[name] = BarView._accessor(series)
+        for name in pending:
+            if not hasattr(BarView, name):
+                attrs[name] = BarView._lazy_accessor(name, resolve)
+        return type('BarView', (BarView,), attrs)
+
+    @staticmethod
+    def _accessor(series):
+        return lambda self: series[self._index]
+
+    @staticmethod
+    def _lazy_accessor(name, resolve):
+        return lambda self: resolve(name)[self._index]
+
+    def _series(self):
+        '''Returns (name, series) for every user-defined value.'''
+        return list(self._indicators) + [(name, self._resolve(name)) for name in self._pending]
+
+    def has_nan(self):
+        for (name, series) in self._series():
+            if numpy.isnan(series[self._index]):
+                return True
+        return False
+
+    def __getattr__(self, attr):
+        # only reached if attr is not one of our indicators
+        raise Exception("Bar has no user-defined attribute named %s" % attr)
+
+    def __str__(self):
+        '''Returns formatted string representation of Bar.'''
+        str_ = 'date:%s,open:%s,high:%s,low:%s,close:%s,volume:%s' % \
+            (self.datetime(), self.open(), self.high(), self.low(), self.close(), self.volume())
+        for (name, series) in self._series():
+            str_ += ',%s:%s' % (name, series[self._index])
+        return str_
+
+    def index(self):
+        '''Returns the index of the Bar within its Feed.'''
+        return self._index
+
+    def datetime(self):
+        '''Returns datetime of Bar.'''
+        return self._datetimes[self._index]
+    
+    def open(self):
+        '''Returns opening price.'''
+        return self._open[self._index]
+
+    def high(self):
+        '''Returns high price.'''
+        return self._high[self._index]
+        
+    def low(self):
+        '''Returns low price.'''
+        return self._low[self._index]
+
+    def close(self):
+        '''Returns closing price.'''
+        return self._close[self._index]
+
+    def volume(self):
+        '''Returns volume.'''
+        return self._volume[self._index]
+        
+    def open_interest(self):
+        '''Returns open_interest.'''
+        return None
+
+    def adj_close(self):
+        '''Returns adjusted close.'''
+        return None
@@ -11,10 +11,13 @@ class Bars(object):
     MultiFeed to represent price activity for a collection of instruments
     over a given trading period.
     '''
+    __slots__ = ('_datetime', '_bars', '_symbols')
+
     def __init__(self):
         '''Constructor.'''
         self._datetime = None
         self._bars = {}
+        self._symbols = None
         
     def add_bar(self, symbol, bar):
         '''
@@ -36,6 +39,7 @@ class Bars(object):
         else:
             self._bars[symbol] = bar
             self._datetime = bar.datetime()
+            self._symbols = None
     
     def get_bar(self, symbol):
         '''
@@ -46,9 +50,22 @@ class Bars(object):
         '''
         return self._bars[symbol]
     
+    def has_symbol(self, symbol):
+        '''Returns True if there is a Bar for symbol.'''
+        return symbol in self._bars
+
+    def __contains__(self, symbol):
+        return symbol in self._bars
+
     def symbols(self):
-        '''Returns list of symbols currently in Bars.'''
-        return sorted(self._bars.keys())
+        '''
+        Returns a sorted tuple of the symbols currently in Bars.  The tuple
+        is built once and shared by all callers, so use has_symbol() rather
+        than searching it to test membership.
+        '''
+        if self._symbols == None:
+            self._symbols = tuple(sorted(self._bars.keys()))
+        return self._symbols
         
     def datetime(self):
         '''Returns datetime for the Bars collection.'''
@@ -0,0 +1,138 @@
+'''
+hedgeit.feeds.cache
+
+Contains:
+  class ColumnCache
+'''
+import glob
+import hashlib
+import numpy
+import os
+import tempfile
+from hedgeit.common.logger import getLogger
+
+logger = getLogger("hedgeit.feeds")
+
+class ColumnCache(object):
+    '''
+    ColumnCache stores the parsed columns for a datafile in a binary .npy
+    file so that subsequent loads can skip parsing the text file entirely.
+
+    Each entry is a single 2-d float64 array with one row per column (Date is
+    stored as days since the epoch) so that it can be memory-mapped and each
+    column used in place.  The entry name embeds the size and md5 hash of the
+    datafile it was built from, so an entry is only ever used for identical
+    content.  An entry must also be at least as new as the datafile -
+    otherwise it is ignored and will be rebuilt by the caller via store().
+    '''
+
+    def __init__(self, cachedir, columns=None):
+        '''
+        Constructor
+
+        :param str cachedir: directory that holds the cache files.  It is
+                             created on the first store() if necessary.
+        :param list columns: ordered list of column names stored in each entry.
+                             The first must be 'Date'.  Defaults to the
+                             PremiumDataParser field names.
+        '''
+        self._cachedir = cachedir
+        if columns == None:
+            columns = ['Date','Open','High','Low','Close','Volume','Open Interest']
+        self._names = columns
+
+    def cachedir(self):
+        '''Returns the cache directory.'''
+        return self._cachedir
+
+    def cachefile(self, datafile):
+        '''Returns the name of the cache file corresponding to the current contents of datafile.'''
+        return os.path.join(self._cachedir, '%s.%d.%s.npy' %
+                            (self._base(datafile), os.path.getsize(datafile), self._hash(datafile)))
+
+    def load(self, datafile):
+        '''
+        Returns the cached columns for datafile.  The price columns are
+        read-only views onto a memory-mapped cache file.
+
+        :param str datafile: csv file containing historical bar data
+        :returns dict: maps column name to numpy array, or None if there is
+                       no valid cache entry
+        '''
+        cachefile = self.cachefile(datafile)
+        if not os.path.exists(cachefile) or \
+           os.path.getmtime(cachefile) < os.path.getmtime(datafile):
+            return None
+
+        try:
+            arr = numpy.load(cachefile, mmap_mode='r')
+            if arr.ndim != 2 or arr.shape[0] != len(self._names):
+                raise Exception('unexpected shape %s' % (arr.shape,))
+        except Exception as e:
+            # a corrupt or partially written entry is just a cache miss
+            logger.warning('Ignoring unreadable cache file %s: %s' % (cachefile, e))
+            return None
+
+        ret = { 'Date' : arr[0].astype('int64').astype('datetime64[D]') }
+        for i in range(1, len(self._names)):
+            ret[self._names[i]] = numpy.asarray(arr[i])
+        return ret
+
+    def store(self, datafile, columns):
+        '''
+        Writes a cache entry for datafile, removing any stale entries for it.
+        The entry is written to a temporary file and renamed into place so
+        that concurrent readers never see a partially written entry.
+
+        :param str datafile: csv file containing historical bar data
+        :param dict columns: maps column name to numpy array
+        '''
+        if not os.path.isdir(self._cachedir):
+            try:
+                os.makedirs(self._cachedir)
+            except OSError:
+                # someone else may have created it in the meantime
+                if not os.path.isdir(self._cachedir):
+                    raise
+
+        arr = numpy.zeros((len(self._names), len(columns['Date'])))
+        arr[0] = columns['Date'].astype('datetime64[D]').astype('int64')
+        for i in range(1, len(self._names)):
+            arr[i] = columns[self._names[i]]
+
+        cachefile = self.cachefile(datafile)
+        for stale in glob.glob(os.path.join(self._cachedir, '%s.*.npy' % self._base(datafile))):
+            if stale != cachefile:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    # may still be mapped by another process
+                    pass
+
+        fd, tmpfile = tempfile.mkstemp(suffix='.tmp', dir=self._cachedir)
+        try:
+            f = os.fdopen(fd, 'wb')
+            try:
+                numpy.save(f, arr)
+            finally:
+                f.close()
+        except:
+            os.remove(tmpfile)
+            raise
+        try:
+            os.rename(tmpfile, cachefile)
+        except OSError:
+            # if another process beat us to it then its entry is identical
+            os.remove(tmpfile)
+            if not os.path.exists(cachefile):
+                raise
+
+    def _base(self, datafile):
+        return os.path.splitext(os.path.basename(datafile))[0]
+
+    def _hash(self, datafile):
+        f = open(datafile, 'rb')
+        try:
+            return hashlib.md5(f.read()).hexdigest()
+        finally:
+            f.close()
@@ -6,6 +6,7 @@ Contains:
   class PremiumDataParser - concrete class for parsing Premium Data feed
 '''
 import datetime
+import numpy
 import hedgeit.feeds.bar as bar
 
 class RowParser:
@@ -19,6 +20,9 @@ class RowParser:
     def getDelimiter(self):
         raise Exception("Not implemented")
 
+    def parseColumns(self, datafile):
+        raise Exception("Not implemented")
+
 
 class PremiumDataParser(RowParser):
     '''
@@ -55,4 +59,59 @@ class PremiumDataParser(RowParser):
         low = float(csvRowDict["Low"])
         volume = float(csvRowDict["Volume"])
         openint = float(csvRowDict["Open Interest"])
-        return bar.Bar(dateTime, open_, high, low, close, volume, None)
\ No newline at end of file
+        return bar.Bar(dateTime, open_, high, low, close, volume, None)
+
+    def parseColumns(self, datafile):
+        '''
+        Parses an entire datafile in one pass directly into numpy columns
+        without creating any per-row objects.  Both the headered format
+        ("Date","Open",... with YYYY-MM-DD dates) and the headerless format
+        (YYYYMMDD dates) are supported.
+        
+        :param str datafile: csv file containing historical bar data
+        :returns dict: maps each name in getFieldNames() to a numpy array.
+                       'Date' is a datetime64[D] array, all others are float
+        
+        :raises AssertionError: if price information is inconsistent (low > high, etc.)
+        '''
+        text = open(datafile).read().replace('"', '').strip()
+        # drop the header row if present - note the header can't be split on
+        # whitespace since it contains 'Open Interest'
+        if text.split('\n', 1)[0].find('Date') != -1:
+            text = text.split('\n', 1)[1] if text.find('\n') != -1 else ''
+        lines = text.split()
+
+        names = self.getFieldNames()
+        if not len(lines):
+            ret = { 'Date' : numpy.zeros(0, dtype='datetime64[D]') }
+            for name in names[1:]:
+                ret[name] = numpy.zeros(0)
+            return ret
+
+        # every row has the same number of fields so we can split the whole
+        # file at once and reshape into a 2-d array of strings
+        ncols = lines[0].count(self.getDelimiter()) + 1
+        fields = numpy.array(self.getDelimiter().join(lines).split(self.getDelimiter()))
+        if len(fields) != ncols * len(lines):
+            raise Exception("Inconsistent number of fields in datafile %s" % datafile)
+        fields = fields.reshape(len(lines), ncols)
+
+        ret = { 'Date' : self.__parseDates(fields[:,0]) }
+        for i in range(1, len(names)):
+            ret[names[i]] = fields[:,i].astype(float)
+
+        assert((ret['High'] >= ret['Open']).all())
+        assert((ret['High'] >= ret['Close']).all())
+        assert((ret['Low'] <= ret['Open']).all())
+        assert((ret['Low'] <= ret['Close']).all())
+        return ret
+
+    def __parseDates(self, dates):
+        if dates[0].find('-') != -1:
+            return dates.astype('datetime64[D]')
+        # YYYYMMDD - convert via integer arithmetic since numpy only natively
+        # parses the ISO format
+        ymd = dates.astype(int)
+        ret = (ymd // 10000 - 1970).astype('datetime64[Y]')
+        ret = ret + (ymd // 100 % 100 - 1).astype('timedelta64[M]')
+        return ret + (ymd % 100 - 1).astype('timedelta64[D]')
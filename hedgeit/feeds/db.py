@@ -6,6 +6,8 @@ Contains:
 '''
 import csv
 from instrument import Instrument
+from cache import ColumnCache
+from loader import load_instruments
 from hedgeit.common.logger import getLogger
 from hedgeit.common.singleton import Singleton
 import os
@@ -19,12 +21,18 @@ class InstrumentDb(object):
         Constructor.
         '''
         self._db = {}
+        self._cache = None
         
-    def load(self, manifest):
+    def load(self, manifest, cache=True):
         '''    
         Loads the instrument Database using a manifest file.
         
         :param str manifest: file containing the list of instruments to load
+        :param cache: if True, parsed datafiles are cached in binary form in
+                      a cache/ directory next to the manifest, or if a 
+                      string in the directory it names.  Cache entries are
+                      rebuilt automatically when a datafile changes.
+        :type cache: bool or str
         
         File Format:
         The file must be a .CSV file containing a header row with at least the
@@ -40,9 +48,16 @@ class InstrumentDb(object):
             datafile
         Other fields may be present and will be ignored.  The datafiles 
         corresponding to the Instruments must be in the same directory with
-        the manifest file.
+        the manifest file.  Datafiles are not read here - each is loaded on
+        first use (or via preload) and only once.
         '''
         path, filename = os.path.split(manifest)
+        if isinstance(cache, basestring):
+            self._cache = ColumnCache(cache)
+        elif cache:
+            self._cache = ColumnCache(os.path.join(path, 'cache'))
+        else:
+            self._cache = None
         reader = csv.DictReader(open(manifest, "r"))
         for row in reader:
             entry_ = self._parseRow(row, path)
@@ -55,6 +70,23 @@ class InstrumentDb(object):
     
     def get_symbols(self):
         return sorted(self._db.keys())
+
+    def preload(self, symbols=None, workers=1, processes=True):
+        '''
+        Loads the bar data for a set of instruments up front rather than on
+        first use.  Instruments that are already loaded are skipped.  The
+        datafiles are read and validated by a pool of workers - see 
+        hedgeit.feeds.loader.load_columns.
+        
+        :param list symbols: symbols to load.  If None, all symbols are loaded.
+        :param int workers: number of workers.  If None, one per CPU is used.
+                            By default everything is read in this process.
+        :param bool processes: if True the workers are processes, otherwise 
+                               they are threads
+        '''
+        if symbols == None:
+            symbols = self.get_symbols()
+        load_instruments([self._db[sym] for sym in symbols], workers=workers, processes=processes)
     
     def _parseRow(self, csvRowDict, basepath):
         '''Parses one row in the manifest file.'''
@@ -71,7 +103,8 @@ class InstrumentDb(object):
             return Instrument(symbol, datafile, pointValue = pointValue, \
                               currency = currency, exchange = exchange, \
                               initialMargin = initialMargin, maintMargin = maintMargin, \
-                              sector = sector, description = description)
+                              sector = sector, description = description,
+                              cache = self._cache)
         else:
             logger.warning('Skipping unknown symbol %s' % symbol )
             return None
@@ -4,8 +4,11 @@ hedgeit.feeds.feed
 Contains:
   class Feed
 '''
+import collections
 import numpy
-from hedgeit.feeds.bar import Bar
+from hedgeit.feeds.bar import BarView
+from hedgeit.feeds.indcache import IndicatorCache
+from hedgeit.feeds.store import StoredSeries
 
 class Feed(object):
     '''
@@ -13,19 +16,45 @@ class Feed(object):
     standard bars (open, high, low, close, etc.) plus the ability to add custom
     indicators via the Indicator class.  Also provides various accessors to 
     the different data series and methods to iterate over the bars in the feed
+
+    Indicators may be added with insert(), which calculates them at once, or
+    declared with register(), which defers the calculation until the series
+    is first read (see register).
     '''
 
-    def __init__(self, inst):
+    def __init__(self, inst, store=None, indcache=None):
         '''
         Constructor.
         
         :param Instrument inst: Instrument that this feed is for
+        :param FeedStore store: if present, the feed attaches to the read-only
+                                series previously written to the store 
+                                rather than loading the Instrument datafile.
+                                Any indicators in the store are available as
+                                if they had been inserted.
+        :param IndicatorCache indcache: cache used to share the series of 
+                                        equivalent indicators.  If None, the
+                                        feed uses its own cache.
         '''
         self._inst = inst
         self._values = []
         self._indictrs = []
         self._lkup = {}
+        self._keys = {}
+        # registered indicators that are not yet calculated (by name, in 
+        # registration order), the signatures of all of the indicators (see
+        # _signature) and the names being calculated by _resolve()
+        self._pending = collections.OrderedDict()
+        self._sigs = {}
+        self._resolving = set()
+        self._indcache = indcache if indcache != None else IndicatorCache()
         self._cursor = 0
+        self._view = None
+        # number of indicators started for append(), and the buffers that
+        # the series are moved into on the first append()
+        self._started = 0
+        self._bufs = None
+        self._datebuf = None
 
         # as part of the constructor we will translate from "horizontal" bars
         # to "vertical" data series.  This facilitates the addition of new 
@@ -37,21 +66,37 @@ class Feed(object):
         # series are numpy arrays.  Series can be accessed directly in _values
         # for ones with fixed position (generally this is only for Datetime),
         # but more commonly they are indexed via the _lkup dict that maps 
-        # series name to series
-        inst.load_data()
-        self._len = len(inst.bars())
-        
-        dates = []
-        for b in self._inst.bars():
-            dates.append(b.datetime())
-        self._add_series('Datetime', dates)
+        # series name to series.  The Instrument parses its datafile straight
+        # into numpy columns (once, on first access) so we use those directly
+        # rather than walking Bar instances.
+        if store != None:
+            self._attach(store)
+            return
+
+        cols = inst.columns()
+        self._len = len(cols['Date']) if cols != None else 0
+        # datetimes are also kept as a sorted datetime64 array so that 
+        # locating a date is a binary search
+        if cols != None:
+            self._dates = cols['Date'].astype('datetime64[us]')
+        else:
+            self._dates = numpy.zeros(0, dtype='datetime64[us]')
 
-        self._add_from_bars('Open', Bar.open)
-        self._add_from_bars('High', Bar.high)
-        self._add_from_bars('Low', Bar.low)
-        self._add_from_bars('Close', Bar.close)
-        self._add_from_bars('Volume', Bar.volume)
+        self._add_series('Datetime', inst.datetimes())
+        for name in ['Open', 'High', 'Low', 'Close', 'Volume']:
+            self._add_series(name, cols[name] if cols != None else numpy.zeros(0))
         
+    def _attach(self, store):
+        '''Attaches to the series for our instrument in a FeedStore.'''
+        series = store.load(self._inst.symbol())
+        self._len = len(series[0][1])
+        self._dates = series[0][1]
+        self._add_series('Datetime', series[0][1].tolist())
+        for (name, arr) in series[1:6]:
+            self._add_series(name, arr)
+        for (name, arr) in series[6:]:
+            self.insert(StoredSeries(name, arr))
+
     def instrument(self):
         '''Returns the Instrument associated with the Feed.'''
         return self._inst
@@ -60,6 +105,14 @@ class Feed(object):
         '''Returns the total number of Bars in this feed.'''
         return self._len
     
+    def indicator_names(self):
+        '''
+        Returns the names of the indicators in this feed in the order they
+        were calculated, followed by those registered but not yet 
+        calculated.
+        '''
+        return [ind.name() for ind in self._indictrs] + self._pending.keys()
+
     def get_series(self, name):
         '''
         Returns one of the data series.
@@ -69,24 +122,176 @@ class Feed(object):
         
         :raises: Exception if series name not found
         '''
+        if self._pending.has_key(name):
+            self._resolve(name)
         if not self._lkup.has_key(name):
             raise Exception("Workspace does not have a %s series in %s!" % (name, self._lkup.keys()))
         return self._lkup[name]
     
     def insert(self, ind):
         '''
-        Adds a new indicator to the feed.
+        Adds a new indicator to the feed.  If an equivalent indicator (see
+        Indicator.cache_key) has already been calculated its series is used
+        rather than calculating it again.  Inserting an indicator that is
+        equivalent to the one already in the feed under the same name does
+        nothing, so several strategies may share a feed.
         
         :param Indicator ind: Indicator instance to add
         
-        :raises: Exception if Feed already has a series of the same name
+        :raises: Exception if Feed already has a different series of the 
+                 same name
         '''
+        if self._pending.has_key(ind.name()):
+            self._check_duplicate(ind)
+            self._resolve(ind.name())
+            return
+        key = ind.cache_key(self)
         if self._lkup.has_key(ind.name()):
+            if key == None or self._keys.get(ind.name()) != key:
+                raise Exception("Workspace already has an indicator named %s" % ind.name())
+            # count the reuse
+            self._indcache.get(key)
+            return
+        self._add_indicator(ind, key)
+
+    def register(self, ind):
+        '''
+        Declares an indicator that is only calculated when its series is 
+        first read - by get_series(), the accessor of a Bar returned by 
+        get_bar() (ex. bar.atr()), write_csv() and so on.  An indicator 
+        that is never read costs nothing.  Indicators may be registered in any order: the
+        series an indicator depends on (see Indicator.depends) are 
+        calculated before it, and registering an indicator that is
+        equivalent to the one already in the feed under the same name does
+        nothing.
+        
+        :param Indicator ind: Indicator instance to add
+        
+        :raises: Exception if Feed already has a different series of the 
+                 same name
+        '''
+        if self._lkup.has_key(ind.name()) or self._pending.has_key(ind.name()):
+            self._check_duplicate(ind)
+            return
+        self._pending[ind.name()] = ind
+        self._sigs[ind.name()] = _signature(ind)
+        self._view = None
+
+    def _check_duplicate(self, ind):
+        sig = _signature(ind)
+        if sig == None or self._sigs.get(ind.name()) != sig:
             raise Exception("Workspace already has an indicator named %s" % ind.name())
 
+    def _resolve(self, name):
+        '''Calculates a registered indicator, after those it depends on.'''
+        if name in self._resolving:
+            raise Exception("Indicator %s depends on itself" % name)
+        self._resolving.add(name)
+        try:
+            ind = self._pending[name]
+            for dep in ind.depends():
+                if self._pending.has_key(dep):
+                    self._resolve(dep)
+            self._add_indicator(ind, ind.cache_key(self))
+            del self._pending[name]
+        finally:
+            self._resolving.discard(name)
+
+    def _resolve_all(self):
+        '''Calculates all of the registered indicators.'''
+        while len(self._pending):
+            self._resolve(self._pending.keys()[0])
+
+    def _add_indicator(self, ind, key):
+        series = None
+        if key != None:
+            inputs = ind.inputs(self)
+            series = self._indcache.get(key, inputs)
+        if series is None:
+            series = ind.calc(self)
+            if key != None:
+                self._indcache.put(key, series, inputs)
+
         self._indictrs.append(ind)
-        series = ind.calc(self)
+        self._keys[ind.name()] = key
+        self._sigs[ind.name()] = _signature(ind)
         self._add_series(ind.name(), series)
+        self._view = None
+
+    def append(self, bar):
+        '''
+        Adds a Bar to the end of the feed and extends each indicator by one
+        value using its update() method, so the cost per bar does not grow
+        with the length of the feed.  The series are moved into private 
+        buffers with spare capacity on the first append, so the data of the
+        Instrument (or FeedStore) is never modified.  Series returned by 
+        get_series() before the append do not include the new bar.
+        
+        :param Bar bar: bar to add
+        
+        :raises: Exception if bar is not later than the last Bar in the feed
+                 or an indicator does not support incremental updates
+        '''
+        self._resolve_all()
+        n = self._len
+        date = numpy.datetime64(bar.datetime(), 'us')
+        if n and date <= self._dates[n-1]:
+            raise Exception("Cannot append a bar for %s after the bar for %s" % (bar.datetime(), self._values[0][n-1]))
+
+        # indicators inserted since the last append pick up from the 
+        # series as they are now
+        for ind in self._indictrs[self._started:]:
+            ind.start(self)
+            self._started += 1
+
+        self._reserve(n + 1)
+        self._len = n + 1
+        self._datebuf[n] = date
+        self._dates = self._datebuf[:n+1]
+        self._values[0].append(bar.datetime())
+        volume = bar.volume()
+        prices = [bar.open(), bar.high(), bar.low(), bar.close(), numpy.nan if volume == None else volume]
+        names = ['Datetime', 'Open', 'High', 'Low', 'Close', 'Volume'] + self.indicator_names()
+        for i in range(1, len(self._values)):
+            if i <= 5:
+                self._bufs[i][n] = prices[i-1]
+            self._values[i] = self._bufs[i][:n+1]
+            self._lkup[names[i]] = self._values[i]
+        self._view = None
+
+        # each indicator sees the values of those inserted before it
+        bar = self.get_bar(n)
+        for i in range(0, len(self._indictrs)):
+            self._bufs[6+i][n] = self._indictrs[i].update(bar)
+        for ind in self._indictrs:
+            self._keys[ind.name()] = ind.cache_key(self)
+
+    def _reserve(self, size):
+        '''Makes sure that every series has a buffer with room for size bars.'''
+        if self._bufs == None:
+            self._values[0] = list(self._values[0])
+            self._lkup['Datetime'] = self._values[0]
+            self._bufs = [None]
+        self._bufs.extend([None] * (len(self._values) - len(self._bufs)))
+        capacity = max(size, 2 * self._len, 16)
+        if self._datebuf is None or len(self._datebuf) < size:
+            self._datebuf = numpy.empty(capacity, dtype='datetime64[us]')
+            self._datebuf[:self._len] = self._dates
+        # series that are shared by several indicators (see IndicatorCache)
+        # share a buffer too
+        copies = {}
+        for i in range(1, len(self._values)):
+            if self._bufs[i] is not None and len(self._bufs[i]) >= size:
+                continue
+            series = self._values[i]
+            if not copies.has_key(id(series)):
+                copies[id(series)] = numpy.empty(capacity)
+                copies[id(series)][:self._len] = series
+            self._bufs[i] = copies[id(series)]
+
+    def indicator_cache(self):
+        '''Returns the IndicatorCache used by the feed.'''
+        return self._indcache
             
     def set_cursor(self, start=None):
         '''
@@ -99,14 +304,54 @@ class Feed(object):
                                the list
         '''
         if start != None:
-            # the list of dates is always guaranteed to be in _values[0]
-            i = 0
-            while self._values[0][i] < start and i < len(self._values[0]):
-                i = i+1
-            self._cursor = i
+            self._cursor = self.index_of(start)
         else:
             self._cursor = 0
             
+    def dates(self):
+        '''Returns the bar datetimes as a (read-only) datetime64[us] array.'''
+        return self._dates
+
+    def index_of(self, start):
+        '''
+        Returns the index of the first Bar with a datetime >= start, or len()
+        if there is none.
+        
+        :param datetime start: datetime to locate
+        '''
+        return int(numpy.searchsorted(self._dates, numpy.datetime64(start, 'us')))
+
+    def get_window(self, first=None, last=None, names=None):
+        '''
+        Returns the data series for the Bars with first <= datetime <= last.
+        Each series is a view onto the feed's data rather than a copy, so it
+        must not be modified.
+        
+        :param datetime first: if present, earliest datetime in the window
+        :param datetime last: if present, last datetime in the window
+        :param list names: names of the series to return.  If None, all
+                           series are returned.
+        :returns dict: maps series name to numpy array.  Datetime is returned
+                       as a datetime64[us] array.
+        
+        :raises: Exception if a series name is not found
+        '''
+        start = self.index_of(first) if first != None else 0
+        if last != None:
+            end = int(numpy.searchsorted(self._dates, numpy.datetime64(last, 'us'), side='right'))
+        else:
+            end = self._len
+        if names == None:
+            self._resolve_all()
+            names = self._lkup.keys()
+        ret = {}
+        for name in names:
+            if name == 'Datetime':
+                ret[name] = self._dates[start:end]
+            else:
+                ret[name] = numpy.asarray(self.get_series(name))[start:end]
+        return ret
+
     def get_next_bar_date(self):
         '''Returns the datetime of the current Bar instance.'''
         if self._cursor < self._len:
@@ -116,30 +361,38 @@ class Feed(object):
         
     def get_current_bar(self):
         '''
-        Returns the current Bar as a Bar instance.  The cursor is advanced to 
-        point to the next Bar.
+        Returns the current Bar as a BarView instance.  The cursor is advanced
+        to point to the next Bar.
         
-        :returns Bar: Bar containing all standard fields plus a user-defined
-                      field for each indicator in this feed.
+        :returns BarView: Bar containing all standard fields plus a 
+                          user-defined field for each indicator in this feed.
         '''
         if self._cursor >= self._len:
             return None
         
-        # because of how the code in the constructor above, we all of the 
-        # standard bar fields exist at fixed offsets in self._values
-        b = Bar(self._values[0][self._cursor],
-                self._values[1][self._cursor],
-                self._values[2][self._cursor],
-                self._values[3][self._cursor],
-                self._values[4][self._cursor],
-                self._values[5][self._cursor])
-        
-        for ind in self._indictrs:
-            b.set_user_defined(ind.name(), self._lkup[ind.name()][self._cursor])
-
+        b = self.get_bar(self._cursor)
         self._cursor += 1
         return b
 
+    def get_bar(self, index):
+        '''
+        Returns the Bar at index as a BarView instance.  The BarView refers 
+        to the feed's series so it does not copy any values.
+        
+        :param int index: index of the Bar
+        '''
+        if self._view == None:
+            # because of how the code in the constructor above, we all of the 
+            # standard bar fields exist at fixed offsets in self._values.
+            # Registered indicators are only calculated when one of the views
+            # reads them, which also rebuilds the view class (_add_indicator)
+            self._view = BarView.view_class(self._values[0], self._values[1],
+                                            self._values[2], self._values[3],
+                                            self._values[4], self._values[5],
+                                            [(ind.name(), self._lkup[ind.name()]) for ind in self._indictrs],
+                                            self._pending.keys(), self.get_series)
+        return self._view(index)
+
     def get_last_close(self):
         '''
         Returns the closing price the cursor is currently pointing to
@@ -155,6 +408,7 @@ class Feed(object):
         
     def values(self):
         '''Returns the array of data serios.'''
+        self._resolve_all()
         return self._values    
         
     def _add_series(self, name, series):
@@ -164,24 +418,57 @@ class Feed(object):
         self._values.append(series)
         self._lkup[name] = series
         
-    def _add_from_bars(self, name, func):
-        '''Adds a series from Bar instances by using one of the Bar methods as a functor.'''
-        arr = numpy.zeros(self._len)
-        for i in range(0, self._len):
-            arr[i] = func(self._inst.bars()[i])           
-        self._add_series(name, arr)
+    def series_names(self):
+        '''
+        Returns the names of all of the series in the order of values(),
+        calculating any registered indicators.
+        '''
+        self._resolve_all()
+        return ['Datetime', 'Open', 'High', 'Low', 'Close', 'Volume'] + self.indicator_names()
+
+    def write_csv(self, handle, chunksize=10000):
+        '''
+        Writes all of the series as CSV with one row per Bar.  Each column
+        of a chunk of rows is formatted in one pass, so the cost is linear in
+        the number of series and bars.
         
-    def write_csv(self, handle):
-        header = 'Datetime,Open,High,Low,Close,Volume'
-        for ind in self._indictrs:
-            header = header + ',%s' % ind.name()
-        handle.write('%s\n' % header)
-        for i in range(0, self._len):
-            row_ = ''
-            first = True
-            for v in self._values:
-                if not first:
-                    row_ = row_ + ','
-                row_ = row_ + '%s' % v[i]
-                first = False
-            handle.write('%s\n' % row_)
+        :param file handle: file to write to
+        :param int chunksize: number of rows formatted at a time
+        '''
+        names = self.series_names()
+        handle.write('%s\n' % ','.join(names))
+        for start in range(0, self._len, chunksize):
+            end = min(start + chunksize, self._len)
+            # str() of the numpy values, as formatted by '%s'
+            cols = [map(str, v[start:end]) for v in self._values]
+            handle.write(''.join(['%s\n' % ','.join(row) for row in zip(*cols)]))
+
+    def write_npz(self, handle):
+        '''
+        Writes all of the series to a numpy .npz archive with one array per
+        series, named as in the CSV.  Datetime is a datetime64[us] array and
+        the series names in column order are in the 'columns' array.
+        
+        :param handle: file or filename to write to
+        
+        :raises: Exception if a series is named 'columns' or 'file' (a
+                 keyword of numpy.savez)
+        '''
+        names = self.series_names()
+        for reserved in ['columns', 'file']:
+            if reserved in names:
+                raise Exception("Cannot write a series named %s to an npz file" % reserved)
+        arrays = { 'columns' : numpy.array(names), 'Datetime' : self._dates }
+        for (name, series) in zip(names[1:], self._values[1:]):
+            arrays[name] = numpy.asarray(series)
+        numpy.savez(handle, **arrays)
+
+def _signature(ind):
+    '''
+    Returns what identifies the series an indicator calculates within one
+    feed without reading its inputs, or None if it can not be shared.
+    '''
+    params = ind.params()
+    if params == None:
+        return None
+    return (ind.__class__, params, tuple(ind.depends()))
@@ -0,0 +1,313 @@
+'''
+hedgeit.feeds.indcache
+
+Contains:
+  class IndicatorCache
+  class DiskIndicatorCache
+'''
+import collections
+import hashlib
+import numpy
+import os
+import tempfile
+from hedgeit.common.logger import getLogger
+
+logger = getLogger("hedgeit.feeds")
+
+class IndicatorCache(object):
+    '''
+    IndicatorCache holds computed indicator series keyed by what they were
+    computed from - the indicator class, its parameters and the identity of
+    its input series (see Indicator.cache_key) - rather than by name.  Feed
+    consults it on insert() so an indicator that is equivalent to one
+    already computed reuses the existing series (no copy) under whatever
+    name it is inserted with.
+
+    One cache may be shared by any number of Feeds since the keys include
+    the identity of each Feed's input series.  Each entry keeps a reference
+    to those inputs so that their identity can not be reused while the
+    entry exists.
+
+    If a DiskIndicatorCache is given, series that are not in memory are
+    looked up there before they are calculated and newly calculated series
+    are written to it, so they survive from one run to the next.
+    '''
+
+    def __init__(self, disk=None):
+        '''
+        Constructor.
+
+        :param DiskIndicatorCache disk: optional persistent cache
+        '''
+        self._disk = disk
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+        self._disk_hits = 0
+
+    def get(self, key, inputs=None):
+        '''
+        Returns the series cached for key, or None if there is none.  Every
+        call counts as a hit, a disk hit or a miss.
+
+        :param tuple key: key from Indicator.cache_key
+        :param list inputs: the input series the key was built from.  
+                            Required to look up the disk cache.
+        '''
+        entry = self._entries.get(key)
+        if entry != None:
+            self._hits += 1
+            return entry[0]
+        if self._disk != None and inputs != None:
+            series = self._disk.load(key, inputs)
+            if series is not None:
+                self._disk_hits += 1
+                self._entries[key] = (series, inputs)
+                return series
+        self._misses += 1
+        return None
+
+    def put(self, key, series, inputs):
+        '''
+        Adds a series to the cache.
+
+        :param tuple key: key from Indicator.cache_key
+        :param series: computed indicator series
+        :type series: numpy array
+        :param list inputs: the input series the key was built from
+        '''
+        self._entries[key] = (series, inputs)
+        if self._disk != None:
+            self._disk.store(key, inputs, series)
+
+    def disk(self):
+        '''Returns the DiskIndicatorCache, or None if there is none.'''
+        return self._disk
+
+    def hits(self):
+        '''Returns the number of lookups that found a cached series.'''
+        return self._hits
+
+    def disk_hits(self):
+        '''Returns the number of lookups that were satisfied from disk.'''
+        return self._disk_hits
+
+    def misses(self):
+        '''Returns the number of lookups that required a calculation.'''
+        return self._misses
+
+    def size(self):
+        '''Returns the number of cached series.'''
+        return len(self._entries)
+
+    def clear(self):
+        '''
+        Removes all entries and resets the counters.  The disk cache (if 
+        any) is not affected.
+        '''
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+        self._disk_hits = 0
+
+    def __str__(self):
+        return 'IndicatorCache(entries:%d,hits:%d,disk hits:%d,misses:%d)' % \
+            (self.size(), self._hits, self._disk_hits, self._misses)
+
+class DiskIndicatorCache(object):
+    '''
+    DiskIndicatorCache stores computed indicator series as .npy files in a
+    directory so that they can be reused by later runs.
+
+    Each entry is named by an md5 digest of the indicator class, its 
+    parameters and the contents of its input series.  A changed datafile
+    therefore simply produces different keys - stale entries are never
+    used and are eventually evicted.  Entries are written to a temporary
+    file and renamed into place so any number of processes may share the
+    directory.  When the total size of the entries exceeds maxbytes the 
+    least recently used entries (by modification time, which is updated on
+    every hit) are removed.
+
+    The digests of the most recently used input series are kept in memory
+    so that an input shared by several indicators is only hashed once.
+    '''
+
+    # included in every digest so that entries can be invalidated if the
+    # way a key is built ever changes
+    FORMAT = 1
+
+    def __init__(self, cachedir, maxbytes=256*1024*1024, maxdigests=256):
+        '''
+        Constructor
+
+        :param str cachedir: directory that holds the cache files.  It is
+                             created on the first store() if necessary.
+        :param int maxbytes: size the entries are trimmed to on eviction
+        :param int maxdigests: number of input series digests kept in 
+                               memory
+        '''
+        self._cachedir = cachedir
+        self._maxbytes = maxbytes
+        self._maxdigests = maxdigests
+        # id of series -> (series, digest), least recently used first
+        self._digests = collections.OrderedDict()
+        self._usage = None
+
+    def cachedir(self):
+        '''Returns the cache directory.'''
+        return self._cachedir
+
+    def maxbytes(self):
+        '''Returns the size limit of the cache in bytes.'''
+        return self._maxbytes
+
+    def cachefile(self, key, inputs):
+        '''
+        Returns the name of the cache file for an indicator.
+
+        :param tuple key: key from Indicator.cache_key
+        :param list inputs: the input series the key was built from
+        '''
+        h = hashlib.md5()
+        h.update('%d|%s.%s|%s' % (self.FORMAT, key[0].__module__, key[0].__name__, _stable_repr(key[1])))
+        for s in inputs:
+            h.update('|')
+            h.update(self._digest(s))
+        return os.path.join(self._cachedir, '%s.npy' % h.hexdigest())
+
+    def load(self, key, inputs):
+        '''
+        Returns the cached series for an indicator, or None if there is no
+        valid cache entry.
+
+        :param tuple key: key from Indicator.cache_key
+        :param list inputs: the input series the key was built from
+        '''
+        cachefile = self.cachefile(key, inputs)
+        if not os.path.exists(cachefile):
+            return None
+        try:
+            series = numpy.load(cachefile)
+            if series.ndim != 1 or (len(inputs) and len(series) != len(inputs[0])):
+                raise Exception('unexpected shape %s' % (series.shape,))
+        except Exception as e:
+            # a corrupt entry (or one evicted while we read it) is just a 
+            # cache miss
+            logger.warning('Ignoring unreadable cache file %s: %s' % (cachefile, e))
+            return None
+        try:
+            os.utime(cachefile, None)
+        except OSError:
+            pass
+        return series
+
+    def store(self, key, inputs, series):
+        '''
+        Writes a cache entry for an indicator and evicts the least recently
+        used entries if the cache is then too large.
+
+        :param tuple key: key from Indicator.cache_key
+        :param list inputs: the input series the key was built from
+        :param series: computed indicator series
+        :type series: numpy array
+        '''
+        if not os.path.isdir(self._cachedir):
+            try:
+                os.makedirs(self._cachedir)
+            except OSError:
+                # someone else may have created it in the meantime
+                if not os.path.isdir(self._cachedir):
+                    raise
+
+        cachefile = self.cachefile(key, inputs)
+        fd, tmpfile = tempfile.mkstemp(suffix='.tmp', dir=self._cachedir)
+        try:
+            f = os.fdopen(fd, 'wb')
+            try:
+                numpy.save(f, numpy.asarray(series))
+            finally:
+                f.close()
+        except:
+            os.remove(tmpfile)
+            raise
+        try:
+            os.rename(tmpfile, cachefile)
+        except OSError:
+            # if another process beat us to it then its entry is identical
+            os.remove(tmpfile)
+            if not os.path.exists(cachefile):
+                raise
+
+        # the usage is only tracked approximately between scans since other
+        # processes may be adding and evicting entries too
+        if self._usage == None:
+            self._usage = self.size()
+        else:
+            self._usage += os.path.getsize(cachefile)
+        if self._usage > self._maxbytes:
+            self.evict()
+
+    def size(self):
+        '''Returns the total size of the entries in bytes.'''
+        return sum([s for (_, s, _) in self._entries()])
+
+    def evict(self, maxbytes=None):
+        '''
+        Removes the least recently used entries until the total size of the
+        entries is no more than maxbytes.
+
+        :param int maxbytes: target size, defaults to the cache's maxbytes
+        '''
+        if maxbytes == None:
+            maxbytes = self._maxbytes
+        entries = sorted(self._entries())
+        total = sum([s for (_, s, _) in entries])
+        for (_, size, path) in entries:
+            if total <= maxbytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # already evicted by another process, or in use (Windows)
+                pass
+            total -= size
+        self._usage = total
+
+    def _entries(self):
+        # list of (mtime, size, path) - entries may vanish as we look
+        ret = []
+        if not os.path.isdir(self._cachedir):
+            return ret
+        for f in os.listdir(self._cachedir):
+            if not f.endswith('.npy'):
+                continue
+            path = os.path.join(self._cachedir, f)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            ret.append((st.st_mtime, st.st_size, path))
+        return ret
+
+    def _digest(self, series):
+        # input series are immutable in practice, so each is hashed once
+        # while it is among the most recently used.  An entry is only used
+        # if it is for this very series, since the id of an evicted series
+        # may be reused.
+        entry = self._digests.pop(id(series), None)
+        if entry == None or entry[0] is not series:
+            arr = numpy.ascontiguousarray(series)
+            entry = (series, '%s%s:%s' % (arr.dtype.str, arr.shape, hashlib.md5(arr.view(numpy.uint8)).hexdigest()))
+        self._digests[id(series)] = entry
+        if len(self._digests) > self._maxdigests:
+            self._digests.popitem(last=False)
+        return entry[1]
+
+def _stable_repr(obj):
+    # repr() of functions includes their address, which changes from run 
+    # to run, so they are represented by name
+    if isinstance(obj, (tuple, list)):
+        return '(%s)' % ','.join([_stable_repr(o) for o in obj])
+    if callable(obj) and hasattr(obj, '__name__'):
+        return '%s.%s' % (getattr(obj, '__module__', None), obj.__name__)
+    return repr(obj)
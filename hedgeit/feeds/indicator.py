@@ -21,6 +21,45 @@ class Indicator(object):
         
     def name(self):
         return self._name
+
+    def params(self):
+        '''
+        Override to allow the indicator's series to be shared with any
+        equivalent indicator via an IndicatorCache.
+        
+        :returns: tuple of the parameters (other than the name) that 
+                  determine the series calculated from the inputs, or None
+                  if the series must always be calculated
+        '''
+        return None
+
+    def depends(self):
+        '''
+        Override to return the names of the series (prices or other 
+        indicators) that calc() reads from the feed, so that the feed can
+        calculate registered indicators in dependency order (see 
+        Feed.register).
+        '''
+        return []
+
+    def inputs(self, feed):
+        '''
+        Returns the list of input series that calc() reads from feed.  Only
+        used if params() is not None.  Defaults to the depends() series.
+        '''
+        return [feed.get_series(name) for name in self.depends()]
+
+    def cache_key(self, feed):
+        '''
+        Returns the key identifying the series this indicator would 
+        calculate for feed, or None if it can not be cached.  The key is
+        built from the indicator class, params() and the identity of each
+        of the inputs() series.
+        '''
+        params = self.params()
+        if params == None:
+            return None
+        return (self.__class__, params, tuple([id(s) for s in self.inputs(feed)]))
     
     @abstractmethod
     def calc(self, feed):
@@ -32,3 +71,55 @@ class Indicator(object):
         :rtype: numpy array
         """
         raise Exception("Not implemented")
+
+    def calc_panel(self, panel):
+        """
+        Override to allow the indicator to be calculated for every symbol
+        in a Panel at once.  Must give exactly the series calc() would give
+        for each symbol's Feed.
+        
+        :param Panel panel: panel that the indicator is for
+        :returns: 2-d indicator series laid out as the panel's series (see
+                  Panel.get), or None to calculate it for each Feed instead
+        """
+        return None
+
+    def start(self, feed):
+        """
+        Override along with update() to allow the indicator to be extended
+        as bars are appended to the feed (see Feed.append).  Called once, 
+        before the first update(), to set up whatever state update() needs
+        from the series already in feed.
+        
+        :param Feed feed: feed that the indicator is in
+        
+        :raises: Exception if the indicator does not support updates
+        """
+        raise Exception("Indicator %s does not support incremental updates" % self._name)
+
+    def update(self, bar):
+        """
+        Returns the indicator value for a bar just appended to the feed, in
+        constant time.  Must give exactly the value calc() would give.
+        
+        :param BarView bar: the new bar.  The values of indicators that 
+                            were inserted before this one are available.
+        :returns float: the indicator value for bar
+        """
+        raise Exception("Indicator %s does not support incremental updates" % self._name)
+
+    @staticmethod
+    def bar_value(bar, name):
+        """
+        Returns the value of the named series (a price series or an 
+        indicator) for bar.
+        """
+        if _PRICES.has_key(name):
+            return _PRICES[name](bar)
+        return getattr(bar, name)()
+
+_PRICES = { 'Open'   : lambda bar: bar.open(),
+            'High'   : lambda bar: bar.high(),
+            'Low'    : lambda bar: bar.low(),
+            'Close'  : lambda bar: bar.close(),
+            'Volume' : lambda bar: bar.volume() }
@@ -4,7 +4,8 @@ hedgeit.strategy.indicators.atr
 Average True Range
 '''
 from hedgeit.feeds.indicator import Indicator
-import numpy
+import kernels
+import streaming
 
 class ATR(Indicator):
     '''
@@ -20,36 +21,30 @@ class ATR(Indicator):
         Indicator.__init__(self,name)
         self._period = period
         
+    def params(self):
+        return (self._period,)
+
+    def depends(self):
+        return ['High', 'Low', 'Close']
+
     def calc(self, feed):  
-        lastclose = None
-        lastatr = None      
+        tr = kernels.true_range(feed.get_series('High'),
+                                feed.get_series('Low'),
+                                feed.get_series('Close'))
+        return kernels.sma(tr, self._period)
+
+    def calc_panel(self, panel):
+        tr = kernels.true_range(panel.get('High'), panel.get('Low'), panel.get('Close'))
+        return kernels.sma(tr, self._period)
 
-        trseries = numpy.zeros(feed.len())
+    def start(self, feed):
         high = feed.get_series('High')
         low = feed.get_series('Low')
         close = feed.get_series('Close')
-        
-        # first scan through the series and calculate daily true range
-        for i in range(0, feed.len()):
-            if lastclose == None:
-                tr = high[i] - low[i]
-            else:
-                tr = max( lastclose, high[i] ) - min( lastclose, low[i] )
-                        
-            lastclose = close[i]
-            trseries[i] = tr
-
-        sum_ = 0.0
-        # now scan one more time to compute atr
-        series = numpy.zeros(feed.len())
-        for i in range(0, feed.len()):
-            # add the new entry to the window
-            sum_ = sum_ + trseries[i]
-            if i < (self._period - 1):
-                series[i] = numpy.nan
-            else:
-                series[i] = sum_ / self._period
-                # subtract off the one that is sliding out of the window
-                sum_ -= trseries[i-(self._period-1)]
-            
-        return series
\ No newline at end of file
+        self._tr = streaming.TrueRange()
+        self._tr.prime(high, low, close)
+        self._sma = streaming.SMA(self._period)
+        self._sma.prime(kernels.true_range(high, low, close))
+
+    def update(self, bar):
+        return self._sma.update(self._tr.update(bar.high(), bar.low(), bar.close()))
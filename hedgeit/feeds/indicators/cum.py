@@ -6,6 +6,8 @@ Implements a indicator that is a moving cumulative sum of another indicator
 '''
 
 from hedgeit.feeds.indicator import Indicator
+import kernels
+import streaming
 import numpy
 
 class CUM(Indicator):
@@ -25,16 +27,26 @@ class CUM(Indicator):
             raise Exception("Cannot instantiate PriceVelocity indicator without a base indicator!")
         self._base = baseIndicator
         
+    def params(self):
+        return (self._period,)
+
+    def depends(self):
+        return [self._base]
+
     def calc(self, feed):  
         base = feed.get_series(self._base)
-        
-        series = numpy.zeros(feed.len())
-        cum = 0.0
-        for i in range(0, feed.len()):
-            if not numpy.isnan(base[i]):
-                cum += base[i]
-            if i >= self._period and not numpy.isnan(base[i-self._period]):
-                cum -= base[i-self._period]
-            series[i] = cum
-        
-        return series
\ No newline at end of file
+        # NAN entries in the base (ex. before it is warmed up) count as 0
+        return kernels.running_sum(numpy.where(numpy.isnan(base), 0.0, base), self._period)
+
+    def calc_panel(self, panel):
+        base = panel.get(self._base)
+        return kernels.running_sum(numpy.where(numpy.isnan(base), 0.0, base), self._period)
+
+    def start(self, feed):
+        base = feed.get_series(self._base)
+        self._sum = streaming.RunningSum(self._period)
+        self._sum.prime(numpy.where(numpy.isnan(base), 0.0, base))
+
+    def update(self, bar):
+        value = Indicator.bar_value(bar, self._base)
+        return self._sum.update(0.0 if numpy.isnan(value) else value)
@@ -0,0 +1,428 @@
+'''
+hedgeit.feeds.indicators.kernels
+
+Vectorized rolling-window kernels that indicators are built on.  Each kernel
+takes a 1-d series and returns a new float64 array of the same length with
+NAN for the first period-1 entries (where the window is not yet full) and
+for any window that contains a NAN.  The kernels other than multi_* also
+accept a 2-d array and then work down each column independently (see 
+Panel), giving exactly the results of calling them for each column.  The
+multi_* kernels calculate talib.MAX or talib.MIN for a list of periods at
+once and return a 2-d array with one such row per period.
+
+Contains:
+    function sliding_window
+    function rolling_sum
+    function rolling_mean
+    function running_sum
+    function rolling_max
+    function rolling_min
+    function true_range
+    function rolling_linregress
+    function sma
+    function rsi
+    function wilder_atr
+    function multi_max
+    function multi_min
+'''
+import numpy
+from numpy.lib.stride_tricks import as_strided
+
+def sliding_window(series, period):
+    '''
+    Returns a read-only view of series with one row per full window, so
+    row i holds series[i:i+period].  No data is copied.  For a 2-d series 
+    each window is itself 2-d (period x columns).
+
+    :param series: data series
+    :type series: numpy array
+    :param int period: window length
+    '''
+    series = numpy.ascontiguousarray(series, dtype=numpy.float64)
+    if period < 1:
+        raise Exception("Invalid window period %d" % period)
+    rows = max(len(series) - period + 1, 0)
+    view = as_strided(series, shape=(rows, period) + series.shape[1:], 
+                      strides=(series.strides[0],) + series.strides)
+    view.flags.writeable = False
+    return view
+
+# windows up to this long are summed directly rather than by differencing
+# a cumulative sum, which avoids its cancellation error
+_DIRECT_SUM_PERIOD = 32
+
+def rolling_sum(series, period, partial=False):
+    '''
+    Moving sum over the last period values.  Long windows are computed from
+    a cumulative sum so the cost is independent of period.  Short windows 
+    are summed directly, which is just as fast and exact to within the 
+    rounding of the period terms themselves.
+
+    :param series: data series
+    :type series: numpy array
+    :param int period: window length
+    :param bool partial: if True, the first period-1 entries are the sums of
+                         the values so far instead of NAN
+    '''
+    series = numpy.asarray(series, dtype=numpy.float64)
+    if period < 1:
+        raise Exception("Invalid window period %d" % period)
+    nans = numpy.isnan(series)
+    if nans.any():
+        # a NAN would poison the cumulative sum for the rest of the series
+        ret = rolling_sum(numpy.where(nans, 0.0, series), period, partial)
+        ret[rolling_sum(nans.astype(numpy.float64), period, partial=True) > 0] = numpy.nan
+        return ret
+    ret = numpy.empty(series.shape)
+    if period <= _DIRECT_SUM_PERIOD:
+        # the terms are added one at a time (rather than by numpy.sum) so 
+        # that the order of the additions is fixed - streaming.RollingSum
+        # repeats it exactly
+        ret[period-1:] = _weighted_window_sum(series, period, None)
+        head = numpy.cumsum(series[:period-1], axis=0)
+    else:
+        cum = numpy.cumsum(series, axis=0)
+        ret[period-1:period] = cum[period-1:period]
+        ret[period:] = cum[period:] - cum[:-period]
+        head = cum[:period-1]
+    if partial:
+        ret[:period-1] = head
+    else:
+        ret[:period-1] = numpy.nan
+    return ret
+
+def rolling_mean(series, period):
+    '''
+    Simple moving average over the last period values.
+
+    :param series: data series
+    :type series: numpy array
+    :param int period: window length
+    '''
+    return rolling_sum(series, period) / period
+
+def running_sum(series, period):
+    '''
+    Moving sum over the last period values, with the sums of the values so
+    far for the first period-1 entries, kept as a running total that adds
+    each new value and then subtracts the one leaving the window.  As in
+    sma, laying those terms out in order lets a single cumulative sum 
+    reproduce the loop exactly.  Unlike rolling_sum, a NAN affects every
+    later value.
+
+    :param series: data series
+    :type series: numpy array
+    :param int period: window length
+    '''
+    series = numpy.asarray(series, dtype=numpy.float64)
+    if period < 1:
+        raise Exception("Invalid window period %d" % period)
+    head = series[:period]
+    h = len(head)
+    m = len(series) - h
+    terms = numpy.empty((1 + h + 2 * m,) + series.shape[1:])
+    terms[0] = 0.0
+    terms[1:1+h] = head
+    terms[1+h::2] = series[period:]
+    terms[2+h::2] = -series[:m]
+    cum = numpy.cumsum(terms, axis=0)
+    ret = numpy.empty(series.shape)
+    ret[:h] = cum[1:1+h]
+    ret[h:] = cum[2+h::2]
+    return ret
+
+def rolling_max(series, period):
+    '''
+    Highest value over the last period values.
+
+    :param series: data series
+    :type series: numpy array
+    :param int period: window length
+    '''
+    return _rolling_reduce(numpy.max, series, period)
+
+def rolling_min(series, period):
+    '''
+    Lowest value over the last period values.
+
+    :param series: data series
+    :type series: numpy array
+    :param int period: window length
+    '''
+    return _rolling_reduce(numpy.min, series, period)
+
+def true_range(high, low, close):
+    '''
+    Daily true range - the high/low range extended to include the previous
+    close.  The first bar has no previous close so it is just high - low.
+
+    :param high, low, close: price series
+    :type high, low, close: numpy array
+    '''
+    high = numpy.asarray(high, dtype=numpy.float64)
+    low = numpy.asarray(low, dtype=numpy.float64)
+    ret = high - low
+    if len(ret) > 1:
+        lastclose = numpy.asarray(close, dtype=numpy.float64)[:-1]
+        ret[1:] = numpy.maximum(lastclose, high[1:]) - numpy.minimum(lastclose, low[1:])
+    return ret
+
+def rolling_linregress(series, period):
+    '''
+    Least-squares straight line fit over the last period values, where x is
+    the position within the window (0 for the oldest value up to period-1
+    for the current one).  Computed in O(n) from running sums of y, y*y and
+    x*y rather than by solving each window separately.
+
+    :param series: data series
+    :type series: numpy array
+    :param int period: window length (must be at least 2)
+    :returns tuple: (slope, intercept, r2) arrays.  intercept is the fitted
+                    value at the oldest bar in the window, so the fitted 
+                    value at the current bar is intercept + slope*(period-1).
+                    r2 is NAN for a window with constant values.
+    '''
+    y = numpy.asarray(series, dtype=numpy.float64)
+    if period < 2:
+        raise Exception("Invalid regression period %d" % period)
+    n = len(y)
+    x = numpy.arange(period, dtype=numpy.float64)
+    sx = x.sum()
+    dx = period * numpy.dot(x, x) - sx * sx
+
+    # fitting y - offset instead of y keeps the running sums small, which
+    # matters for their precision, and only shifts the intercept.  The 
+    # first value is used (rather than say the mean) so that appending to
+    # the series does not change the results for the existing values.
+    valid = ~numpy.isnan(y)
+    offset = _first_valid(y, valid)
+    y = y - offset
+
+    sy = rolling_sum(y, period)
+    syy = rolling_sum(y * y, period)
+    sxy = numpy.empty(y.shape)
+    sxy[:period-1] = numpy.nan
+    if period <= _DIRECT_SUM_PERIOD:
+        sxy[period-1:] = _weighted_window_sum(y, period, x)
+    else:
+        # sum of x*y for the window ending at i is the sum of j*y[j] over
+        # the window less (i-period+1) times the sum of y.  Both terms grow
+        # with i so they are accumulated in extended precision (where the
+        # platform has it) to keep the difference accurate.
+        j = numpy.arange(n, dtype=numpy.longdouble).reshape((n,) + (1,) * (y.ndim - 1))
+        yl = numpy.where(valid, y, 0.0).astype(numpy.longdouble)
+        cjy = numpy.cumsum(j * yl, axis=0)
+        cy = numpy.cumsum(yl, axis=0)
+        if n >= period:
+            wjy = cjy[period-1:].copy()
+            wjy[1:] -= cjy[:-period]
+            wy = cy[period-1:].copy()
+            wy[1:] -= cy[:-period]
+            sxy[period-1:] = wjy - j[:n-period+1] * wy
+        sxy[numpy.isnan(sy)] = numpy.nan
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        num = period * sxy - sx * sy
+        slope = num / dx
+        intercept = (sy - slope * sx) / period + offset
+        r2 = num * num / (dx * (period * syy - sy * sy))
+    return (slope, intercept, r2)
+
+def sma(series, period):
+    '''
+    Simple moving average, identical to talib.SMA.  TA-Lib keeps a running
+    total that adds each new value and then subtracts the oldest - laying
+    those terms out in order lets a single cumulative sum reproduce it 
+    exactly.  Unlike rolling_mean, a NAN affects every later value.
+
+    :param series: data series
+    :type series: numpy array
+    :param int period: window length
+    '''
+    series = numpy.asarray(series, dtype=numpy.float64)
+    if period < 1:
+        raise Exception("Invalid window period %d" % period)
+    ret = numpy.empty(series.shape)
+    ret[:period-1] = numpy.nan
+    m = len(series) - period + 1
+    if m > 0:
+        terms = numpy.empty((period + 2 * m,) + series.shape[1:])
+        terms[0] = 0.0
+        terms[1:period] = series[:period-1]
+        terms[period::2] = series[period-1:]
+        terms[period+1::2] = -series[:m]
+        ret[period-1:] = numpy.cumsum(terms, axis=0)[period::2] / period
+    return ret
+
+def rsi(series, period):
+    '''
+    Relative strength index with Wilder smoothing, identical to talib.RSI.
+    The smoothing is a recurrence that rounds at every step, so it is 
+    stepped through in python - only the gains and losses are vectorized.
+
+    :param series: 1-d data series
+    :type series: numpy array
+    :param int period: smoothing period
+    '''
+    series = numpy.asarray(series, dtype=numpy.float64)
+    if period < 1:
+        raise Exception("Invalid window period %d" % period)
+    n = len(series)
+    ret = numpy.empty(n)
+    ret.fill(numpy.nan)
+    if period == 1:
+        # TA-Lib passes the input straight through
+        ret[1:] = series[1:]
+        return ret
+    if n <= period:
+        return ret
+    diffs = numpy.diff(series)
+    ups = numpy.where(diffs > 0, diffs, 0.0)
+    downs = (ups - diffs).tolist()
+    ups = ups.tolist()
+    gains = numpy.empty(n - period)
+    losses = numpy.empty(n - period)
+    # TA-Lib divides by the period as a multiplication by its reciprocal
+    inv = 1.0 / period
+    gain = 0.0
+    loss = 0.0
+    for k in range(0, period):
+        gain += ups[k]
+        loss += downs[k]
+    gain *= inv
+    loss *= inv
+    gains[0] = gain
+    losses[0] = loss
+    for k in range(period, n - 1):
+        gain = (gain * (period - 1) + ups[k]) * inv
+        loss = (loss * (period - 1) + downs[k]) * inv
+        gains[k-period+1] = gain
+        losses[k-period+1] = loss
+    total = gains + losses
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        ret[period:] = numpy.where(total > 0.0, 100.0 * (gains / total), 0.0)
+    return ret
+
+def wilder_atr(high, low, close, period):
+    '''
+    Average true range with Wilder smoothing, as calculated by talib.ATR.  
+    TA-Lib smooths with a fused multiply-add, which numpy can not do, so 
+    the results agree with it to within rounding rather than exactly.
+
+    :param high, low, close: price series
+    :type high, low, close: numpy array
+    :param int period: smoothing period
+    '''
+    if period < 1:
+        raise Exception("Invalid window period %d" % period)
+    tr = true_range(high, low, close)
+    n = len(tr)
+    ret = numpy.empty(n)
+    ret.fill(numpy.nan)
+    if period == 1:
+        # the first bar has no previous close, so TA-Lib has no value
+        ret[1:] = tr[1:]
+        return ret
+    if n <= period:
+        return ret
+    total = 0.0
+    for v in tr[1:period+1].tolist():
+        total += v
+    prev = total / period
+    ret[period] = prev
+    k = (period - 1.0) / period
+    terms = (tr * (1.0 - k)).tolist()
+    values = []
+    for i in range(period + 1, n):
+        prev = prev * k + terms[i]
+        values.append(prev)
+    ret[period+1:] = values
+    return ret
+
+def multi_max(series, periods):
+    '''
+    Highest value over the last period values for several periods, 
+    identical to talib.MAX for each period.  Uses a sparse table of the 
+    maxima of all windows whose length is a power of two, so each period 
+    costs one numpy.maximum over the series.
+
+    :param series: 1-d data series
+    :type series: numpy array
+    :param list periods: window lengths
+    :returns: numpy array of shape (len(periods), len(series))
+    '''
+    return _multi_extreme(numpy.maximum, series, periods)
+
+def multi_min(series, periods):
+    '''
+    Lowest value over the last period values for several periods, identical
+    to talib.MIN for each period (see multi_max).
+
+    :param series: 1-d data series
+    :type series: numpy array
+    :param list periods: window lengths
+    :returns: numpy array of shape (len(periods), len(series))
+    '''
+    return _multi_extreme(numpy.minimum, series, periods)
+
+def _multi_setup(series, periods):
+    series = numpy.asarray(series, dtype=numpy.float64)
+    for p in periods:
+        if p < 1:
+            raise Exception("Invalid window period %d" % p)
+    ret = numpy.empty((len(periods), len(series)))
+    ret.fill(numpy.nan)
+    return (series, ret)
+
+def _multi_extreme(func, series, periods):
+    series, ret = _multi_setup(series, periods)
+    n = len(series)
+    # levels[j][i] is the extreme of series[i:i+2**j]
+    levels = [series]
+    longest = max(periods) if len(periods) else 1
+    while 2 ** len(levels) <= min(longest, n):
+        prev = levels[-1]
+        half = 2 ** (len(levels) - 1)
+        levels.append(func(prev[:-half], prev[half:]))
+    for (k, p) in enumerate(periods):
+        m = n - p + 1
+        if m <= 0:
+            continue
+        # the window starting at i is covered by the two (overlapping)
+        # power of two windows starting at i and i+p-size
+        j = int(p).bit_length() - 1
+        size = 2 ** j
+        ret[k, p-1:] = func(levels[j][:m], levels[j][p-size:p-size+m])
+    return ret
+
+def _weighted_window_sum(series, period, weights):
+    # sum (or weighted sum) of each full window, adding the terms oldest 
+    # first.  Returns an array of len(series) - period + 1 values.
+    rows = max(len(series) - period + 1, 0)
+    if weights is None:
+        ret = series[:rows].copy()
+    else:
+        ret = weights[0] * series[:rows]
+    for k in range(1, period):
+        if weights is None:
+            ret += series[k:k+rows]
+        else:
+            ret += weights[k] * series[k:k+rows]
+    return ret
+
+def _first_valid(series, valid):
+    # first non-NAN value (of each column), or 0 if there is none
+    if series.ndim == 1:
+        return series[valid][0] if valid.any() else 0.0
+    if len(series) == 0:
+        return numpy.zeros(series.shape[1:])
+    first = valid.argmax(axis=0)
+    return numpy.where(valid.any(axis=0), series[first, numpy.arange(series.shape[1])], 0.0)
+
+def _rolling_reduce(func, series, period):
+    series = numpy.asarray(series, dtype=numpy.float64)
+    ret = numpy.empty(series.shape)
+    ret[:period-1] = numpy.nan
+    if len(series) >= period:
+        ret[period-1:] = func(sliding_window(series, period), axis=1)
+    return ret
@@ -5,7 +5,8 @@ Contains:
     class PriceVelocity
 '''
 from hedgeit.feeds.indicator import Indicator
-import numpy
+import kernels
+import streaming
 
 class PriceVelocity(Indicator):
     '''
@@ -24,22 +25,25 @@ class PriceVelocity(Indicator):
             raise Exception("Cannot instantiate PriceVelocity indicator without a base indicator!")
         self._base = baseIndicator
         
+    def params(self):
+        return (self._period,)
+
+    def depends(self):
+        return [self._base]
+
     def calc(self, feed):  
+        # slope of the least-squares line through the last period values
+        slope, intercept, r2 = kernels.rolling_linregress(feed.get_series(self._base), self._period)
+        return slope
+
+    def calc_panel(self, panel):
+        slope, intercept, r2 = kernels.rolling_linregress(panel.get(self._base), self._period)
+        return slope
+
+    def start(self, feed):
+        self._regress = streaming.LinRegress(self._period)
+        self._regress.prime(feed.get_series(self._base))
 
-        series = numpy.zeros(feed.len())
-        base = feed.get_series(self._base)
-        x = numpy.arange(0,self._period)
-        A = numpy.vstack([x, numpy.ones(len(x))]).T
-                
-        # first scan through the series and calculate daily true range
-        for i in range(0, feed.len()):
-            if i < (self._period - 1):
-                series[i] = numpy.NAN
-            else:
-                # alternate method that works fine too
-                # slope, intercept, r_value, p_value, std_err = stats.linregress(x,base[i-(self._period-1):i+1])
-                y = base[i-(self._period-1):i+1]
-                m, c = numpy.linalg.lstsq(A, y)[0]
-                series[i] = m
-                            
-        return series
\ No newline at end of file
+    def update(self, bar):
+        slope, intercept, r2 = self._regress.update(Indicator.bar_value(bar, self._base))
+        return slope
@@ -0,0 +1,460 @@
+'''
+hedgeit.feeds.indicators.streaming
+
+Stateful counterparts of the batch calculations behind the indicators, used
+to extend an indicator by one bar at a time (see Indicator.update).  Each
+class is first primed with the existing input series and then update()
+takes the next input value(s) and returns the next output value.  They
+repeat the batch arithmetic in the same order, so the results are identical
+to recalculating the whole series.
+
+update() takes constant (for MAX and MIN, amortized constant) time, except
+that RollingSum and LinRegress windows of up to kernels._DIRECT_SUM_PERIOD
+values are summed again on every update, in O(period).  The batch
+calculation sums short windows directly and a running sum would not give
+the same rounding.
+
+Contains:
+    class RollingSum    (kernels.rolling_sum)
+    class RunningSum    (kernels.running_sum)
+    class TrueRange     (kernels.true_range)
+    class LinRegress    (kernels.rolling_linregress)
+    class SMA           (talib.SMA)
+    class MAX           (talib.MAX)
+    class MIN           (talib.MIN)
+    class RSI           (talib.RSI)
+'''
+import collections
+import math
+import numpy
+from hedgeit.feeds.indicators import kernels
+
+NAN = float('nan')
+
+def _zero_nan(value):
+    return 0.0 if math.isnan(value) else value
+
+class RollingSum(object):
+    '''Moving sum over the last period values (see kernels.rolling_sum).'''
+
+    def __init__(self, period, partial=False):
+        '''
+        Constructor
+
+        :param int period: window length
+        :param bool partial: if True, the first period-1 values are the sums
+                             of the values so far instead of NAN
+        '''
+        if period < 1:
+            raise Exception("Invalid window period %d" % period)
+        self._period = period
+        self._partial = partial
+        self._direct = period <= kernels._DIRECT_SUM_PERIOD
+        self.prime(numpy.zeros(0))
+
+    def prime(self, series):
+        '''
+        Sets the state to follow series.
+
+        :param series: the values so far
+        :type series: numpy array
+        '''
+        series = numpy.asarray(series, dtype=numpy.float64)
+        p = self._period
+        nans = numpy.isnan(series)
+        values = numpy.where(nans, 0.0, series)
+        self._count = len(series)
+        # flags of the values in the current (possibly partial) window
+        self._nanflags = collections.deque(nans[-p:].tolist(), maxlen=p)
+        self._nancount = sum(self._nanflags)
+        # values in the current window (short windows), or the cumulative
+        # sums for the current window and the one before it (long windows)
+        # plus the running sum, which is only needed until the first window
+        # is full for short windows
+        if self._direct:
+            self._window = collections.deque(values[-p:].tolist(), maxlen=p)
+            cum = numpy.cumsum(values[:p-1])
+        else:
+            cum = numpy.cumsum(values)
+            self._window = collections.deque(cum[-(p+1):].tolist(), maxlen=p+1)
+        self._cum = float(cum[-1]) if len(cum) else 0.0
+
+    def update(self, value):
+        '''
+        Returns the sum of the window ending with value.  O(period) for
+        short windows, which are summed directly (see the module
+        docstring), constant time otherwise.
+
+        :param float value: next value in the series
+        '''
+        p = self._period
+        isnan = math.isnan(value)
+        if isnan:
+            value = 0.0
+        if len(self._nanflags) == p:
+            self._nancount -= self._nanflags[0]
+        self._nanflags.append(isnan)
+        self._nancount += isnan
+        self._count += 1
+
+        if self._direct:
+            self._window.append(value)
+            if self._count < p:
+                self._cum += value
+                ret = self._cum
+            else:
+                # the same order of additions as the batch calculation
+                ret = None
+                for v in self._window:
+                    if ret == None:
+                        ret = v
+                    else:
+                        ret += v
+        else:
+            self._cum += value
+            self._window.append(self._cum)
+            if self._count <= p:
+                ret = self._cum
+            else:
+                ret = self._cum - self._window[0]
+
+        if (self._count < p and not self._partial) or self._nancount:
+            return NAN
+        return ret
+
+class TrueRange(object):
+    '''Daily true range (see kernels.true_range).'''
+
+    def __init__(self):
+        '''Constructor'''
+        self._lastclose = None
+
+    def prime(self, high, low, close):
+        '''
+        Sets the state to follow the price series.
+
+        :param high, low, close: the prices so far
+        :type high, low, close: numpy array
+        '''
+        self._lastclose = float(close[-1]) if len(close) else None
+
+    def update(self, high, low, close):
+        '''
+        Returns the true range for the next bar.
+
+        :param float high, low, close: prices of the next bar
+        '''
+        if self._lastclose == None:
+            ret = high - low
+        else:
+            ret = float(numpy.maximum(self._lastclose, high) - numpy.minimum(self._lastclose, low))
+        self._lastclose = close
+        return ret
+
+class LinRegress(object):
+    '''
+    Least-squares straight line fit over the last period values (see
+    kernels.rolling_linregress).
+    '''
+
+    def __init__(self, period):
+        '''
+        Constructor
+
+        :param int period: window length (must be at least 2)
+        '''
+        if period < 2:
+            raise Exception("Invalid regression period %d" % period)
+        self._period = period
+        self._direct = period <= kernels._DIRECT_SUM_PERIOD
+        x = numpy.arange(period, dtype=numpy.float64)
+        self._sx = x.sum()
+        self._dx = period * numpy.dot(x, x) - self._sx * self._sx
+        self._x = x.tolist()
+        self._sy = RollingSum(period)
+        self._syy = RollingSum(period)
+        self.prime(numpy.zeros(0))
+
+    def prime(self, series):
+        '''
+        Sets the state to follow series.
+
+        :param series: the values so far
+        :type series: numpy array
+        '''
+        series = numpy.asarray(series, dtype=numpy.float64)
+        p = self._period
+        valid = ~numpy.isnan(series)
+        self._offset = series[valid][0] if valid.any() else None
+        y = series - (self._offset if self._offset != None else 0.0)
+        self._count = len(y)
+        self._sy.prime(y)
+        self._syy.prime(y * y)
+        if self._direct:
+            self._window = collections.deque(y[-p:].tolist(), maxlen=p)
+        else:
+            j = numpy.arange(len(y), dtype=numpy.longdouble)
+            yl = numpy.where(valid, y, 0.0).astype(numpy.longdouble)
+            self._cjy = collections.deque(numpy.cumsum(j * yl)[-(p+1):], maxlen=p+1)
+            self._cy = collections.deque(numpy.cumsum(yl)[-(p+1):], maxlen=p+1)
+
+    def update(self, value):
+        '''
+        Returns (slope, intercept, r2) for the window ending with value.
+        O(period) for short windows, like RollingSum.update.
+
+        :param float value: next value in the series
+        '''
+        p = self._period
+        if self._offset == None and not math.isnan(value):
+            self._offset = numpy.float64(value)
+        y = numpy.float64(value) - (self._offset if self._offset != None else 0.0)
+        i = self._count
+        self._count += 1
+        sy = numpy.float64(self._sy.update(y))
+        syy = numpy.float64(self._syy.update(y * y))
+
+        if self._direct:
+            self._window.append(y)
+            if self._count < p:
+                sxy = NAN
+            else:
+                sxy = None
+                for (k, v) in zip(self._x, self._window):
+                    if sxy == None:
+                        sxy = k * v
+                    else:
+                        sxy += k * v
+        else:
+            yl = numpy.longdouble(_zero_nan(y))
+            last = self._cjy[-1] if len(self._cjy) else numpy.longdouble(0.0)
+            self._cjy.append(last + numpy.longdouble(i) * yl)
+            last = self._cy[-1] if len(self._cy) else numpy.longdouble(0.0)
+            self._cy.append(last + yl)
+            if self._count < p:
+                sxy = NAN
+            elif self._count == p:
+                sxy = float(self._cjy[-1] - numpy.longdouble(0) * self._cy[-1])
+            else:
+                wjy = self._cjy[-1] - self._cjy[0]
+                wy = self._cy[-1] - self._cy[0]
+                sxy = float(wjy - numpy.longdouble(i - p + 1) * wy)
+            if math.isnan(sy):
+                sxy = NAN
+
+        sxy = numpy.float64(sxy)
+        offset = self._offset if self._offset != None else 0.0
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            num = p * sxy - self._sx * sy
+            slope = num / self._dx
+            intercept = (sy - slope * self._sx) / p + offset
+            r2 = num * num / (self._dx * (p * syy - sy * sy))
+        return (float(slope), float(intercept), float(r2))
+
+class RunningSum(object):
+    '''
+    Moving sum kept as a running total, with partial sums until the window
+    is full (see kernels.running_sum).
+    '''
+
+    def __init__(self, period):
+        '''
+        Constructor
+
+        :param int period: window length
+        '''
+        if period < 1:
+            raise Exception("Invalid window period %d" % period)
+        self._period = period
+        self.prime(numpy.zeros(0))
+
+    def prime(self, series):
+        '''
+        Sets the state to follow series.
+
+        :param series: the values so far
+        :type series: numpy array
+        '''
+        series = numpy.asarray(series, dtype=numpy.float64)
+        self._total = float(kernels.running_sum(series, self._period)[-1]) if len(series) else 0.0
+        self._window = collections.deque(series[-self._period:].tolist(), maxlen=self._period)
+
+    def update(self, value):
+        '''
+        Returns the sum of the window ending with value.
+
+        :param float value: next value in the series
+        '''
+        self._total += value
+        if len(self._window) == self._period:
+            self._total -= self._window[0]
+        self._window.append(value)
+        return self._total
+
+class SMA(object):
+    '''Simple moving average, as calculated by TA-Lib.'''
+
+    def __init__(self, timeperiod):
+        '''
+        Constructor
+
+        :param int timeperiod: window length
+        '''
+        self._period = timeperiod
+        self.prime(numpy.zeros(0))
+
+    def prime(self, series):
+        '''
+        Sets the state to follow series.
+
+        :param series: the values so far
+        :type series: numpy array
+        '''
+        series = numpy.asarray(series, dtype=numpy.float64)
+        p = self._period
+        n = len(series)
+        # TA-Lib keeps a running total that adds each new value and then
+        # subtracts the oldest.  Laying those terms out in order lets a
+        # cumulative sum reproduce its final value exactly.
+        m = max(n - p + 1, 0)
+        head = series[:min(n, p-1)]
+        terms = numpy.empty(1 + len(head) + 2 * m)
+        terms[0] = 0.0
+        terms[1:1+len(head)] = head
+        terms[1+len(head)::2] = series[p-1:]
+        terms[2+len(head)::2] = -series[:m]
+        self._total = float(numpy.cumsum(terms)[-1])
+        self._count = n
+        self._window = collections.deque(series[-p:].tolist(), maxlen=p)
+
+    def update(self, value):
+        '''
+        Returns the average of the window ending with value.
+
+        :param float value: next value in the series
+        '''
+        p = self._period
+        self._window.append(value)
+        self._count += 1
+        self._total += value
+        if self._count < p:
+            return NAN
+        ret = self._total / p
+        self._total -= self._window[0]
+        return ret
+
+class _Extreme(object):
+
+    def __init__(self, timeperiod):
+        self._period = timeperiod
+        self.prime(numpy.zeros(0))
+
+    def prime(self, series):
+        '''
+        Sets the state to follow series.
+
+        :param series: the values so far
+        :type series: numpy array
+        '''
+        series = numpy.asarray(series, dtype=numpy.float64)
+        # monotonic deque of (index, value) - candidates for the extreme of
+        # the current or a later window
+        self._deque = collections.deque()
+        self._count = len(series) - min(len(series), self._period)
+        for v in series[-self._period:].tolist():
+            self._push(v)
+
+    def update(self, value):
+        '''
+        Returns the extreme of the window ending with value.
+
+        :param float value: next value in the series
+        '''
+        self._push(value)
+        if self._count < self._period:
+            return NAN
+        return self._deque[0][1]
+
+    def _push(self, value):
+        d = self._deque
+        while d and not self._better(d[-1][1], value):
+            d.pop()
+        d.append((self._count, value))
+        self._count += 1
+        if d[0][0] <= self._count - 1 - self._period:
+            d.popleft()
+
+class MAX(_Extreme):
+    '''Highest value over the last timeperiod values, as calculated by TA-Lib.'''
+
+    def _better(self, kept, value):
+        return kept > value
+
+class MIN(_Extreme):
+    '''Lowest value over the last timeperiod values, as calculated by TA-Lib.'''
+
+    def _better(self, kept, value):
+        return kept < value
+
+class RSI(object):
+    '''
+    Relative strength index with Wilder smoothing, as calculated by TA-Lib.
+    '''
+
+    def __init__(self, timeperiod):
+        '''
+        Constructor
+
+        :param int timeperiod: smoothing period
+        '''
+        self._period = timeperiod
+        self.prime(numpy.zeros(0))
+
+    def prime(self, series):
+        '''
+        Sets the state to follow series.  The smoothing is a recurrence, so
+        this replays the whole series.
+
+        :param series: the values so far
+        :type series: numpy array
+        '''
+        self._count = 0
+        self._prev = None
+        self._gain = 0.0
+        self._loss = 0.0
+        for v in numpy.asarray(series, dtype=numpy.float64).tolist():
+            self.update(v)
+
+    def update(self, value):
+        '''
+        Returns the RSI for the next value.
+
+        :param float value: next value in the series
+        '''
+        p = self._period
+        i = self._count
+        self._count += 1
+        if p == 1:
+            # TA-Lib passes the input straight through
+            return NAN if i < 1 else value
+        if self._prev == None:
+            self._prev = value
+            return NAN
+        diff = value - self._prev
+        self._prev = value
+        if i > p:
+            self._loss *= (p - 1)
+            self._gain *= (p - 1)
+        if diff < 0:
+            self._loss -= diff
+        else:
+            self._gain += diff
+        if i < p:
+            return NAN
+        # TA-Lib divides by the period as a multiplication by its reciprocal
+        self._loss *= (1.0 / p)
+        self._gain *= (1.0 / p)
+        total = self._gain + self._loss
+        if total > 0.0:
+            return 100.0 * (self._gain / total)
+        return 0.0
@@ -0,0 +1,100 @@
+'''
+hedgeit.feeds.indicators.ta
+
+The TA-Lib functions used by talibfunc, with the same signatures as in the
+talib module.  Each call is passed on to a backend:
+
+    numpy - the vectorized kernels.  SMA, MAX, MIN and RSI are identical to
+            TA-Lib.  ATR agrees to within rounding (see kernels.wilder_atr).
+    talib - the TA-Lib C library, if it is installed.
+
+The backend is chosen on first use - TA-Lib if it can be imported, numpy
+otherwise - so importing this module (and the strategies built on it) does
+not load TA-Lib, and processes without it installed still work.  Use
+set_backend() to choose one explicitly.
+
+Contains:
+    function SMA
+    function MAX
+    function MIN
+    function RSI
+    function ATR
+    function backend
+    function set_backend
+'''
+import kernels
+
+_NUMPY = { 'SMA' : kernels.sma,
+           'MAX' : kernels.rolling_max,
+           'MIN' : kernels.rolling_min,
+           'RSI' : kernels.rsi,
+           'ATR' : kernels.wilder_atr }
+
+# name of the backend in use and its functions, set on first use
+_backend = None
+_funcs = None
+
+def SMA(real, timeperiod=30):
+    """Simple Moving Average"""
+    return _get('SMA')(real, timeperiod)
+
+def MAX(real, timeperiod=30):
+    """Highest value over a specified period"""
+    return _get('MAX')(real, timeperiod)
+
+def MIN(real, timeperiod=30):
+    """Lowest value over a specified period"""
+    return _get('MIN')(real, timeperiod)
+
+def RSI(real, timeperiod=14):
+    """Relative Strength Index"""
+    return _get('RSI')(real, timeperiod)
+
+def ATR(high, low, close, timeperiod=14):
+    """Average True Range"""
+    return _get('ATR')(high, low, close, timeperiod)
+
+def backend():
+    '''Returns the name of the backend in use ('numpy' or 'talib').'''
+    _get('SMA')
+    return _backend
+
+def set_backend(name):
+    '''
+    Selects the backend.
+
+    :param str name: 'numpy', 'talib' or None to choose on next use
+
+    :raises: Exception if the backend is unknown or can not be loaded
+    '''
+    global _backend, _funcs
+    if name == None:
+        _backend = None
+        _funcs = None
+    elif name == 'numpy':
+        _backend = name
+        _funcs = _NUMPY
+    elif name == 'talib':
+        funcs = _load_talib()
+        if funcs == None:
+            raise Exception("TA-Lib is not installed")
+        _backend = name
+        _funcs = funcs
+    else:
+        raise Exception("Unknown indicator backend %s" % name)
+
+def _get(name):
+    if _funcs == None:
+        set_backend('talib' if _load_talib() != None else 'numpy')
+    return _funcs[name]
+
+def _load_talib():
+    try:
+        import talib
+    except ImportError:
+        return None
+    return { 'SMA' : talib.SMA,
+             'MAX' : talib.MAX,
+             'MIN' : talib.MIN,
+             'RSI' : talib.RSI,
+             'ATR' : talib.ATR }
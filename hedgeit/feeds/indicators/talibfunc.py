@@ -4,7 +4,10 @@ Created on Jan 21, 2013
 @author: rtw
 '''
 from hedgeit.feeds.indicator import Indicator
-import talib
+import kernels
+import numpy
+import streaming
+import ta
 
 # Calls a talib function with the last values of a dataseries.
 def call_talib_with_c(feed, talibFunc, *parameters):
@@ -44,26 +47,106 @@ class TalibFunc(Indicator):
         self._talibhelper = talibhelper
         self._parms = parameters
 
+    def params(self):
+        return (self._talibfunc, self._talibhelper, self._parms)
+
+    def depends(self):
+        if self._talibhelper == call_talib_with_hlc:
+            return ['High', 'Low', 'Close']
+        return ['Close']
+
+    def inputs(self, feed):
+        # the calculation uses the feed given to the constructor
+        return [self._feed.get_series(n) for n in self.depends()]
+
     def calc(self, feed):
         return self._talibhelper(self._feed, self._talibfunc, *self._parms)  
+
+    def calc_panel(self, panel):
+        if self._talibhelper != call_talib_with_c or not _PANEL.has_key(self._talibfunc):
+            return None
+        close = panel.get("Close")
+        # TA-Lib's handling of NAN is not reproduced, so any in the bars 
+        # themselves (rather than the padding) means calculating per Feed
+        if numpy.isnan(close).sum() > close.size - sum(panel.lengths()):
+            return None
+        return _PANEL[self._talibfunc](close, *self._parms)
+
+    def start(self, feed):
+        if self._talibhelper != call_talib_with_c or not _STREAMING.has_key(self._talibfunc):
+            raise Exception("Indicator %s does not support incremental updates" % self.name())
+        self._state = _STREAMING[self._talibfunc](*self._parms)
+        self._state.prime(self._feed.get_series("Close"))
+
+    def update(self, bar):
+        return self._state.update(bar.close())
         
 def ATR(name,feed,timeperiod):
     """Average True Range"""
-    return TalibFunc(name,feed,talib.ATR,call_talib_with_hlc,timeperiod) 
+    return TalibFunc(name,feed,ta.ATR,call_talib_with_hlc,timeperiod) 
 
 def MAX(name,feed,timeperiod):
     """Highest value over a specified period"""
-    return TalibFunc(name,feed,talib.MAX,call_talib_with_c,timeperiod) 
+    return TalibFunc(name,feed,ta.MAX,call_talib_with_c,timeperiod) 
         
 def MIN(name,feed,timeperiod):
     """Lowest value over a specified period"""
-    return TalibFunc(name,feed,talib.MIN,call_talib_with_c,timeperiod) 
+    return TalibFunc(name,feed,ta.MIN,call_talib_with_c,timeperiod) 
 
 def SMA(name,feed,timeperiod):
     """Simple Moving Average"""
-    return TalibFunc(name,feed,talib.SMA,call_talib_with_c,timeperiod) 
+    return TalibFunc(name,feed,ta.SMA,call_talib_with_c,timeperiod) 
 
 def RSI(name,feed,timeperiod):
     """Relative Strength Index"""
-    return TalibFunc(name,feed,talib.RSI,call_talib_with_c,timeperiod)
+    return TalibFunc(name,feed,ta.RSI,call_talib_with_c,timeperiod)
+
+def insert_periods(feed, func, periods, names=None):
+    """
+    Calculates SMA, MAX, MIN or RSI for several periods in one call (see
+    kernels.multi_max and kernels.multi_min) and adds the row for each period to the feed's
+    IndicatorCache as the series of the equivalent indicator.  Inserting
+    say SMA('short_ma', feed, 20) afterwards - for instance by each run of
+    a parameter sweep that shares the cache - then uses the row as is.
+
+    :param Feed feed: feed to calculate the indicators for
+    :param function func: SMA, MAX, MIN or RSI from this module
+    :param list periods: periods to calculate
+    :param list names: if present, the rows are also inserted in the feed
+                       under these names (one per period)
+    :returns: numpy array of shape (len(periods), feed.len())
+    """
+    if not _MULTI.has_key(func):
+        raise Exception("No multi-period calculation for %s" % func.__name__)
+    if names != None and len(names) != len(periods):
+        raise Exception("Need one name per period")
+    rows = _MULTI[func](feed.get_series("Close"), periods)
+    cache = feed.indicator_cache()
+    for k in range(0, len(periods)):
+        ind = func(names[k] if names != None else None, feed, periods[k])
+        cache.put(ind.cache_key(feed), rows[k], ind.inputs(feed))
+        if names != None:
+            feed.insert(ind)
+    return rows
+
+def _each_period(talibfunc):
+    # one single period calculation (with either backend, see ta) for each
+    # period
+    return lambda series, periods: \
+        numpy.array([talibfunc(series, p) for p in periods]).reshape(len(periods), len(series))
+
+_MULTI = { SMA : _each_period(ta.SMA),
+           MAX : kernels.multi_max,
+           MIN : kernels.multi_min,
+           RSI : _each_period(ta.RSI) }
+
+# kernels that calculate the talib functions for a whole Panel
+_PANEL = { ta.SMA : kernels.sma,
+           ta.MAX : kernels.rolling_max,
+           ta.MIN : kernels.rolling_min }
 
+# streaming counterparts of the talib functions that support Feed.append
+_STREAMING = { ta.SMA : streaming.SMA,
+               ta.MAX : streaming.MAX,
+               ta.MIN : streaming.MIN,
+               ta.RSI : streaming.RSI }
@@ -4,10 +4,10 @@ hedgeit.feeds.instrument
 Contains:
   class Instrument
 '''
-import csv
-from csvparser import PremiumDataParser
+from loader import read_columns
+from hedgeit.feeds.bar import Bar
 from hedgeit.common.logger import getLogger
-import os
+import threading
 
 logger = getLogger("hedgeit.feeds")
 
@@ -18,10 +18,14 @@ class Instrument(object):
     feed format input via .csv file.  In the future Instrument may become
     an abstract base class to support different historical and/or real-time
     data feeds
+
+    Bar data is loaded lazily from the datafile on first access and then
+    memoized, so any number of Feeds can be built for an Instrument while
+    only paying for the load once.
     '''
 
     def __init__(self, symbol, datafile, pointValue=1, currency='USD', exchange='', \
-                 initialMargin=0, maintMargin=0, sector='',description=''):
+                 initialMargin=0, maintMargin=0, sector='',description='', cache=None):
         '''
         Constructor
         
@@ -33,6 +37,8 @@ class Instrument(object):
         :param number initialMargin: initial margin requirement per contract
         :param number maintMargin: maintenance margin requirement per contract
         :param str sector: arbtrary sector designation for the instrument
+        :param ColumnCache cache: if present, binary cache used to avoid 
+                                  re-parsing an unchanged datafile
         '''        
         self._symbol = symbol
         self._datafile = datafile
@@ -43,16 +49,75 @@ class Instrument(object):
         self._maintMargin = maintMargin
         self._sector = sector
         self._description = description
-        self._bars = []
+        self._cache = cache
+        self._columns = None
+        self._datetimes = None
+        self._bars = None
+        self._loaded = False
+        self._lock = threading.Lock()
         
     def symbol(self):
         '''Returns the symbol.'''
         return self._symbol
     
     def bars(self):
-        '''Returns the list of Bar instances.'''
+        '''
+        Returns the list of Bar instances.  The Bar instances are only built
+        (from the columns) on first access since Feed works directly with
+        columns().
+        '''
+        if self._bars == None:
+            bars = []
+            cols = self.columns()
+            if cols != None:
+                dates = self.datetimes()
+                layout = {}
+                for i in range(0, len(dates)):
+                    bars.append( Bar(dates[i], cols['Open'][i], cols['High'][i],
+                                     cols['Low'][i], cols['Close'][i], 
+                                     cols['Volume'][i], None, layout=layout) )
+            self._bars = bars
         return self._bars
+
+    def columns(self):
+        '''
+        Returns the bar data as a dict of numpy arrays keyed by 'Date', 'Open',
+        'High', 'Low', 'Close', 'Volume', and 'Open Interest', or None if the
+        datafile does not exist.  The datafile is loaded on first access.
+        '''
+        self._ensure_loaded()
+        return self._columns
+
+    def datetimes(self):
+        '''Returns the list of datetime instances corresponding to each bar.'''
+        if self._datetimes == None:
+            cols = self.columns()
+            if cols == None:
+                self._datetimes = []
+            else:
+                self._datetimes = cols['Date'].astype('datetime64[us]').tolist()
+        return self._datetimes
+
+    def set_columns(self, columns):
+        '''
+        Sets the bar data for the instrument (as returned by 
+        hedgeit.feeds.loader.read_columns) when it has been loaded elsewhere.
+        '''
+        with self._lock:
+            self._set(columns)
+
+    def is_loaded(self):
+        '''Returns True if the bar data has been loaded.'''
+        return self._loaded
     
+    def datafile(self):
+        '''Returns the datafile name.'''
+        return self._datafile
+
+    def cache(self):
+        '''Returns the ColumnCache used for the datafile (may be None).'''
+        return self._cache
+
     def point_value(self):
         '''Returns the point value.'''
         return self._pointValue
@@ -82,22 +147,27 @@ class Instrument(object):
         return self._description
     
     def load_data(self):
-        '''Loads Bar data from the datafile.'''
-        if not os.path.exists(self._datafile):
-            logger.error('Unable to locate datafile %s for %s' % (self._datafile, self._symbol))
-            return
-
-        # need to peek at the first line of the file and see if there is a header row
-        rowparser = PremiumDataParser()
-        f = open(self._datafile)
-        if f.readline().find('Date') != -1:
-            fieldnames = None
-        else:
-            fieldnames=rowparser.getFieldNames()
-        f.close()
-        reader = csv.DictReader(open(self._datafile, "r"), fieldnames=fieldnames, delimiter=rowparser.getDelimiter())
-        for row in reader:
-            bar_ = rowparser.parseBar(row)
-            if bar_ != None:
-                self._bars.append( bar_ )
-        logger.debug('First bar for symbol %s: %s' % (self._symbol,self._bars[0].datetime()))
\ No newline at end of file
+        '''
+        Loads (or re-loads) Bar data from the datafile.  It is not normally 
+        necessary to call this since the data is loaded on first access.
+        '''
+        with self._lock:
+            self._load()
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                # may have been loaded by another thread while we waited
+                if not self._loaded:
+                    self._load()
+
+    def _load(self):
+        self._set(read_columns(self._datafile, self._cache))
+
+    def _set(self, columns):
+        self._datetimes = None
+        self._bars = None
+        if columns != None and len(columns['Date']):
+            logger.debug('First bar for symbol %s: %s' % (self._symbol,columns['Date'][0]))
+        self._columns = columns
+        self._loaded = True
@@ -0,0 +1,111 @@
+'''
+hedgeit.feeds.loader
+
+Contains:
+  function read_columns
+  function load_columns
+  function load_instruments
+'''
+from csvparser import PremiumDataParser
+from hedgeit.common.logger import getLogger
+from multiprocessing import Pool, cpu_count, current_process
+from multiprocessing.pool import ThreadPool
+import os
+
+logger = getLogger("hedgeit.feeds")
+
+def read_columns(datafile, cache=None):
+    '''
+    Reads and validates the bar data in one datafile.
+
+    :param str datafile: csv file containing historical bar data
+    :param ColumnCache cache: if present, binary cache consulted before (and
+                              updated after) parsing the datafile.  Failing
+                              to update it is only logged.
+    :returns dict: maps column name to numpy array, or None if the datafile
+                   does not exist
+    '''
+    if not os.path.exists(datafile):
+        logger.error('Unable to locate datafile %s' % datafile)
+        return None
+    columns = None
+    if cache != None:
+        columns = cache.load(datafile)
+    if columns == None:
+        columns = PremiumDataParser().parseColumns(datafile)
+        if cache != None:
+            try:
+                cache.store(datafile, columns)
+            except (IOError, OSError) as e:
+                logger.warning('Unable to cache datafile %s: %s' % (datafile, e))
+    return columns
+
+_CACHED = 'cached'
+
+def _read_task(args):
+    datafile, cache, mapped = args
+    columns = read_columns(datafile, cache)
+    if mapped and columns != None and cache != None:
+        # the parent will map the (now current) cache entry itself, which is
+        # cheaper than pickling the arrays back to it
+        return _CACHED
+    return columns
+
+def load_columns(datafiles, workers=1, processes=True, caches=None):
+    '''
+    Reads a set of datafiles using a pool of workers.  The result is identical
+    to calling read_columns() for each datafile in turn.
+
+    :param list datafiles: csv files containing historical bar data
+    :param int workers: number of workers.  If None, one per CPU is used.  If
+                        1 (or there is only one datafile) everything is read
+                        in the calling process.
+    :param bool processes: if True the workers are processes, otherwise they
+                           are threads.  Parsing is mostly pure python so
+                           processes are needed to use more than one core.
+                           A daemonic process (e.g. a multiprocessing.Pool
+                           worker) can't start any, so reads everything
+                           itself.
+    :param list caches: if present, the ColumnCache (or None) for each
+                        datafile
+    :returns list: the columns for each datafile, in the same order
+    '''
+    if caches == None:
+        caches = [None] * len(datafiles)
+    if workers == None:
+        workers = cpu_count()
+    workers = min(workers, len(datafiles))
+    if workers > 1 and processes and current_process().daemon:
+        logger.debug('Loading datafiles in-process from daemonic process %s' % current_process().name)
+        workers = 1
+
+    if workers <= 1:
+        return [read_columns(f, c) for f, c in zip(datafiles, caches)]
+
+    if processes:
+        pool = Pool(workers)
+    else:
+        pool = ThreadPool(workers)
+    try:
+        ret = pool.map(_read_task, [(f, c, processes) for f, c in zip(datafiles, caches)], chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    for i in range(0, len(ret)):
+        if isinstance(ret[i], str):
+            ret[i] = read_columns(datafiles[i], caches[i])
+    return ret
+
+def load_instruments(instruments, workers=1, processes=True):
+    '''
+    Loads the bar data for each Instrument that is not already loaded using
+    a pool of workers (see load_columns).
+
+    :param list instruments: Instrument instances to load
+    '''
+    insts = [i for i in instruments if not i.is_loaded()]
+    columns = load_columns([i.datafile() for i in insts], workers=workers,
+                           processes=processes, caches=[i.cache() for i in insts])
+    for i in range(0, len(insts)):
+        insts[i].set_columns(columns[i])
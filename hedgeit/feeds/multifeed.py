@@ -5,21 +5,50 @@ Contains:
   class MultiFeed
 '''
 import hedgeit.common.observer as observer
+from hedgeit.feeds.db import InstrumentDb
+from hedgeit.feeds.feed import Feed
 from bars import Bars
 import datetime
+import numpy
+
+def _to_int64(dt):
+    '''Returns a datetime as microseconds since the epoch.'''
+    return numpy.datetime64(dt, 'us').astype('int64')
 
 class MultiFeed(object):
     '''
     MultiFeed is an aggregator of multiple feeds.  This is essential for any
     portfolio-based strategy and an instance of this class serves as the core
     for Strategy execution.
+
+    MultiFeed steps through a master calendar - the sorted union of the dates
+    in all of its feeds along with the feeds that have a bar on each date -
+    that is built once on first use (and again if a feed is registered 
+    later).  Stepping one date only touches the feeds active on that date and
+    set_cursor is a binary search into the calendar.
     '''
     
-    def __init__(self):
-        '''Constructor.'''
+    def __init__(self, store=None, symbols=None):
+        '''
+        Constructor.
+        
+        :param FeedStore store: if present, a Feed attached to the store is
+                                registered for each symbol
+        :param list symbols: symbols to attach to when store is present.  If
+                             None, all symbols in the store are used.
+        '''
         self._feeds = {}
         self._on_bars_event = observer.Event()
         self._current_bars = {}
+        self._calendar = None
+        self._dates = None
+        self._active = None
+        self._pos = 0
+        if store != None:
+            if symbols == None:
+                symbols = store.symbols()
+            for sym in symbols:
+                self.register_feed(Feed(InstrumentDb.Instance().get(sym), store=store))
         
     def register_feed(self, feed):
         '''
@@ -33,6 +62,7 @@ class MultiFeed(object):
         if self._feeds.has_key(feed.instrument().symbol()):
             raise Exception("MultiFeed already has a Feed for symbol %s" % feed.instrument().symbol())
         self._feeds[feed.instrument().symbol()] = feed
+        self._calendar = None
         
     def symbols(self):
         '''Returns a list of the symbols in the MultiFeed.'''
@@ -66,8 +96,7 @@ class MultiFeed(object):
         '''
         # first reset all feeds to the start if we need to
         if first != None:
-            for f in self._feeds:
-                self._feeds[f].set_cursor(first)
+            self.set_cursor(first)
         # simply some checks below by setting last to an arbitrary future date
         if last == None:
             last = datetime.datetime(9999,12,31)
@@ -86,17 +115,13 @@ class MultiFeed(object):
             
     def get_next_bars_date(self):
         '''Returns the next datetime that will be emitted from this feeds.'''
-        # all feeds may or may not have the same bars - we need to return the
-        # smallest datetime at the head of one of our feeds
-        smallestDateTime = None
-
-        # Make a first pass to get the smallest datetime.
-        for symbol, feed in self._feeds.iteritems():
-            if feed.get_next_bar_date() != None:
-                if (smallestDateTime != None and feed.get_next_bar_date() < smallestDateTime) or smallestDateTime == None:
-                    smallestDateTime = feed.get_next_bar_date()                    
-
-        return smallestDateTime
+        # all feeds may or may not have the same bars - this is the smallest
+        # datetime at the head of one of our feeds
+        self._ensure_calendar()
+        if self._pos < len(self._dates):
+            return self._dates[self._pos]
+        else:
+            return None
         
     def set_cursor(self, datetime=None):
         '''
@@ -111,20 +136,66 @@ class MultiFeed(object):
         '''
         for symbol, feed in self._feeds.iteritems():
             feed.set_cursor(datetime)
+        self._ensure_calendar()
+        if datetime != None:
+            self._pos = int(numpy.searchsorted(self._calendar, _to_int64(datetime)))
+        else:
+            self._pos = 0
         
     def _fetch_next_bars(self, smallestDateTime):
-        '''Find the next earliest datetime and emit all Bars that have an entry for it.'''
+        '''Emit all Bars that have an entry for the next datetime in the calendar.'''
         if smallestDateTime == None:
             return None
 
-        # Make a second pass to get all the bars that had the smallest datetime.
         self._current_bars = Bars()
-        for symbol, feed in self._feeds.iteritems():
-            if feed.get_next_bar_date() == smallestDateTime:
-                self._current_bars.add_bar(symbol, feed.get_current_bar())
+        for (symbol, feed) in self._active[self._pos]:
+            self._current_bars.add_bar(symbol, feed.get_current_bar())
+        self._pos += 1
 
         return self._current_bars
     
+    def _ensure_calendar(self):
+        if self._calendar is not None:
+            return
+        
+        symbols = self._feeds.keys()
+        dates = []
+        for sym in symbols:
+            d = self._feeds[sym].dates().astype('int64')
+            if len(d) > 1 and not (d[1:] > d[:-1]).all():
+                raise Exception("MultiFeed requires increasing, unique datetimes in the feed for %s" % sym)
+            dates.append(d)
+        if len(dates):
+            calendar = numpy.unique(numpy.concatenate(dates))
+        else:
+            calendar = numpy.zeros(0, dtype='int64')
+
+        # the calendar position of every bar of every feed, grouped (stably, 
+        # so in feed order) by position gives the active feeds on each date
+        pos = [numpy.searchsorted(calendar, d) for d in dates]
+        owner = [numpy.repeat(i, len(dates[i])) for i in range(0, len(dates))]
+        if len(dates):
+            pos = numpy.concatenate(pos)
+            owner = numpy.concatenate(owner)[numpy.argsort(pos, kind='mergesort')]
+        counts = numpy.bincount(pos, minlength=len(calendar)) if len(calendar) else []
+        entries = [(sym, self._feeds[sym]) for sym in symbols]
+        active = []
+        i = 0
+        for c in counts:
+            active.append([entries[j] for j in owner[i:i+c]])
+            i += c
+        
+        self._calendar = calendar
+        self._dates = calendar.astype('datetime64[us]').tolist()
+        self._active = active
+        
+        # pick up wherever the feeds currently are
+        heads = [f.get_next_bar_date() for f in self._feeds.values() if f.get_next_bar_date() != None]
+        if len(heads):
+            self._pos = int(numpy.searchsorted(self._calendar, _to_int64(min(heads))))
+        else:
+            self._pos = len(self._dates)
+
     def get_current_bars(self):
         '''Returns the last set of bars that were emitted by the feed.'''
         return self._current_bars
@@ -0,0 +1,170 @@
+'''
+hedgeit.feeds.panel
+
+Contains:
+  class Panel
+'''
+import copy
+import numpy
+from hedgeit.feeds.indicator import Indicator
+from hedgeit.feeds.store import StoredSeries
+
+class Panel(object):
+    '''
+    Panel holds the series of the feeds in a MultiFeed as 2-d arrays with
+    one column per symbol, so that an indicator can be calculated for every
+    symbol with one vectorized kernel call (see Indicator.calc_panel) rather
+    than one call per Feed.
+
+    The feeds have different lengths and calendars, so column j of each
+    array holds symbol j's own bars in order followed by NAN padding.  The
+    kernels work down each column independently, so the results are
+    exactly those of calculating the indicator for each Feed.  insert()
+    gives each Feed its column as a strided view into the 2-d result (no
+    copy).  values() returns a series aligned to the union calendar of the
+    feeds instead, with mask() marking the dates each symbol has a bar for.
+    '''
+
+    def __init__(self, multifeed, symbols=None, names=None):
+        '''
+        Constructor.
+
+        :param MultiFeed multifeed: feeds to include
+        :param list symbols: symbols to include.  If None, all symbols in
+                             the MultiFeed are used.
+        :param list names: series to include initially.  If None, the
+                           price series are used.  Indicators calculated
+                           with insert() are added as they are calculated.
+        '''
+        if symbols == None:
+            symbols = sorted(multifeed.symbols())
+        self._symbols = list(symbols)
+        self._feeds = [multifeed.get_feed(sym) for sym in self._symbols]
+        self._lens = [feed.len() for feed in self._feeds]
+        dates = [feed.dates() for feed in self._feeds]
+        if len(dates):
+            self._dates = numpy.unique(numpy.concatenate(dates))
+        else:
+            self._dates = numpy.zeros(0, dtype='datetime64[us]')
+        # calendar row of each bar of each feed
+        self._rows = [numpy.searchsorted(self._dates, d) for d in dates]
+        self._series = {}
+        if names == None:
+            names = ['Open', 'High', 'Low', 'Close', 'Volume']
+        for name in names:
+            self._series[name] = self._stack(name)
+
+    def symbols(self):
+        '''Returns the list of symbols, in column order.'''
+        return self._symbols
+
+    def dates(self):
+        '''Returns the union calendar of the feeds as a datetime64 array.'''
+        return self._dates
+
+    def lengths(self):
+        '''Returns the number of bars of each symbol, in column order.'''
+        return self._lens
+
+    def names(self):
+        '''Returns the names of the series in the panel.'''
+        return self._series.keys()
+
+    def mask(self):
+        '''
+        Returns a boolean array (dates x symbols) that is True where the
+        symbol has a bar for the date.
+        '''
+        ret = numpy.zeros((len(self._dates), len(self._symbols)), dtype=bool)
+        for j in range(0, len(self._symbols)):
+            ret[self._rows[j], j] = True
+        return ret
+
+    def get(self, name):
+        '''
+        Returns one of the series as a 2-d array with one column per
+        symbol, each holding the symbol's own bars followed by NAN.
+
+        :param str name: name of the series to return
+
+        :raises: Exception if the series is not in the panel
+        '''
+        if not self._series.has_key(name):
+            raise Exception("Panel does not have a %s series in %s!" % (name, self._series.keys()))
+        return self._series[name]
+
+    def values(self, name):
+        '''
+        Returns one of the series as a 2-d array (dates x symbols) aligned
+        to the union calendar, with NAN where a symbol has no bar.
+
+        :param str name: name of the series to return
+        '''
+        packed = self.get(name)
+        ret = numpy.empty((len(self._dates), len(self._symbols)))
+        ret.fill(numpy.nan)
+        for j in range(0, len(self._symbols)):
+            ret[self._rows[j], j] = packed[:self._lens[j], j]
+        return ret
+
+    def series(self, name, symbol):
+        '''
+        Returns the series for one symbol, which is a view into the 2-d
+        array.
+
+        :param str name: name of the series to return
+        :param str symbol: symbol to return it for
+        '''
+        j = self._symbols.index(symbol)
+        return self.get(name)[:self._lens[j], j]
+
+    def insert(self, ind):
+        '''
+        Calculates an indicator for every symbol and inserts it in each
+        Feed, as a view of its column of the 2-d result.  The series are
+        also added to each Feed's IndicatorCache, so an equivalent
+        indicator inserted in the Feed later (say by a strategy) uses them.
+        Indicators that can not be calculated for the whole panel (see
+        Indicator.calc_panel) are calculated for each Feed instead.
+
+        :param ind: Indicator instance, or for indicators that are created
+                    for a particular feed (such as those in talibfunc) a
+                    function that returns the Indicator for a Feed
+        :returns: the indicator series as a 2-d array (see get)
+
+        :raises: Exception if a Feed already has a different series of the
+                 same name
+        '''
+        if isinstance(ind, Indicator):
+            inds = [copy.copy(ind) for feed in self._feeds]
+        else:
+            inds = [ind(feed) for feed in self._feeds]
+        if not len(inds):
+            return None
+        name = inds[0].name()
+
+        packed = inds[0].calc_panel(self)
+        if packed is None:
+            for (feed, ind) in zip(self._feeds, inds):
+                feed.insert(ind)
+            self._series[name] = self._stack(name)
+            return self._series[name]
+
+        for j in range(0, len(self._feeds)):
+            feed = self._feeds[j]
+            series = packed[:self._lens[j], j]
+            key = inds[j].cache_key(feed)
+            if key != None:
+                feed.indicator_cache().put(key, series, inds[j].inputs(feed))
+                feed.insert(inds[j])
+            else:
+                feed.insert(StoredSeries(name, series))
+        self._series[name] = packed
+        return packed
+
+    def _stack(self, name):
+        ret = numpy.empty((max(self._lens + [0]), len(self._feeds)))
+        ret.fill(numpy.nan)
+        for j in range(0, len(self._feeds)):
+            ret[:self._lens[j], j] = self._feeds[j].get_series(name)
+        return ret
@@ -0,0 +1,140 @@
+'''
+hedgeit.feeds.store
+
+Contains:
+  class FeedStore
+  class StoredSeries
+'''
+import json
+import numpy
+import os
+import tempfile
+from hedgeit.feeds.indicator import Indicator
+
+class StoredSeries(Indicator):
+    '''
+    Indicator whose series was computed elsewhere and loaded from a FeedStore.
+    '''
+
+    def __init__(self, name, series):
+        '''
+        Constructor
+
+        :param str name: name used to reference the indicator
+        :param series: precomputed data series
+        :type series: numpy array
+        '''
+        Indicator.__init__(self, name)
+        self._series = series
+
+    def calc(self, feed):
+        return self._series
+
+class FeedStore(object):
+    '''
+    FeedStore writes the series of a Feed (Datetime, OHLCV and optionally any
+    indicators) to disk once so that any number of processes can attach to
+    them via memory-mapping.  Attached series are read-only, zero-copy views
+    onto the operating system page cache, so running many backtests in
+    separate processes against the same store does not duplicate price data.
+
+    Each symbol is stored as <symbol>.npy containing a 2-d float64 array with
+    one row per series and <symbol>.json containing the series names.  The
+    Datetime series is stored as microseconds since the epoch.
+    '''
+
+    def __init__(self, storedir):
+        '''
+        Constructor
+
+        :param str storedir: directory that holds the store.  It is created on
+                             the first write() if necessary.
+        '''
+        self._storedir = storedir
+
+    def storedir(self):
+        '''Returns the store directory.'''
+        return self._storedir
+
+    def write(self, feed, indicators=False):
+        '''
+        Writes the series for feed to the store, replacing any previous entry
+        for the same symbol.
+
+        :param Feed feed: feed to write
+        :param bool indicators: if True, all indicator series currently in the
+                                feed are written as well
+        '''
+        if not os.path.isdir(self._storedir):
+            os.makedirs(self._storedir)
+
+        names = ['Datetime', 'Open', 'High', 'Low', 'Close', 'Volume']
+        if indicators:
+            names.extend(feed.indicator_names())
+
+        arr = numpy.zeros((len(names), feed.len()))
+        dates = feed.dates()
+        arr[0] = dates.astype('int64')
+        for i in range(1, len(names)):
+            arr[i] = feed.get_series(names[i])
+
+        symbol = feed.instrument().symbol()
+        self._write_atomic(self._file(symbol, 'npy'), lambda f: numpy.save(f, arr))
+        self._write_atomic(self._file(symbol, 'json'), lambda f: json.dump(names, f))
+
+    def symbols(self):
+        '''Returns a sorted list of the symbols in the store.'''
+        if not os.path.isdir(self._storedir):
+            return []
+        return sorted([os.path.splitext(f)[0] for f in os.listdir(self._storedir) if f.endswith('.json')])
+
+    def series_names(self, symbol):
+        '''Returns the list of series names stored for symbol.'''
+        f = open(self._file(symbol, 'json'))
+        try:
+            return json.load(f)
+        finally:
+            f.close()
+
+    def load(self, symbol):
+        '''
+        Attaches to the stored series for symbol.
+
+        :param str symbol: symbol to attach to
+        :returns: list of (name, series) tuples in stored order.  Datetime is
+                  a datetime64[us] array and all others are read-only views
+                  onto the memory-mapped store.
+
+        :raises: Exception if the symbol is not in the store
+        '''
+        if not os.path.exists(self._file(symbol, 'json')):
+            raise Exception("FeedStore %s does not have symbol %s" % (self._storedir, symbol))
+        names = self.series_names(symbol)
+        arr = numpy.load(self._file(symbol, 'npy'), mmap_mode='r')
+        if arr.shape[0] != len(names):
+            raise Exception("FeedStore entry for %s is inconsistent (%d series, %d names)" % (symbol, arr.shape[0], len(names)))
+
+        ret = [('Datetime', arr[0].astype('int64').astype('datetime64[us]'))]
+        for i in range(1, len(names)):
+            ret.append((names[i], numpy.asarray(arr[i])))
+        return ret
+
+    def _file(self, symbol, ext):
+        return os.path.join(self._storedir, '%s.%s' % (symbol, ext))
+
+    def _write_atomic(self, filename, writer):
+        fd, tmpfile = tempfile.mkstemp(suffix='.tmp', dir=self._storedir)
+        try:
+            f = os.fdopen(fd, 'wb')
+            try:
+                writer(f)
+            finally:
+                f.close()
+            if os.name == 'nt' and os.path.exists(filename):
+                # rename won't replace an existing file on Windows
+                os.remove(filename)
+            os.rename(tmpfile, filename)
+        except:
+            if os.path.exists(tmpfile):
+                os.remove(tmpfile)
+            raise
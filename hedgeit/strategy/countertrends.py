@@ -40,7 +40,7 @@ class RSIReversalStrategy(MultiSymFuturesBaseStrategy):
     def prep_bar_feed(self):
         for sym in self._symbols:
             feed = self._barFeed.get_feed(sym)
-            feed.insert( talibfunc.RSI('rsi',feed,self._parms['period']) )
+            feed.register( talibfunc.RSI('rsi',feed,self._parms['period']) )
 
     def onSymBar(self, symbol, bar):
         if not self._lastRSI.has_key(symbol):
@@ -93,8 +93,8 @@ class ConnorsRSIStrategy(MultiSymFuturesBaseStrategy):
     def prep_bar_feed(self):
         for sym in self._symbols:
             feed = self._barFeed.get_feed(sym)
-            feed.insert( talibfunc.SMA('filter_ma',feed,self._parms['filterPeriod']) )
-            feed.insert( talibfunc.RSI('rsi',feed,self._parms['period']) )
+            feed.register( talibfunc.SMA('filter_ma',feed,self._parms['filterPeriod']) )
+            feed.register( talibfunc.RSI('rsi',feed,self._parms['period']) )
 
     def onSymBar(self, symbol, bar):
         (long_, short) = self.getPositions(symbol)
@@ -136,9 +136,9 @@ class Split7sStrategy(MultiSymFuturesBaseStrategy):
     def prep_bar_feed(self):
         for sym in self._symbols:
             feed = self._barFeed.get_feed(sym)
-            feed.insert( talibfunc.SMA('filter_ma',feed,self._parms['filterPeriod']) )
-            feed.insert( talibfunc.MAX('max',feed,self._parms['period']) )
-            feed.insert( talibfunc.MIN('min',feed,self._parms['period']) )
+            feed.register( talibfunc.SMA('filter_ma',feed,self._parms['filterPeriod']) )
+            feed.register( talibfunc.MAX('max',feed,self._parms['period']) )
+            feed.register( talibfunc.MIN('min',feed,self._parms['period']) )
 
     def onSymBar(self, symbol, bar):
         if not self.hasPosition(symbol):
@@ -182,9 +182,9 @@ class RSIReversal2Strategy(MultiSymFuturesBaseStrategy):
     def prep_bar_feed(self):
         for sym in self._symbols:
             feed = self._barFeed.get_feed(sym)
-            feed.insert( talibfunc.SMA('filter_ma',feed,self._parms['filterPeriod']) )
-            feed.insert( talibfunc.SMA('close_ma',feed,self._parms['close_ma_period']) )
-            feed.insert( talibfunc.RSI('rsi',feed,self._parms['rsi_period']) )
+            feed.register( talibfunc.SMA('filter_ma',feed,self._parms['filterPeriod']) )
+            feed.register( talibfunc.SMA('close_ma',feed,self._parms['close_ma_period']) )
+            feed.register( talibfunc.RSI('rsi',feed,self._parms['rsi_period']) )
 
     def onSymBar(self, symbol, bar):
         if not self.hasPosition(symbol):
@@ -230,9 +230,9 @@ class CumRSIStrategy(MultiSymFuturesBaseStrategy):
     def prep_bar_feed(self):
         for sym in self._symbols:
             feed = self._barFeed.get_feed(sym)
-            feed.insert( talibfunc.SMA('filter_ma',feed,self._parms['filterPeriod']) )
-            feed.insert( talibfunc.RSI('rsi',feed,self._parms['rsi_period']) )
-            feed.insert( CUM( name='cum_rsi', period=self._parms['rsi_cum_length'], baseIndicator='rsi') )
+            feed.register( talibfunc.SMA('filter_ma',feed,self._parms['filterPeriod']) )
+            feed.register( talibfunc.RSI('rsi',feed,self._parms['rsi_period']) )
+            feed.register( CUM( name='cum_rsi', period=self._parms['rsi_cum_length'], baseIndicator='rsi') )
 
     def onSymBar(self, symbol, bar):
         if not self.hasPosition(symbol):
@@ -9,6 +9,7 @@ from hedgeit.feeds.db import InstrumentDb
 from hedgeit.strategy.strategy import Strategy
 from hedgeit.broker.brokers import BacktestingFuturesBroker
 from hedgeit.feeds.indicators.atr import ATR
+from hedgeit.feeds.panel import Panel
 from hedgeit.common.logger import getLogger
 from hedgeit.broker.commissions import FuturesCommission
 from hedgeit.broker.orders import Order
@@ -36,9 +37,10 @@ class MultiSymFuturesBaseStrategy(Strategy):
         self._shortpositions = {}
         self._started = {}
         for sym in self._symbols:
-            feed = self._barFeed.get_feed(sym)
             self._started[sym] = False
-            feed.insert( ATR( name='atr', period=self._parms['atrPeriod'] ) )            
+        # calculated for all of the symbols at once
+        panel = Panel(self._barFeed, symbols=self._symbols, names=['High', 'Low', 'Close'])
+        panel.insert( ATR( name='atr', period=self._parms['atrPeriod'] ) )
             
         self._db = InstrumentDb.Instance()
         
@@ -191,9 +193,12 @@ class MultiSymFuturesBaseStrategy(Strategy):
         # handle stop processing
         if self._stop != None and self._intraday:
             if pos.isLong():
-                self.exitPosition(pos, stopPrice=self._tradeHigh[sym]-self._stop*bar.atr(), goodTillCanceled=True)
+                stopPrice = self._tradeHigh[sym]-self._stop*bar.atr()
             else:
-                self.exitPosition(pos, stopPrice=self._tradeLow[sym]+self._stop*bar.atr(), goodTillCanceled=True)
+                stopPrice = self._tradeLow[sym]+self._stop*bar.atr()
+            # trail the pending stop rather than replacing it on every bar
+            if not pos.amendStop(stopPrice, goodTillCanceled=True):
+                self.exitPosition(pos, stopPrice=stopPrice, goodTillCanceled=True)
         elif self._stop != None and not self._intraday:
             if pos.isLong():
                 if bar.close() < self._tradeHigh[sym] - ( self._stop * bar.atr() ):
@@ -217,7 +222,7 @@ class MultiSymFuturesBaseStrategy(Strategy):
         
     def onBars(self, bars):
         for sym in self._symbols:
-            if sym in bars.symbols():
+            if bars.has_symbol(sym):
                 bar = bars.get_bar(sym)
                 if not self._started[sym]:
                     if not bar.has_nan():
@@ -112,6 +112,28 @@ class Position:
         self.getStrategy().getBroker().placeOrder(closeOrder)
         self.setExitOrder(closeOrder)
 
+    def amendStop(self, stopPrice, goodTillCanceled = None):
+        """Moves the stop price of the pending stop exit order in place, which is much cheaper than close() for a trailing stop.
+
+        :param stopPrice: The new stop price.
+        :type stopPrice: float.
+        :param goodTillCanceled: True if the exit order is good till canceled. If None, then it will match the entry order.
+        :type goodTillCanceled: boolean.
+        :rtype: False if there is no pending stop exit order to amend, in which case close() should be used.
+
+        .. note::
+            The order is modified even if neither the stop price nor goodTillCanceled change, so that the broker
+            processes it where the replacement placed by close() would have been.
+        """
+        exitOrder = self.getExitOrder()
+        if exitOrder == None or not exitOrder.isAccepted() or exitOrder.getType() != Order.Type.STOP:
+            return False
+
+        if goodTillCanceled == None:
+            goodTillCanceled = self.__entryOrder.getGoodTillCanceled()
+        self.getStrategy().getBroker().modifyOrder(exitOrder, stopPrice=stopPrice, goodTillCanceled=goodTillCanceled)
+        return True
+
     def checkExitOnSessionClose(self, bars):
         ret = None
         # If the position was set to exit on session close, and this is the penultimate bar then:
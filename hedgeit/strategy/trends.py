@@ -31,10 +31,10 @@ class BreakoutStrategy(MultiSymFuturesBaseStrategy):
         period = self._parms['period']
         for sym in self._symbols:
             feed = self._barFeed.get_feed(sym)
-            feed.insert( talibfunc.SMA('short_ma',feed,period) )
-            feed.insert( talibfunc.SMA('long_ma',feed,2*period) )
-            feed.insert( talibfunc.MAX('max',feed,period) )
-            feed.insert( talibfunc.MIN('min',feed,period) )
+            feed.register( talibfunc.SMA('short_ma',feed,period) )
+            feed.register( talibfunc.SMA('long_ma',feed,2*period) )
+            feed.register( talibfunc.MAX('max',feed,period) )
+            feed.register( talibfunc.MIN('min',feed,period) )
 
     def onSymBar(self, symbol, bar):
         # only consider a new trade if we don't already have one
@@ -71,8 +71,8 @@ class MACrossStrategy(MultiSymFuturesBaseStrategy):
     def prep_bar_feed(self):
         for sym in self._symbols:
             feed = self._barFeed.get_feed(sym)
-            feed.insert( talibfunc.SMA('short_ma',feed,self._parms['shortPeriod']) )
-            feed.insert( talibfunc.SMA('long_ma',feed,self._parms['longPeriod']) )
+            feed.register( talibfunc.SMA('short_ma',feed,self._parms['shortPeriod']) )
+            feed.register( talibfunc.SMA('long_ma',feed,self._parms['longPeriod']) )
 
     def onSymBar(self, symbol, bar):
         (poslong, posshort) = self.getPositions(symbol)
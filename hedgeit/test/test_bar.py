@@ -74,6 +74,35 @@ class Test(unittest.TestCase):
         b.set_user_defined('foonan', numpy.nan)
         self.assertTrue(b.has_nan())
 
+        # setting an existing value replaces it
+        b.set_user_defined('foo1', 43)
+        self.assertEqual(b.foo1(), 43)
+        self.assertEqual('%s' % b, 'date:2013-01-23 00:00:00,open:10.0,high:40.0,low:5.0,close:25.0,foo1:43,foo2:99.36,foonan:nan')
+
+    def testSharedLayout(self):
+        layout = {}
+        b1 = Bar(datetime.datetime(2013,1,23),10.0, 40.0, 5.0, 25.0, layout=layout)
+        b2 = Bar(datetime.datetime(2013,1,24),10.0, 40.0, 5.0, 25.0, layout=layout)
+        b1.set_user_defined('foo1', 42)
+        b2.set_user_defined('foo2', 99.36)
+        b2.set_user_defined('foo1', 43)
+        self.assertEqual(layout, {'foo1' : 0, 'foo2' : 1})
+        self.assertEqual(b1.foo1(), 42)
+        self.assertEqual(b2.foo1(), 43)
+        self.assertEqual(b2.foo2(), 99.36)
+        # a name set on another bar is not defined on this one
+        with self.assertRaisesRegexp(Exception, 'Bar has no user-defined'):
+            b1.foo2()
+        self.assertFalse(b1.has_nan())
+        self.assertEqual('%s' % b1, 'date:2013-01-23 00:00:00,open:10.0,high:40.0,low:5.0,close:25.0,foo1:42')
+
+    def testSlots(self):
+        b = Bar(datetime.datetime(2013,1,23),10.0, 40.0, 5.0, 25.0)
+        self.assertFalse(hasattr(b, '__dict__'))
+        self.assertFalse(hasattr(Bars(), '__dict__'))
+        with self.assertRaises(AttributeError):
+            b._foo = 1
+
     def testBarsBasic(self):
         b1 = Bar(datetime.datetime(2013,1,23),10.0, 40.0, 5.0, 25.0)
         b2 = Bar(datetime.datetime(2013,1,23),20.0, 30.0, 15.0, 15.0)
@@ -81,7 +110,11 @@ class Test(unittest.TestCase):
         bars.add_bar('AA', b1)
         bars.add_bar('AB', b2)
         self.assertEqual(bars.datetime(), datetime.datetime(2013,1,23))
-        self.assertEqual(bars.symbols(), ['AA', 'AB'])
+        self.assertEqual(bars.symbols(), ('AA', 'AB'))
+        self.assertTrue(bars.symbols() is bars.symbols())
+        self.assertTrue(bars.has_symbol('AA'))
+        self.assertFalse(bars.has_symbol('AC'))
+        self.assertTrue('AB' in bars)
         self.assertEqual(bars.get_bar('AA').open(), 10.0)
         self.assertEqual(bars.get_bar('AB').close(), 15.0)
         
@@ -9,6 +9,9 @@ from hedgeit.broker.brokers import BacktestingBroker
 from hedgeit.feeds.multifeed import MultiFeed
 from hedgeit.feeds.feed import Feed
 from hedgeit.feeds.instrument import Instrument
+from hedgeit.feeds.bar import Bar
+from hedgeit.feeds.bars import Bars
+from hedgeit.broker.fillstrategy import DefaultStrategy
 import os
 import datetime
 
@@ -23,6 +26,150 @@ class Test(unittest.TestCase):
     def tearDown(self):
         pass
 
+    def testSlots(self):
+        broker = BacktestingBroker(1000000, MultiFeed())
+        for o in [broker.createMarketOrder(Order.Action.BUY, 'AC', 100, False),
+                  broker.createLimitOrder(Order.Action.BUY, 'AC', 2.0, 100),
+                  broker.createStopOrder(Order.Action.SELL, 'AC', 2.0, 100),
+                  broker.createStopLimitOrder(Order.Action.SELL, 'AC', 2.0, 2.1, 100)]:
+            self.assertFalse(hasattr(o, '__dict__'), '%s' % o)
+
+    def testOrderBook(self):
+        broker = BacktestingBroker(1000000, MultiFeed())
+        updates = []
+        broker.getOrderUpdatedEvent().subscribe(lambda b, o: updates.append(o))
+        stops = []
+        for sym in ['C', 'A', 'B', 'A']:
+            o = broker.createStopOrder(Order.Action.SELL, sym, 10.0, 1)
+            o.setGoodTillCanceled(True)
+            broker.placeOrder(o)
+            stops.append(o)
+        # placing again leaves the order where it was
+        broker.placeOrder(stops[1])
+        self.assertEqual(broker.getActiveOrders(), stops)
+        self.assertEqual(broker.getActiveOrdersFor('A'), [stops[1], stops[3]])
+        self.assertEqual(broker.getActiveOrdersFor('D'), [])
+        # the active orders are returned as a copy
+        broker.getActiveOrders().remove(stops[0])
+        self.assertEqual(broker.getActiveOrders(), stops)
+
+        # canceled orders are dropped on the next bar of their instrument,
+        # and fills and cancels are reported in the order they were placed
+        broker.cancelOrder(stops[2])
+        broker.cancelOrder(stops[3])
+        bars = Bars()
+        bars.add_bar('A', Bar(datetime.datetime(2013,1,2), 11.0, 12.0, 9.0, 11.0))
+        bars.add_bar('C', Bar(datetime.datetime(2013,1,2), 11.0, 12.0, 9.0, 11.0))
+        broker.onBars(bars)
+        self.assertEqual(updates, [stops[0], stops[1], stops[3]])
+        self.assertTrue(stops[0].isFilled() and stops[1].isFilled())
+        self.assertEqual(broker.getActiveOrders(), [stops[2]])
+        self.assertEqual(broker.getShares('A'), -1)
+
+        bars = Bars()
+        bars.add_bar('B', Bar(datetime.datetime(2013,1,3), 11.0, 12.0, 10.5, 11.0))
+        broker.onBars(bars)
+        self.assertEqual(updates[-1], stops[2])
+        self.assertEqual(broker.getActiveOrders(), [])
+        # and the emptied books are gone
+        self.assertEqual(broker._BacktestingBroker__orderBook, {})
+
+    def testFillRestingOrders(self):
+        # every combination of order, action and price relative to the bar,
+        # including the edges of the bar and NAN
+        broker = BacktestingBroker(1000000, MultiFeed())
+        strategy = DefaultStrategy()
+        bar_ = Bar(datetime.datetime(2013,1,2), 10.5, 12.0, 9.0, 11.0)
+        prices = [8.0, 9.0, 10.0, 10.5, 11.0, 12.0, 13.0, float('nan')]
+        orders_ = []
+        for action in [Order.Action.BUY, Order.Action.BUY_TO_COVER, Order.Action.SELL, Order.Action.SELL_SHORT]:
+            for price in prices:
+                orders_.append(broker.createStopOrder(action, 'A', price, 1))
+                orders_.append(broker.createLimitOrder(action, 'A', price, 1))
+        expected = []
+        for o in orders_:
+            if o.getType() == Order.Type.STOP:
+                expected.append(strategy.fillStopOrder(o, broker, bar_))
+            else:
+                expected.append(strategy.fillLimitOrder(o, broker, bar_))
+        self.assertEqual(strategy.fillRestingOrders(orders_, broker, [bar_] * len(orders_)), expected)
+        self.assertEqual(len([p for p in expected if p == None]), 16)
+
+        gap = Bar(datetime.datetime(2013,1,2), 14.0, 15.0, 13.5, 14.5)
+        self.assertEqual(strategy.fillRestingOrders(orders_[:4], broker, [gap] * 4), [14.0, None, 14.0, None])
+
+    def testFillStopOverride(self):
+        # a strategy that fills stops its own way turns off the batch
+        class StopAtOpen(DefaultStrategy):
+            batchFills = False
+            def fillStopOrder(self, order, broker_, bar):
+                return broker_.getBarOpen(bar)
+        broker = BacktestingBroker(1000000, MultiFeed())
+        broker.setFillStrategy(StopAtOpen())
+        stop = broker.createStopOrder(Order.Action.SELL, 'A', 8.0, 1)
+        broker.placeOrder(stop)
+        bars = Bars()
+        bars.add_bar('A', Bar(datetime.datetime(2013,1,2), 11.0, 12.0, 9.0, 11.0))
+        broker.onBars(bars)
+        self.assertTrue(stop.isFilled())
+        self.assertEqual(stop.getExecutionInfo().getPrice(), 11.0)
+
+    def testModifyOrder(self):
+        broker = BacktestingBroker(1000000, MultiFeed())
+        updates = []
+        broker.getOrderUpdatedEvent().subscribe(lambda b, o: updates.append(o))
+        stop = broker.createStopOrder(Order.Action.SELL, 'A', 8.0, 1)
+        stop.setGoodTillCanceled(True)
+        broker.placeOrder(stop)
+        limit = broker.createLimitOrder(Order.Action.BUY, 'B', 8.0, 1)
+        limit.setGoodTillCanceled(True)
+        broker.placeOrder(limit)
+
+        bars = Bars()
+        bars.add_bar('A', Bar(datetime.datetime(2013,1,2), 11.0, 12.0, 9.0, 11.0))
+        bars.add_bar('B', Bar(datetime.datetime(2013,1,2), 11.0, 12.0, 9.0, 11.0))
+        broker.onBars(bars)
+        self.assertEqual(updates, [])
+
+        # a modified order is processed as if it had been placed again
+        broker.modifyOrder(limit, limitPrice=10.0)
+        broker.modifyOrder(stop, stopPrice=10.0)
+        self.assertFalse(stop.isDirty())
+        self.assertEqual(broker.getActiveOrders(), [limit, stop])
+        self.assertEqual(stop.getStopPrice(), 10.0)
+        self.assertRaisesRegexp(Exception, "stop price of a LIMIT", broker.modifyOrder, limit, stopPrice=9.0)
+        self.assertRaisesRegexp(Exception, "limit price of a STOP", broker.modifyOrder, stop, limitPrice=9.0)
+        broker.modifyOrder(limit, goodTillCanceled=False)
+        self.assertFalse(limit.getGoodTillCanceled())
+        broker.modifyOrder(limit, goodTillCanceled=True)
+        self.assertTrue(limit.getGoodTillCanceled())
+        self.assertEqual(broker.getActiveOrders(), [stop, limit])
+        bars = Bars()
+        bars.add_bar('A', Bar(datetime.datetime(2013,1,3), 11.0, 12.0, 9.0, 11.0))
+        bars.add_bar('B', Bar(datetime.datetime(2013,1,3), 11.0, 12.0, 9.0, 11.0))
+        broker.onBars(bars)
+        self.assertEqual(updates, [stop, limit])
+        self.assertEqual(stop.getExecutionInfo().getPrice(), 10.0)
+        self.assertRaisesRegexp(Exception, "no longer active", broker.modifyOrder, stop, stopPrice=9.0)
+
+        # an order modified by an earlier fill on the same bar is priced
+        # with its new stop
+        a = broker.createStopOrder(Order.Action.SELL, 'A', 10.0, 1)
+        b = broker.createStopOrder(Order.Action.SELL, 'B', 8.0, 1)
+        for o in [a, b]:
+            o.setGoodTillCanceled(True)
+            broker.placeOrder(o)
+        def onOrderUpdated(broker_, order):
+            if order == a:
+                broker.modifyOrder(b, stopPrice=10.0)
+        broker.getOrderUpdatedEvent().subscribe(onOrderUpdated)
+        bars = Bars()
+        bars.add_bar('A', Bar(datetime.datetime(2013,1,4), 11.0, 12.0, 9.0, 11.0))
+        bars.add_bar('B', Bar(datetime.datetime(2013,1,4), 11.0, 12.0, 9.0, 11.0))
+        broker.onBars(bars)
+        self.assertEqual(updates[-2:], [a, b])
+        self.assertEqual(b.getExecutionInfo().getPrice(), 10.0)
+            
     ###########################################################################
     ## Test a basic long market entry order
     
@@ -0,0 +1,81 @@
+'''
+Created on Oct 18, 2026
+
+@author: rtw
+'''
+import unittest
+import os
+import shutil
+import tempfile
+import numpy
+from hedgeit.feeds.cache import ColumnCache
+from hedgeit.feeds.instrument import Instrument
+
+class Test(unittest.TestCase):
+
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+        self._datafile = os.path.join(self._tmpdir, 'AC___CCB.csv')
+        shutil.copy('%s/data/AC___CCB.csv' % os.path.dirname(__file__), self._datafile)
+        self._cache = ColumnCache(os.path.join(self._tmpdir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+    def testRoundTrip(self):
+        self.assertEqual(self._cache.load(self._datafile), None)
+
+        i = Instrument('AC', self._datafile, cache=self._cache)
+        i.load_data()
+        self.assertTrue(os.path.exists(self._cache.cachefile(self._datafile)))
+
+        cols = self._cache.load(self._datafile)
+        self.assertEqual(sorted(cols.keys()), sorted(i.columns().keys()))
+        for name in cols:
+            self.assertTrue(numpy.array_equal(cols[name], i.columns()[name]))
+
+        # a second instrument should come straight from the cache
+        i2 = Instrument('AC', self._datafile, cache=self._cache)
+        i2.load_data()
+        self.assertEqual(i2.datetimes(), i.datetimes())
+        self.assertTrue(numpy.array_equal(i2.columns()['Close'], i.columns()['Close']))
+
+    def testUnwritable(self):
+        # the cache directory can't be created, the data is still loaded
+        cache = ColumnCache(os.path.join(self._datafile, 'cache'))
+        i = Instrument('AC', self._datafile, cache=cache)
+        i.load_data()
+        self.assertTrue(i.is_loaded())
+        self.assertEqual(cache.load(self._datafile), None)
+        expected = Instrument('AC', self._datafile)
+        expected.load_data()
+        self.assertTrue(numpy.array_equal(i.columns()['Close'], expected.columns()['Close']))
+
+    def testInvalidate(self):
+        i = Instrument('AC', self._datafile, cache=self._cache)
+        i.load_data()
+        self.assertNotEqual(self._cache.load(self._datafile), None)
+
+        # append a bar - the cache entry must no longer be used even though
+        # it may have the same mtime as the modified datafile
+        f = open(self._datafile, 'a')
+        f.write('"2013-01-22","2.35000","2.36000","2.34000","2.35500","100","500","AC___CCB"\n')
+        f.close()
+        self.assertEqual(self._cache.load(self._datafile), None)
+
+        i.load_data()
+        self.assertEqual(len(i.columns()['Date']), 253)
+        self.assertEqual(len(self._cache.load(self._datafile)['Date']), 253)
+
+    def testCorrupt(self):
+        i = Instrument('AC', self._datafile, cache=self._cache)
+        i.load_data()
+        f = open(self._cache.cachefile(self._datafile), 'w')
+        f.write('garbage')
+        f.close()
+        self.assertEqual(self._cache.load(self._datafile), None)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -5,12 +5,14 @@ Created on Apr 17, 2013
 '''
 import unittest
 
-from hedgeit.control.clenow import ClenowController
+from hedgeit.control.controller import Controller
 from hedgeit.feeds.db import InstrumentDb
 import datetime
 import test_util
 
 import os
+import shutil
+import tempfile
 
 
 class Test(unittest.TestCase):
@@ -19,11 +21,12 @@ class Test(unittest.TestCase):
     def setUp(self):
         manifest = '%s/data/manifest1.csv' % os.path.dirname(__file__)        
         self._db = InstrumentDb.Instance()
-        self._db.load(manifest)
+        self._cachedir = tempfile.mkdtemp()
+        self._db.load(manifest, cache=self._cachedir)
         
 
     def tearDown(self):
-        pass
+        shutil.rmtree(self._cachedir)
 
 
     def testClenowRunGroup(self):
@@ -36,7 +39,8 @@ class Test(unittest.TestCase):
         rlog = '%s/returns.csv' % os.path.dirname(__file__)
         slog = '%s/summary.csv' % os.path.dirname(__file__)
 
-        ctrl = ClenowController({ 'Ag-1' : ['RR','LH','O'], 'Ag-2' : ['LB','LC']}, plog, elog, rlog, summaryFile=slog)
+        ctrl = Controller({ 'Ag-1' : ['RR','LH','O'], 'Ag-2' : ['LB','LC']}, tradeStart=datetime.datetime(2012,8,1),
+                          positionsFile=plog, equityFile=elog, returnsFile=rlog, summaryFile=slog)
         ctrl.run(datetime.datetime(2011,12,31),datetime.datetime(2012,8,1),datetime.datetime(2013,12,31))
 
         tlog = '%s/trade4.log' % os.path.dirname(__file__)
@@ -4,8 +4,10 @@ Created on Jan 21, 2013
 @author: rtw
 '''
 import unittest
-import os, datetime, numpy
+import os, datetime, numpy, shutil, tempfile
+from hedgeit.feeds.bar import Bar
 from hedgeit.feeds.feed import Feed
+from hedgeit.feeds.indcache import IndicatorCache
 from hedgeit.feeds.indicators.atr import ATR
 from hedgeit.feeds.indicators.cum import CUM
 from hedgeit.feeds.indicators.pvelocity import PriceVelocity
@@ -31,9 +33,114 @@ class Test(unittest.TestCase):
         w = Feed(self._inst)
         
         w.insert( ATR() )
+        # an equivalent indicator under the same name is simply reused
+        w.insert( ATR() )
+        self.assertEqual( w.indicator_names(), ['ATR'] )
         with self.assertRaisesRegexp(Exception,"Workspace already has an indicator.*"):        
-            w.insert( ATR() )
+            w.insert( ATR(period=10) )
+
+    def testIndicatorCache(self):
+        cache = IndicatorCache()
+        w = Feed(self._inst, indcache=cache)
+        w.insert( ATR(name='atr', period=10) )
+        w.insert( talibfunc.SMA('sma', w, 20) )
+        self.assertEqual( (cache.hits(), cache.misses()), (0, 2) )
+
+        # equivalent indicators under other names share the series
+        w.insert( ATR(name='atr2', period=10) )
+        w.insert( talibfunc.SMA('sma2', w, 20) )
+        self.assertEqual( (cache.hits(), cache.misses()), (2, 2) )
+        self.assertTrue( w.get_series('atr2') is w.get_series('atr') )
+        self.assertTrue( w.get_series('sma2') is w.get_series('sma') )
+        self.assertEqual( w.get_bar(100).sma2(), w.get_bar(100).sma() )
+
+        # the input series identity is part of the key
+        w.insert( CUM(name='cum', period=3, baseIndicator='sma') )
+        w.insert( CUM(name='cum2', period=3, baseIndicator='sma2') )
+        self.assertTrue( w.get_series('cum2') is w.get_series('cum') )
+        w.insert( CUM(name='cum3', period=3, baseIndicator='atr') )
+        self.assertFalse( numpy.array_equal(w.get_series('cum3'), w.get_series('cum')) )
+        self.assertEqual( (cache.hits(), cache.misses()), (3, 4) )
+
+        # different parameters are different series
+        w.insert( talibfunc.SMA('sma3', w, 21) )
+        self.assertFalse( w.get_series('sma3') is w.get_series('sma') )
+        self.assertEqual( (cache.hits(), cache.misses()), (3, 5) )
+        
+        # a second feed for the same instrument shares the price series, so
+        # a shared cache de-duplicates across feeds as well
+        w2 = Feed(self._inst, indcache=cache)
+        w2.insert( ATR(name='atr', period=10) )
+        self.assertTrue( w2.get_series('atr') is w.get_series('atr') )
+        self.assertEqual( (cache.hits(), cache.misses()), (4, 5) )
+        self.assertEqual( cache.size(), 5 )
             
+    def testInsertPeriods(self):
+        cache = IndicatorCache()
+        w = Feed(self._inst, indcache=cache)
+        rows = talibfunc.insert_periods(w, talibfunc.SMA, [10, 20], names=['sma10', 'sma20'])
+        self.assertEqual( rows.shape, (2, 252) )
+        self.assertEqual( w.indicator_names(), ['sma10', 'sma20'] )
+        self.assertTrue( numpy.may_share_memory(w.get_series('sma20'), rows) )
+        self.assertEqual( (cache.hits(), cache.misses()), (2, 0) )
+
+        # later inserts of an equivalent indicator use the row, even in 
+        # another feed sharing the cache
+        w.insert( talibfunc.SMA('short_ma', w, 10) )
+        self.assertTrue( w.get_series('short_ma') is w.get_series('sma10') )
+        maxrows = talibfunc.insert_periods(w, talibfunc.MAX, [5, 50])
+        w2 = Feed(self._inst, indcache=cache)
+        w2.insert( talibfunc.MAX('max', w2, 50) )
+        self.assertTrue( numpy.may_share_memory(w2.get_series('max'), maxrows) )
+        self.assertEqual( (cache.hits(), cache.misses()), (4, 0) )
+        self.assertEqual( w2.get_bar(100).max(), max(w.get_series('Close')[51:101]) )
+
+        with self.assertRaisesRegexp(Exception, "No multi-period calculation"):
+            talibfunc.insert_periods(w, talibfunc.ATR, [10])
+
+    def testRegister(self):
+        cache = IndicatorCache()
+        w = Feed(self._inst, indcache=cache)
+        # in any order, and nothing is calculated until it is read
+        w.register( CUM(name='cum_rsi', period=3, baseIndicator='rsi') )
+        w.register( PriceVelocity(name='pvel', period=10, baseIndicator='sma') )
+        w.register( talibfunc.RSI('rsi', w, 14) )
+        w.register( talibfunc.SMA('sma', w, 20) )
+        w.register( talibfunc.SMA('sma', w, 20) )
+        self.assertEqual( cache.misses(), 0 )
+        self.assertEqual( w.indicator_names(), ['cum_rsi', 'pvel', 'rsi', 'sma'] )
+        self.assertRaisesRegexp(Exception, 'already has an indicator named sma', w.register, talibfunc.SMA('sma', w, 21))
+        self.assertRaisesRegexp(Exception, 'already has an indicator named sma', w.insert, talibfunc.SMA('sma', w, 21))
+
+        # reading a series calculates it and what it depends on
+        w.get_series('pvel')
+        self.assertEqual( cache.misses(), 2 )
+        self.assertEqual( w.indicator_names(), ['sma', 'pvel', 'cum_rsi', 'rsi'] )
+
+        # a bar only calculates the values that are read from it
+        bar = w.get_bar(100)
+        self.assertEqual( cache.misses(), 2 )
+        self.assertEqual( bar.pvel(), w.get_series('pvel')[100] )
+        self.assertEqual( cache.misses(), 2 )
+        bar.cum_rsi()
+        self.assertEqual( cache.misses(), 4 )
+        self.assertEqual( w.indicator_names(), ['sma', 'pvel', 'rsi', 'cum_rsi'] )
+        expected = Feed(self._inst)
+        expected.insert( talibfunc.RSI('rsi', expected, 14) )
+        expected.insert( CUM(name='cum_rsi', period=3, baseIndicator='rsi') )
+        self.assertEqual( bar.cum_rsi(), expected.get_bar(100).cum_rsi() )
+
+        # registering or inserting an equivalent indicator does nothing
+        w.register( talibfunc.RSI('rsi', w, 14) )
+        w.insert( talibfunc.RSI('rsi', w, 14) )
+        self.assertEqual( cache.misses(), 4 )
+        self.assertRaisesRegexp(Exception, 'already has an indicator named rsi', w.register, talibfunc.RSI('rsi', w, 15))
+
+        # a dependency cycle is reported when it is read
+        w.register( CUM(name='a', period=3, baseIndicator='b') )
+        w.register( CUM(name='b', period=3, baseIndicator='a') )
+        self.assertRaisesRegexp(Exception, 'depends on itself', w.get_series, 'a')
+
     def testNeg(self):
         w = Feed(self._inst)
         with self.assertRaisesRegexp(Exception,"Workspace does not have a.*series in"):        
@@ -92,12 +199,63 @@ class Test(unittest.TestCase):
         self.assertEqual(count, 252)
         self.assertEqual(lastbar.datetime(),datetime.datetime(2013,1,18,0,0))
         
+    def testBarView(self):
+        w = Feed(self._inst)
+        w.insert( talibfunc.ATR('ATR10',w,10) )
+        w.insert( CUM( name='cum2(ATR10)', period=2, baseIndicator='ATR10') )
+        b = w.get_bar(0)
+        self.assertTrue(b.has_nan())
+        b = w.get_bar(251)
+        self.assertFalse(b.has_nan())
+        self.assertEqual(b.datetime(), datetime.datetime(2013,1,18,0,0))
+        self.assertEqual(b.close(), w.get_series('Close')[251])
+        self.assertEqual(b.volume(), w.get_series('Volume')[251])
+        self.assertEqual(b.open_interest(), None)
+        self.assertAlmostEqual(b.ATR10(), 0.031196, places=6)
+        self.assertEqual(getattr(b, 'cum2(ATR10)')(), w.get_series('cum2(ATR10)')[251])
+        with self.assertRaisesRegexp(Exception, 'Bar has no user-defined'):
+            b.Close()
+        self.assertTrue(str(b).startswith('date:2013-01-18 00:00:00,open:'))
+        
+        # views are not affected by later indicators, but new ones are
+        w.insert( talibfunc.SMA('SMA5',w,5) )
+        with self.assertRaisesRegexp(Exception, 'Bar has no user-defined'):
+            b.SMA5()
+        self.assertEqual(w.get_bar(251).SMA5(), w.get_series('SMA5')[251])
+        self.assertFalse(hasattr(b, '__dict__'))
+
     def testCursor2(self):
         w = Feed(self._inst)
         w.set_cursor(datetime.datetime(2012,6,29,0,0))
         self.assertEqual(w.get_next_bar_date(), datetime.datetime(2012,6,29,0,0))
         self.assertEqual(w.get_last_close(), 2.182 )
 
+        # not a trading day - cursor is at the next bar
+        w.set_cursor(datetime.datetime(2012,7,1,0,0))
+        self.assertEqual(w.get_next_bar_date(), datetime.datetime(2012,7,2,0,0))
+        w.set_cursor(datetime.datetime(2013,7,1,0,0))
+        self.assertEqual(w.get_next_bar_date(), None)
+        w.set_cursor(datetime.datetime(2000,7,1,0,0))
+        self.assertEqual(w.get_next_bar_date(), datetime.datetime(2012,1,23,0,0))
+
+    def testWindow(self):
+        w = Feed(self._inst)
+        w.insert( talibfunc.ATR('ATR10',w,10) )
+        win = w.get_window(datetime.datetime(2012,7,1), datetime.datetime(2012,7,31))
+        self.assertEqual(sorted(win.keys()), ['ATR10','Close','Datetime','High','Low','Open','Volume'])
+        self.assertEqual(len(win['Close']), 21)
+        self.assertEqual(win['Datetime'][0], numpy.datetime64('2012-07-02'))
+        self.assertEqual(win['Datetime'][-1], numpy.datetime64('2012-07-31'))
+        start = w.index_of(datetime.datetime(2012,7,1))
+        self.assertTrue(numpy.array_equal(win['ATR10'], w.get_series('ATR10')[start:start+21]))
+        # windows are views, not copies
+        self.assertTrue(numpy.may_share_memory(win['Close'], w.get_series('Close')))
+
+        win = w.get_window(last=datetime.datetime(2012,1,23), names=['Close'])
+        self.assertEqual(win.keys(), ['Close'])
+        self.assertEqual(len(win['Close']), 1)
+        self.assertEqual(len(w.get_window(first=datetime.datetime(2013,7,1))['Open']), 0)
+
     def testBadNewSeries(self):
         w = Feed(self._inst)
         # this add_series should fail because the length doesn't match
@@ -121,6 +279,32 @@ class Test(unittest.TestCase):
         self.assertTrue(test_util.file_compare('%s/writefeed.refcsv' % os.path.dirname(__file__), feedout))
         os.remove(feedout)
 
+    def testWriteChunks(self):
+        w = Feed(self._inst)
+        w.insert( talibfunc.SMA('SMA50',w,50))
+        w.register( PriceVelocity('PVEL',period=10,baseIndicator='SMA50') )
+        tmpdir = tempfile.mkdtemp()
+        try:
+            # the row chunking does not affect the output
+            feedout = os.path.join(tmpdir, 'writefeed.csv')
+            wf = open(feedout,'w')
+            w.write_csv(wf, chunksize=7)
+            wf.close()
+            self.assertTrue(test_util.file_compare('%s/writefeed.refcsv' % os.path.dirname(__file__), feedout))
+
+            npzout = os.path.join(tmpdir, 'writefeed.npz')
+            w.write_npz(npzout)
+            arrays = numpy.load(npzout)
+            self.assertEqual( list(arrays['columns']), ['Datetime','Open','High','Low','Close','Volume','SMA50','PVEL'] )
+            self.assertTrue( numpy.array_equal(arrays['Datetime'], w.dates()) )
+            for name in arrays['columns'][1:]:
+                series = w.get_series(name)
+                self.assertTrue( numpy.array_equal(numpy.isnan(arrays[name]), numpy.isnan(series)) )
+                self.assertTrue( numpy.array_equal(numpy.nan_to_num(arrays[name]), numpy.nan_to_num(series)) )
+            arrays.close()
+        finally:
+            shutil.rmtree(tmpdir)
+
     def testCum(self):
         w = Feed(self._inst)
         w.insert( talibfunc.SMA('SMA50',w,50))        
@@ -134,6 +318,65 @@ class Test(unittest.TestCase):
         self.assertAlmostEqual( cum[112], base[112] + base[111], places=4 )
         self.assertAlmostEqual( cum[176], base[176] + base[175], places=4 )
 
+
+    def testAppend(self):
+        full = Feed(self._inst)
+        lines = open(self._inst.datafile()).readlines()
+        datafile = os.path.join(tempfile.mkdtemp(), 'AC___CCB.csv')
+        try:
+            f = open(datafile, 'w')
+            f.writelines(lines[:101])
+            f.close()
+            w = Feed(Instrument('AC', datafile))
+        finally:
+            shutil.rmtree(os.path.dirname(datafile))
+        self.assertEqual( w.len(), 100 )
+
+        for feed in [full, w]:
+            feed.insert( ATR(name='atr', period=10) )
+            feed.insert( ATR(name='atr40', period=40) )
+            feed.insert( talibfunc.SMA('SMA50', feed, 50) )
+            feed.insert( talibfunc.MAX('max', feed, 20) )
+            feed.insert( talibfunc.MIN('min', feed, 20) )
+            feed.insert( talibfunc.RSI('rsi', feed, 14) )
+            feed.insert( CUM(name='cum', period=3, baseIndicator='rsi') )
+            feed.insert( PriceVelocity('PVEL', period=10, baseIndicator='SMA50') )
+            feed.insert( PriceVelocity('PVEL40', period=40, baseIndicator='Close') )
+        close = w.get_series('Close')
+
+        for i in range(100, 200):
+            b = full.get_bar(i)
+            w.append(Bar(b.datetime(), b.open(), b.high(), b.low(), b.close(), b.volume()))
+        # an indicator inserted part way through is extended from there
+        w.insert( talibfunc.SMA('SMA10', w, 10) )
+        full.insert( talibfunc.SMA('SMA10', full, 10) )
+        for i in range(200, full.len()):
+            b = full.get_bar(i)
+            w.append(Bar(b.datetime(), b.open(), b.high(), b.low(), b.close(), b.volume()))
+
+        self.assertEqual( w.len(), full.len() )
+        self.assertEqual( w.get_series('Datetime'), full.get_series('Datetime') )
+        self.assertTrue( numpy.array_equal(w.dates(), full.dates()) )
+        self.assertEqual( w.get_bar(251).datetime(), full.get_bar(251).datetime() )
+        for name in ['Open', 'High', 'Low', 'Close', 'Volume'] + full.indicator_names():
+            expected = full.get_series(name)
+            actual = w.get_series(name)
+            # identical to calculating the whole series, bit for bit
+            self.assertTrue( numpy.array_equal(numpy.isnan(expected), numpy.isnan(actual)), name )
+            self.assertTrue( numpy.array_equal(expected[~numpy.isnan(expected)], actual[~numpy.isnan(actual)]), name )
+        # earlier series are left as they were
+        self.assertEqual( len(close), 100 )
+        self.assertEqual( self._inst.columns()['Close'].shape, (252,) )
+
+        with self.assertRaisesRegexp(Exception, "Cannot append a bar for"):
+            w.append(Bar(full.get_bar(10).datetime(), 1.0, 1.0, 1.0, 1.0, 1.0))
+
+    def testAppendUnsupported(self):
+        w = Feed(self._inst)
+        w.insert( talibfunc.ATR('tatr', w, 14) )
+        with self.assertRaisesRegexp(Exception, "does not support incremental updates"):
+            w.append(Bar(datetime.datetime(2020,1,1), 1.0, 1.0, 1.0, 1.0, 1.0))
+        self.assertEqual( w.len(), 252 )
         
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testBasic']
@@ -10,8 +10,12 @@ from hedgeit.feeds.multifeed import MultiFeed
 from hedgeit.feeds.feed import Feed
 from hedgeit.feeds.instrument import Instrument
 from hedgeit.feeds.db import InstrumentDb
+from hedgeit.feeds.bar import Bar
+from hedgeit.feeds.bars import Bars
 
 import os
+import shutil
+import tempfile
 import datetime
 
 class Test(unittest.TestCase):
@@ -19,11 +23,12 @@ class Test(unittest.TestCase):
 
     def setUp(self):
         manifest = '%s/data/manifest.csv' % os.path.dirname(__file__)        
-        InstrumentDb.Instance().load(manifest)
+        self._cachedir = tempfile.mkdtemp()
+        InstrumentDb.Instance().load(manifest, cache=self._cachedir)
         
 
     def tearDown(self):
-        pass
+        shutil.rmtree(self._cachedir)
 
     ###########################################################################
     ## Test a basic long market entry order
@@ -139,6 +144,125 @@ class Test(unittest.TestCase):
         self.assertAlmostEqual(self._broker.getCash(), -2352500.0, places=2)
         self.assertEqual(self._broker.calc_margin(), 600000.0)
 
+    ###########################################################################
+    ## Test the mark-to-market and margin of several positions
+    
+    def testMarkToMarket(self):
+        broker = BacktestingFuturesBroker(1000000, MultiFeed())
+        for (action, sym, quantity) in [(Order.Action.BUY, 'AC', 10), (Order.Action.SELL_SHORT, 'CT', 3),
+                                        (Order.Action.BUY, 'C', 7), (Order.Action.BUY, 'LB', 1)]:
+            broker.placeOrder(broker.createMarketOrder(action, sym, quantity, False))
+        bars = Bars()
+        for (sym, price) in [('AC', 2.215), ('CT', 92.43), ('C', 583.25), ('LB', 301.1)]:
+            bars.add_bar(sym, Bar(datetime.datetime(2013,1,2), price, price + 1.0, price - 1.0, price + 0.37))
+        broker.onBars(bars)
+        self.assertEqual(broker.getPositions(), {'AC' : 10, 'CT' : -3, 'C' : 7, 'LB' : 1})
+        settle = broker.get_last_mark_to_market()
+        self.assertEqual(settle['C'], 583.62)
+
+        # close LB, and the next day C has no bar
+        broker.placeOrder(broker.createMarketOrder(Order.Action.SELL, 'LB', 1, False))
+        bars = Bars()
+        for (sym, price) in [('AC', 2.3), ('CT', 91.0), ('LB', 300.0)]:
+            bars.add_bar(sym, Bar(datetime.datetime(2013,1,3), price, price + 1.0, price - 1.0, price + 0.11))
+        cash = broker.getCash()
+        db = InstrumentDb.Instance()
+        expected = cash - (300.0 - settle['LB']) * db.get('LB').point_value() * -1
+        for (sym, shares) in broker.getPositions().iteritems():
+            if sym not in ['LB', 'C']:
+                expected += (bars.get_bar(sym).close() - settle[sym]) * db.get(sym).point_value() * shares
+        broker.onBars(bars)
+        self.assertEqual(broker.getCash(), expected)
+        self.assertEqual(broker.get_last_mark_to_market()['C'], 583.62)
+        self.assertEqual(broker.get_last_mark_to_market()['LB'], 300.0)
+        self.assertEqual(broker.calc_margin(), 10 * 1600.0 + 3 * 1600.0 + 7 * 2000.0)
+        self.assertEqual(broker.calc_margin('LB', 2), 10 * 1600.0 + 3 * 1600.0 + 7 * 2000.0 + 2 * 2175.0)
+
+    ###########################################################################
+    ## Test the running margin totals for each symbol and sector
+
+    def testSectorMargin(self):
+        broker = BacktestingFuturesBroker(1000000, MultiFeed(), sectors={'grains' : ['C'], 'softs' : ['CT']})
+        def trade(day, orders_):
+            bars = Bars()
+            for (action, sym, quantity) in orders_:
+                broker.placeOrder(broker.createMarketOrder(action, sym, quantity, False))
+                bars.add_bar(sym, Bar(datetime.datetime(2013,1,day), 100.0, 101.0, 99.0, 100.0))
+            broker.onBars(bars)
+        trade(2, [(Order.Action.BUY, 'AC', 10), (Order.Action.SELL_SHORT, 'CT', 3), (Order.Action.BUY, 'C', 7)])
+        self.assertEqual(broker.get_symbol_margin('AC'), 10 * 1600.0)
+        self.assertEqual(broker.get_symbol_margin('CT'), 3 * 1600.0)
+        self.assertEqual(broker.get_symbol_margin('LB'), 0.0)
+        # AC isn't in the sector map so is in the sector of the instrument
+        self.assertEqual(broker.get_sector_margins(), {'Agricultural' : 10 * 1600.0,
+                                                       'softs' : 3 * 1600.0,
+                                                       'grains' : 7 * 2000.0})
+        self.assertEqual(broker.calc_margin(), 10 * 1600.0 + 3 * 1600.0 + 7 * 2000.0)
+
+        # reduce C, close CT and add LB
+        trade(3, [(Order.Action.SELL, 'C', 2), (Order.Action.BUY_TO_COVER, 'CT', 3), (Order.Action.BUY, 'LB', 1)])
+        self.assertEqual(broker.get_symbol_margin('C'), 5 * 2000.0)
+        self.assertEqual(broker.get_symbol_margin('CT'), 0.0)
+        self.assertEqual(broker.get_sector_margin('grains'), 5 * 2000.0)
+        self.assertEqual(broker.get_sector_margin('softs'), 0.0)
+        self.assertEqual(broker.get_sector_margin('Agricultural'), 10 * 1600.0 + 1450.0)
+        self.assertEqual(broker.get_sector_margin('Currency'), 0.0)
+        self.assertEqual(broker.calc_margin(), 10 * 1600.0 + 5 * 2000.0 + 1450.0)
+        db = InstrumentDb.Instance()
+        self.assertEqual(broker.calc_margin(),
+                         sum([db.get(sym).maint_margin() * abs(shares) for (sym, shares) in broker.getPositions().iteritems()]))
+
+    def testSectorMarginReversal(self):
+        # a long entry and the cover of a larger short filled on the same
+        # bar leave a long position, which carries margin until it's sold
+        broker = BacktestingFuturesBroker(1000000, MultiFeed(), sectors={'Ag' : ['C']})
+        def trade(day, orders_):
+            for (action, quantity) in orders_:
+                broker.placeOrder(broker.createMarketOrder(action, 'C', quantity, False))
+            bars = Bars()
+            bars.add_bar('C', Bar(datetime.datetime(2013,1,day), 100.0, 101.0, 99.0, 100.0))
+            broker.onBars(bars)
+        trade(2, [(Order.Action.SELL_SHORT, 7)])
+        self.assertEqual(broker.get_sector_margin('Ag'), 7 * 2000.0)
+        trade(3, [(Order.Action.BUY, 6), (Order.Action.BUY_TO_COVER, 7)])
+        self.assertEqual(broker.getShares('C'), 6)
+        self.assertEqual(broker.get_sector_margin('Ag'), 6 * 2000.0)
+        trade(4, [(Order.Action.SELL, 6)])
+        self.assertEqual(broker.get_sector_margin('Ag'), 0.0)
+        self.assertEqual(broker.calc_margin(), 0.0)
+
+    def testFractionalMargin(self):
+        # margins that aren't whole dollars don't drift as positions change
+        tmpdir = tempfile.mkdtemp()
+        try:
+            manifest = os.path.join(tmpdir, 'manifest.csv')
+            f = open(manifest, 'w')
+            f.write('description,symbol,pointValue,currency,exchange,initialMargin,maintMargin,sector,datafile\n')
+            f.write('Fraction1,FR1,50,USD,CBT,1100.55,1000.1,Test,FR1.csv\n')
+            f.write('Fraction2,FR2,50,USD,CBT,0.5,0.3,Test,FR2.csv\n')
+            f.close()
+            InstrumentDb.Instance().load(manifest, cache=False)
+        finally:
+            shutil.rmtree(tmpdir)
+        broker = BacktestingFuturesBroker(1000000, MultiFeed())
+        day = [datetime.datetime(2013,1,1)]
+        def trade(action, sym, quantity):
+            broker.placeOrder(broker.createMarketOrder(action, sym, quantity, False))
+            bars = Bars()
+            bars.add_bar(sym, Bar(day[0], 100.0, 101.0, 99.0, 100.0))
+            day[0] += datetime.timedelta(days=1)
+            broker.onBars(bars)
+        trade(Order.Action.BUY, 'FR2', 7)
+        for i in range(0, 100):
+            trade(Order.Action.SELL_SHORT, 'FR1', 3)
+            self.assertEqual(broker.calc_margin(), 3002.4)
+            trade(Order.Action.BUY_TO_COVER, 'FR1', 3)
+            self.assertEqual(broker.calc_margin(), 2.1)
+        self.assertEqual(broker.get_symbol_margin('FR1'), 0.0)
+        self.assertEqual(broker.get_symbol_margin('FR2'), 2.1)
+        self.assertEqual(broker.get_sector_margins(), {'Test' : 2.1})
+        self.assertEqual(broker.calc_margin('FR1', 2), 2.1 + 2 * 1100.55)
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
\ No newline at end of file
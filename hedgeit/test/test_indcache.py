@@ -0,0 +1,127 @@
+'''
+Created on Oct 18, 2026
+
+@author: rtw
+'''
+import unittest
+import os
+import shutil
+import tempfile
+import time
+import numpy
+from hedgeit.feeds.feed import Feed
+from hedgeit.feeds.indcache import IndicatorCache, DiskIndicatorCache
+from hedgeit.feeds.instrument import Instrument
+from hedgeit.feeds.indicators.atr import ATR
+from hedgeit.feeds.indicators import talibfunc
+
+class Test(unittest.TestCase):
+
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+        self._datafile = os.path.join(self._tmpdir, 'AC___CCB.csv')
+        shutil.copy('%s/data/AC___CCB.csv' % os.path.dirname(__file__), self._datafile)
+        self._cachedir = os.path.join(self._tmpdir, 'indicators')
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+    def feed(self, disk):
+        cache = IndicatorCache(disk=disk)
+        f = Feed(Instrument('AC', self._datafile), indcache=cache)
+        f.insert( ATR(name='atr', period=10) )
+        f.insert( talibfunc.SMA('sma', f, 20) )
+        return f
+
+    def testRoundTrip(self):
+        f = self.feed(DiskIndicatorCache(self._cachedir))
+        cache = f.indicator_cache()
+        self.assertEqual( (cache.hits(), cache.disk_hits(), cache.misses()), (0, 0, 2) )
+        self.assertEqual( len(os.listdir(self._cachedir)), 2 )
+
+        # a new run (new cache, new instrument) reads them back from disk
+        f2 = self.feed(DiskIndicatorCache(self._cachedir))
+        cache2 = f2.indicator_cache()
+        self.assertEqual( (cache2.hits(), cache2.disk_hits(), cache2.misses()), (0, 2, 0) )
+        for name in ['atr', 'sma']:
+            a = f.get_series(name)
+            b = f2.get_series(name)
+            self.assertTrue( numpy.array_equal(numpy.isnan(a), numpy.isnan(b)) )
+            self.assertTrue( numpy.array_equal(a[~numpy.isnan(a)], b[~numpy.isnan(b)]) )
+
+        # different parameters are a different entry
+        f2.insert( talibfunc.SMA('sma21', f2, 21) )
+        self.assertEqual( cache2.misses(), 1 )
+        self.assertEqual( len(os.listdir(self._cachedir)), 3 )
+
+    def testInvalidate(self):
+        self.feed(DiskIndicatorCache(self._cachedir))
+
+        # append a bar - the existing entries must no longer be used
+        f = open(self._datafile, 'a')
+        f.write('"2013-01-22","2.35000","2.36000","2.34000","2.35500","100","500","AC___CCB"\n')
+        f.close()
+        f = self.feed(DiskIndicatorCache(self._cachedir))
+        self.assertEqual( f.indicator_cache().disk_hits(), 0 )
+        self.assertEqual( f.indicator_cache().misses(), 2 )
+        self.assertEqual( len(f.get_series('atr')), 253 )
+
+    def testCorrupt(self):
+        disk = DiskIndicatorCache(self._cachedir)
+        self.feed(disk)
+        for name in os.listdir(self._cachedir):
+            f = open(os.path.join(self._cachedir, name), 'wb')
+            f.write('garbage')
+            f.close()
+        f = self.feed(DiskIndicatorCache(self._cachedir))
+        self.assertEqual( f.indicator_cache().misses(), 2 )
+        # and the entries were rewritten
+        f = self.feed(DiskIndicatorCache(self._cachedir))
+        self.assertEqual( f.indicator_cache().disk_hits(), 2 )
+
+    def testEvict(self):
+        disk = DiskIndicatorCache(self._cachedir)
+        f = self.feed(disk)
+        entry = os.path.getsize(disk.cachefile(ATR(name='atr', period=10).cache_key(f), [f.get_series(n) for n in ['High','Low','Close']]))
+        self.assertEqual( disk.size(), 2 * entry )
+
+        # make the atr entry the most recently used
+        old = time.time() - 100
+        for name in os.listdir(self._cachedir):
+            os.utime(os.path.join(self._cachedir, name), (old, old))
+        f2 = Feed(Instrument('AC', self._datafile), indcache=IndicatorCache(disk=disk))
+        f2.insert( ATR(name='atr', period=10) )
+        self.assertEqual( f2.indicator_cache().disk_hits(), 1 )
+
+        # a limit of two entries evicts the least recently used (sma) once
+        # a third is stored
+        small = DiskIndicatorCache(self._cachedir, maxbytes=2 * entry)
+        f3 = Feed(Instrument('AC', self._datafile), indcache=IndicatorCache(disk=small))
+        f3.insert( ATR(name='atr20', period=20) )
+        self.assertEqual( len(os.listdir(self._cachedir)), 2 )
+        self.assertEqual( small.size(), 2 * entry )
+        f4 = self.feed(DiskIndicatorCache(self._cachedir))
+        self.assertEqual( (f4.indicator_cache().disk_hits(), f4.indicator_cache().misses()), (1, 1) )
+
+    def testDigests(self):
+        disk = DiskIndicatorCache(self._cachedir, maxdigests=2)
+        a = numpy.arange(10.0)
+        b = numpy.arange(10.0)
+        c = numpy.arange(11.0)
+        key = (ATR, (10,))
+        self.assertEqual( disk.cachefile(key, [a]), disk.cachefile(key, [b]) )
+        self.assertNotEqual( disk.cachefile(key, [a]), disk.cachefile(key, [c]) )
+        # only the two most recently used series are kept
+        self.assertEqual( [entry[0] is c for entry in disk._digests.values()], [False, True] )
+        self.assertEqual( len(disk._digests), 2 )
+
+        # an entry whose id now belongs to another series is not used
+        d = numpy.arange(12.0)
+        disk._digests[id(d)] = (c, disk._digests[id(c)][1])
+        self.assertNotEqual( disk.cachefile(key, [d]), disk.cachefile(key, [c]) )
+        self.assertTrue( disk._digests[id(d)][0] is d )
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -5,6 +5,7 @@ Created on Jan 21, 2013
 '''
 import unittest
 import os
+import datetime
 from hedgeit.feeds.instrument import Instrument
 
 class Test(unittest.TestCase):
@@ -52,6 +53,36 @@ class Test(unittest.TestCase):
         i.load_data()
         self.assertAlmostEqual( i.bars()[0].close(), 1001.75 )
 
+    def testColumns(self):
+        datafile = '%s/data/AC___CCB.csv' % os.path.dirname(__file__)
+
+        i = Instrument('AC',datafile)
+        self.assertFalse( i.is_loaded() )
+        cols = i.columns()
+        self.assertTrue( i.is_loaded() )
+        self.assertTrue( i.columns() is cols )
+        self.assertEqual( len(cols['Date']), 252 )
+        self.assertEqual( i.datetimes()[251], datetime.datetime(2013,1,18,0,0) )
+        self.assertAlmostEqual( cols['Open'][251], 2.35 )
+        self.assertAlmostEqual( cols['High'][0], 2.227 )
+        self.assertAlmostEqual( cols['Volume'][0], 213 )
+        self.assertAlmostEqual( cols['Open Interest'][0], 538 )
+
+        # loading a second time must not accumulate bars
+        i.load_data()
+        self.assertEqual( len(i.columns()['Date']), 252 )
+        self.assertEqual( len(i.bars()), 252 )
+
+    def testColumnsAltDate(self):
+        datafile = '%s/data/S2___CCB.csv' % os.path.dirname(__file__)
+
+        i = Instrument('S2',datafile)
+        i.load_data()
+        self.assertEqual( i.datetimes()[0], datetime.datetime(1980,1,2,0,0) )
+        self.assertEqual( i.datetimes()[1], datetime.datetime(1980,1,3,0,0) )
+        self.assertAlmostEqual( i.columns()['Close'][0], 1001.75 )
+        self.assertAlmostEqual( i.columns()['Open Interest'][1], 40874 )
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testBasic']
     unittest.main()
\ No newline at end of file
@@ -6,24 +6,28 @@ Created on Apr 22, 2013
 import unittest
 
 import os
+import shutil
+import tempfile
 from hedgeit.feeds.db import InstrumentDb
+from hedgeit.feeds.feed import Feed
 
 class Test(unittest.TestCase):
 
 
     def setUp(self):
-        pass
+        # parsed datafiles are cached here rather than next to the manifest
+        self._cachedir = tempfile.mkdtemp()
 
 
     def tearDown(self):
-        pass
+        shutil.rmtree(self._cachedir)
 
 
     def testBasic(self):
         manifest = '%s/data/manifest.csv' % os.path.dirname(__file__)
         
         idb = InstrumentDb.Instance()
-        idb.load(manifest)
+        idb.load(manifest, cache=self._cachedir)
         self.assertEqual(idb.get_symbols(), ['AC', 'C', 'CT', 'LB', 'LC', 'LH', 'O', 'RR'])
         self.assertEqual(idb.get('CT').point_value(), 50)
         self.assertEqual(idb.get('C').currency(), 'USD')
@@ -33,6 +37,28 @@ class Test(unittest.TestCase):
         self.assertEqual(idb.get('LH').maint_margin(), 1050.0)
         self.assertEqual(idb.get('O').sector(), 'Agricultural')
 
+    def testLazy(self):
+        manifest = '%s/data/manifest.csv' % os.path.dirname(__file__)
+        
+        idb = InstrumentDb.Instance()
+        idb.load(manifest, cache=self._cachedir)
+        # nothing should be loaded until first use
+        for sym in idb.get_symbols():
+            self.assertFalse(idb.get(sym).is_loaded())
+
+        # two feeds for the same instrument share one load
+        f1 = Feed(idb.get('LC'))
+        f2 = Feed(idb.get('LC'))
+        self.assertEqual(f1.len(), f2.len())
+        self.assertTrue(f1.get_series('Close') is f2.get_series('Close'))
+        self.assertFalse(idb.get('LH').is_loaded())
+
+        idb.preload(['C','CT','LH'], workers=2)
+        for sym in idb.get_symbols():
+            self.assertEqual(idb.get(sym).is_loaded(), sym in ['C','CT','LC','LH'])
+        self.assertEqual(len(idb.get('LH').columns()['Close']), Feed(idb.get('LH')).len())
+        self.assertTrue(len(os.listdir(self._cachedir)) > 0)
+
 
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
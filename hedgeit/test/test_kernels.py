@@ -0,0 +1,189 @@
+'''
+Created on Oct 18, 2026
+
+@author: rtw
+'''
+import unittest
+import os
+import numpy
+try:
+    import talib
+except ImportError:
+    talib = None
+from hedgeit.feeds.feed import Feed
+from hedgeit.feeds.instrument import Instrument
+from hedgeit.feeds.indicators import kernels
+
+def loop_sum(series, period, partial=False):
+    ret = numpy.zeros(len(series))
+    for i in range(0, len(series)):
+        if i < period - 1 and not partial:
+            ret[i] = numpy.nan
+        else:
+            ret[i] = sum(series[max(0, i-period+1):i+1])
+    return ret
+
+def loop_reduce(func, series, period):
+    ret = numpy.zeros(len(series))
+    for i in range(0, len(series)):
+        if i < period - 1:
+            ret[i] = numpy.nan
+        else:
+            ret[i] = func(series[i-period+1:i+1])
+    return ret
+
+class Test(unittest.TestCase):
+
+
+    def setUp(self):
+        datafile = '%s/data/LC___CCB.csv' % os.path.dirname(__file__)
+        self._feed = Feed(Instrument('LC',datafile))
+        self._close = self._feed.get_series('Close')
+
+    def tearDown(self):
+        pass
+
+    def assertSeriesEqual(self, expected, actual):
+        self.assertEqual(len(expected), len(actual))
+        self.assertTrue(numpy.array_equal(numpy.isnan(expected), numpy.isnan(actual)))
+        mask = ~numpy.isnan(expected)
+        self.assertTrue(numpy.allclose(expected[mask], actual[mask], rtol=1e-12, atol=1e-9))
+
+    def testSlidingWindow(self):
+        w = kernels.sliding_window(self._close, 5)
+        self.assertEqual(w.shape, (len(self._close) - 4, 5))
+        self.assertTrue(numpy.array_equal(w[10], self._close[10:15]))
+        self.assertTrue(numpy.may_share_memory(w, self._close))
+        self.assertEqual(kernels.sliding_window(self._close[:3], 5).shape, (0, 5))
+        with self.assertRaises(ValueError):
+            w[0,0] = 1.0
+
+    def testRollingSum(self):
+        for period in [1, 2, 10, 100]:
+            self.assertSeriesEqual(loop_sum(self._close, period), kernels.rolling_sum(self._close, period))
+            self.assertSeriesEqual(loop_sum(self._close, period, partial=True),
+                                   kernels.rolling_sum(self._close, period, partial=True))
+            self.assertSeriesEqual(loop_sum(self._close, period) / period, kernels.rolling_mean(self._close, period))
+        # shorter than the window
+        self.assertTrue(numpy.isnan(kernels.rolling_sum(self._close[:5], 10)).all())
+        self.assertTrue(numpy.isnan(kernels.rolling_sum(self._close[:5], 50)).all())
+        self.assertSeriesEqual(numpy.cumsum(self._close[:5]), kernels.rolling_sum(self._close[:5], 50, partial=True))
+
+    def testRunningSum(self):
+        # exactly the loop that adds each value and then subtracts the one
+        # leaving the window
+        for period in [1, 3, 33, 100, len(self._close) + 5]:
+            expected = numpy.zeros(len(self._close))
+            total = 0.0
+            for i in range(0, len(self._close)):
+                total += self._close[i]
+                if i >= period:
+                    total -= self._close[i-period]
+                expected[i] = total
+            self.assertTrue(numpy.array_equal(expected, kernels.running_sum(self._close, period)))
+        self.assertEqual(kernels.running_sum(self._close[:0], 5).shape, (0,))
+
+    def testRollingMaxMin(self):
+        for period in [1, 3, 55]:
+            self.assertSeriesEqual(loop_reduce(max, self._close, period), kernels.rolling_max(self._close, period))
+            self.assertSeriesEqual(loop_reduce(min, self._close, period), kernels.rolling_min(self._close, period))
+
+    def testTrueRange(self):
+        high = self._feed.get_series('High')
+        low = self._feed.get_series('Low')
+        tr = kernels.true_range(high, low, self._close)
+        self.assertEqual(tr[0], high[0] - low[0])
+        for i in range(1, len(tr)):
+            self.assertEqual(tr[i], max(self._close[i-1], high[i]) - min(self._close[i-1], low[i]))
+
+    def testNan(self):
+        series = self._close.copy()
+        series[:20] = numpy.nan
+        series[100] = numpy.nan
+        for period in [3, 40]:
+            ret = kernels.rolling_sum(series, period)
+            self.assertTrue(numpy.isnan(ret[:20+period-1]).all())
+            self.assertTrue(numpy.isnan(ret[100:100+period]).all())
+            self.assertSeriesEqual(loop_sum(self._close, period)[100+period:], ret[100+period:])
+
+    def testLinRegress(self):
+        series = self._close.copy()
+        series[:10] = numpy.nan
+        for period in [2, 5, 60]:
+            slope, intercept, r2 = kernels.rolling_linregress(series, period)
+            x = numpy.arange(period)
+            for i in range(0, len(series)):
+                if i < 10 + period - 1:
+                    self.assertTrue(numpy.isnan(slope[i]))
+                    self.assertTrue(numpy.isnan(intercept[i]))
+                    continue
+                y = series[i-period+1:i+1]
+                m, c = numpy.polyfit(x, y, 1)
+                self.assertAlmostEqual(slope[i], m, places=10)
+                self.assertAlmostEqual(intercept[i], c, places=8)
+                if period > 2 and y.std() > 0:
+                    self.assertAlmostEqual(r2[i], numpy.corrcoef(x, y)[0,1] ** 2, places=8)
+        # a perfect line
+        slope, intercept, r2 = kernels.rolling_linregress(numpy.arange(50) * 0.5 + 3.0, 10)
+        self.assertAlmostEqual(slope[-1], 0.5, places=12)
+        self.assertAlmostEqual(intercept[-1], 3.0 + 40 * 0.5, places=10)
+        self.assertAlmostEqual(r2[-1], 1.0, places=12)
+        with self.assertRaisesRegexp(Exception, 'Invalid regression period'):
+            kernels.rolling_linregress(self._close, 1)
+
+    def testMulti(self):
+        periods = [2, 3, 13, 14, 32, 50, 100, 251, 300]
+        for (multi, func, name) in [(kernels.multi_max, kernels.rolling_max, 'MAX'),
+                                    (kernels.multi_min, kernels.rolling_min, 'MIN')]:
+            rows = multi(self._close, periods)
+            self.assertEqual(rows.shape, (len(periods), len(self._close)))
+            for k in range(0, len(periods)):
+                # identical to the single period calculation, and to TA-Lib
+                expected = [func(self._close, periods[k])]
+                if talib != None:
+                    expected.append(getattr(talib, name)(self._close, periods[k]))
+                for e in expected:
+                    self.assertTrue(numpy.array_equal(numpy.isnan(e), numpy.isnan(rows[k])))
+                    mask = ~numpy.isnan(e)
+                    self.assertTrue(numpy.array_equal(e[mask], rows[k][mask]))
+        self.assertEqual(kernels.multi_max(self._close, []).shape, (0, len(self._close)))
+        with self.assertRaisesRegexp(Exception, 'Invalid window period'):
+            kernels.multi_max(self._close, [5, 0])
+
+    def testColumns(self):
+        # columns of different lengths (NAN padded) give exactly the 1-d
+        # results for each column
+        cols = [self._close, self._close[50:], self._close[:20].copy()]
+        cols[2][3] = numpy.nan
+        panel = numpy.empty((len(self._close), len(cols)))
+        panel.fill(numpy.nan)
+        for (j, c) in enumerate(cols):
+            panel[:len(c), j] = c
+        for period in [2, 3, 32, 33, 100]:
+            for func in [lambda s: kernels.rolling_sum(s, period, partial=True),
+                         lambda s: kernels.rolling_mean(s, period),
+                         lambda s: kernels.rolling_max(s, period),
+                         lambda s: kernels.rolling_min(s, period),
+                         lambda s: kernels.sma(s, period),
+                         lambda s: kernels.rolling_linregress(s, period)[0],
+                         lambda s: kernels.rolling_linregress(s, period)[1],
+                         lambda s: kernels.rolling_linregress(s, period)[2]]:
+                result = func(panel)
+                for (j, c) in enumerate(cols):
+                    expected = func(c)
+                    actual = result[:len(c), j]
+                    self.assertTrue(numpy.array_equal(numpy.isnan(expected), numpy.isnan(actual)))
+                    mask = ~numpy.isnan(expected)
+                    self.assertTrue(numpy.array_equal(expected[mask], actual[mask]))
+            if talib != None:
+                expected = talib.SMA(self._close, period)
+                mask = ~numpy.isnan(expected)
+                self.assertTrue(numpy.array_equal(expected[mask], kernels.sma(self._close, period)[mask]))
+
+    def testBadPeriod(self):
+        with self.assertRaisesRegexp(Exception, 'Invalid window period'):
+            kernels.rolling_sum(self._close, 0)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
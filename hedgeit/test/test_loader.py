@@ -0,0 +1,81 @@
+'''
+Created on Oct 18, 2026
+
+@author: rtw
+'''
+import unittest
+import glob
+import os
+import shutil
+import tempfile
+import numpy
+from multiprocessing import Pool
+from hedgeit.feeds.cache import ColumnCache
+from hedgeit.feeds.instrument import Instrument
+from hedgeit.feeds.loader import read_columns, load_columns, load_instruments
+
+def _load_in_worker(datafiles):
+    return load_columns(datafiles, workers=3)
+
+class Test(unittest.TestCase):
+
+
+    def setUp(self):
+        self._datafiles = sorted(glob.glob('%s/data/*.csv' % os.path.dirname(__file__)))
+        self._datafiles = [f for f in self._datafiles if os.path.basename(f).find('manifest') == -1]
+        self._tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+    def assertSameColumns(self, expected, actual):
+        self.assertEqual(len(expected), len(actual))
+        for i in range(0, len(expected)):
+            self.assertEqual(sorted(expected[i].keys()), sorted(actual[i].keys()))
+            for name in expected[i]:
+                self.assertEqual(expected[i][name].dtype, actual[i][name].dtype)
+                self.assertTrue(numpy.array_equal(expected[i][name], actual[i][name]))
+
+    def testParallelMatchesSequential(self):
+        seq = [read_columns(f) for f in self._datafiles]
+        self.assertSameColumns(seq, load_columns(self._datafiles, workers=1))
+        self.assertSameColumns(seq, load_columns(self._datafiles, workers=3))
+        self.assertSameColumns(seq, load_columns(self._datafiles, workers=3, processes=False))
+
+    def testDaemonWorker(self):
+        # a pool worker can't start processes of its own, so loads in-process
+        seq = [read_columns(f) for f in self._datafiles]
+        pool = Pool(1)
+        try:
+            self.assertSameColumns(seq, pool.apply(_load_in_worker, (self._datafiles,)))
+        finally:
+            pool.close()
+            pool.join()
+
+    def testCached(self):
+        seq = [read_columns(f) for f in self._datafiles]
+        caches = [ColumnCache(self._tmpdir)] * len(self._datafiles)
+        # first pass builds the cache in the workers, second pass is all hits
+        self.assertSameColumns(seq, load_columns(self._datafiles, workers=2, caches=caches))
+        self.assertEqual(len(glob.glob('%s/*.npy' % self._tmpdir)), len(self._datafiles))
+        self.assertSameColumns(seq, load_columns(self._datafiles, workers=2, caches=caches))
+
+    def testMissing(self):
+        files = [self._datafiles[0], '%s/nosuchfile.csv' % self._tmpdir]
+        ret = load_columns(files, workers=2)
+        self.assertNotEqual(ret[0], None)
+        self.assertEqual(ret[1], None)
+
+    def testInstruments(self):
+        insts = [Instrument('I%d' % i, self._datafiles[i]) for i in range(0, len(self._datafiles))]
+        insts[0].columns()
+        loaded = insts[0].columns()
+        load_instruments(insts, workers=2)
+        self.assertTrue(insts[0].columns() is loaded)
+        for i in insts:
+            self.assertTrue(i.is_loaded())
+            self.assertTrue(numpy.array_equal(i.columns()['Close'], read_columns(i.datafile())['Close']))
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -17,6 +17,8 @@ import datetime
 import test_util
 
 import os
+import shutil
+import tempfile
 
 class Test(unittest.TestCase):
 
@@ -24,7 +26,8 @@ class Test(unittest.TestCase):
     def setUp(self):
         manifest = '%s/data/manifest1.csv' % os.path.dirname(__file__)        
         self._db = InstrumentDb.Instance()
-        self._db.load(manifest)
+        self._cachedir = tempfile.mkdtemp()
+        self._db.load(manifest, cache=self._cachedir)
         
     def setupFeed(self, barFeed):
         barFeed.register_feed(Feed(self._db.get('RR')))
@@ -32,7 +35,7 @@ class Test(unittest.TestCase):
         barFeed.register_feed(Feed(self._db.get('O')))
 
     def tearDown(self):
-        pass
+        shutil.rmtree(self._cachedir)
 
 
     def testMacross(self):
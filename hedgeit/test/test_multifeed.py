@@ -125,6 +125,31 @@ class Test(unittest.TestCase):
         mf.start(first=datetime.datetime(2012,7,1),last=datetime.datetime(2013,7,31))
         self.assertEqual(self._count, 143)
 
+    def testCalendar(self):
+        f1 = Feed(self._inst1)
+        f2 = Feed(self._inst2)
+        mf = MultiFeed()
+        mf.register_feed(f1)
+        mf.set_cursor(datetime.datetime(2012,7,1))
+        self.assertEqual(mf.get_next_bars_date(), datetime.datetime(2012,7,2))
+
+        # registering a new feed rebuilds the calendar from the feed cursors
+        mf.register_feed(f2)
+        self.assertEqual(mf.get_next_bars_date(), datetime.datetime(2012,1,23))
+        
+        dates = []
+        mf.subscribe(lambda bars: dates.append(bars.datetime()))
+        mf.set_cursor()
+        mf.start()
+        self.assertEqual(dates, sorted(set(f1.get_series('Datetime')) | set(f2.get_series('Datetime'))))
+        self.assertEqual(mf.get_next_bars_date(), None)
+
+        mf.set_cursor(datetime.datetime(2012,7,4))
+        self.assertEqual(mf.get_next_bars_date(), datetime.datetime(2012,7,4))
+        self.assertEqual(mf.get_current_bars().datetime(), dates[-1])
+        mf.set_cursor(datetime.datetime(2013,7,4))
+        self.assertEqual(mf.get_next_bars_date(), None)
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,108 @@
+'''
+Created on Oct 18, 2026
+
+@author: rtw
+'''
+import unittest
+import os
+import numpy
+from hedgeit.feeds.feed import Feed
+from hedgeit.feeds.indcache import IndicatorCache
+from hedgeit.feeds.instrument import Instrument
+from hedgeit.feeds.multifeed import MultiFeed
+from hedgeit.feeds.panel import Panel
+from hedgeit.feeds.indicators.atr import ATR
+from hedgeit.feeds.indicators.cum import CUM
+from hedgeit.feeds.indicators.pvelocity import PriceVelocity
+from hedgeit.feeds.indicators import talibfunc
+
+class Test(unittest.TestCase):
+
+
+    def setUp(self):
+        # different lengths and calendars
+        self._files = [('AC', 'AC___CCB.csv'), ('ACM', 'ACM__CCB.csv'),
+                       ('AC10', 'AC___CCB-10d.csv'), ('LC', 'LC___CCB.csv')]
+
+    def tearDown(self):
+        pass
+
+    def multifeed(self, cache):
+        ret = MultiFeed()
+        for (sym, name) in self._files:
+            datafile = '%s/data/%s' % (os.path.dirname(__file__), name)
+            ret.register_feed(Feed(Instrument(sym, datafile), indcache=cache))
+        return ret
+
+    def assertIdentical(self, expected, actual):
+        # bit for bit, apart from NAN
+        self.assertEqual(len(expected), len(actual))
+        self.assertTrue(numpy.array_equal(numpy.isnan(expected), numpy.isnan(actual)))
+        mask = ~numpy.isnan(expected)
+        self.assertTrue(numpy.array_equal(expected[mask], actual[mask]))
+
+    def testLayout(self):
+        mf = self.multifeed(IndicatorCache())
+        panel = Panel(mf)
+        self.assertEqual(panel.symbols(), ['AC', 'AC10', 'ACM', 'LC'])
+        self.assertEqual(panel.lengths(), [252, 10, 255, 252])
+        self.assertEqual(panel.get('Close').shape, (255, 4))
+        self.assertEqual(len(panel.dates()), 257)
+
+        mask = panel.mask()
+        values = panel.values('Close')
+        self.assertTrue(numpy.array_equal(numpy.isnan(values), ~mask))
+        for (j, sym) in enumerate(panel.symbols()):
+            feed = mf.get_feed(sym)
+            self.assertTrue(numpy.array_equal(panel.dates()[mask[:,j]], feed.dates()))
+            self.assertTrue(numpy.array_equal(values[mask[:,j],j], feed.get_series('Close')))
+            self.assertTrue(numpy.array_equal(panel.series('Close', sym), feed.get_series('Close')))
+
+        panel = Panel(mf, symbols=['LC', 'AC10'], names=['Close'])
+        self.assertEqual(panel.get('Close').shape, (252, 2))
+        self.assertRaises(Exception, panel.get, 'High')
+
+    def testInsert(self):
+        cache = IndicatorCache()
+        mf = self.multifeed(cache)
+        panel = Panel(mf)
+        panel.insert( ATR(name='atr', period=20) )
+        panel.insert( PriceVelocity(name='pvel', period=40, baseIndicator='Close') )
+        panel.insert( CUM(name='cum', period=5, baseIndicator='pvel') )
+        panel.insert( lambda feed: talibfunc.SMA('sma', feed, 50) )
+        panel.insert( lambda feed: talibfunc.MAX('max', feed, 30) )
+        panel.insert( lambda feed: talibfunc.MIN('min', feed, 30) )
+        # calculated for each feed
+        panel.insert( lambda feed: talibfunc.RSI('rsi', feed, 14) )
+        self.assertEqual(cache.misses(), 4)
+
+        # the feeds hold views of the panel and equivalent indicators in
+        # separately loaded feeds are identical
+        atr = panel.get('atr')
+        mf2 = self.multifeed(IndicatorCache())
+        for sym in panel.symbols():
+            feed = mf.get_feed(sym)
+            self.assertTrue(numpy.may_share_memory(feed.get_series('atr'), atr))
+            feed2 = mf2.get_feed(sym)
+            feed2.insert( ATR(name='atr', period=20) )
+            feed2.insert( PriceVelocity(name='pvel', period=40, baseIndicator='Close') )
+            feed2.insert( CUM(name='cum', period=5, baseIndicator='pvel') )
+            feed2.insert( talibfunc.SMA('sma', feed2, 50) )
+            feed2.insert( talibfunc.MAX('max', feed2, 30) )
+            feed2.insert( talibfunc.MIN('min', feed2, 30) )
+            feed2.insert( talibfunc.RSI('rsi', feed2, 14) )
+            for name in ['atr', 'pvel', 'cum', 'sma', 'max', 'min', 'rsi']:
+                self.assertIdentical(feed2.get_series(name), feed.get_series(name))
+                self.assertIdentical(feed2.get_series(name), panel.series(name, sym))
+
+        # a strategy inserting the same indicator reuses the panel's series
+        hits = cache.hits()
+        feed = mf.get_feed('LC')
+        feed.insert( ATR(name='atr2', period=20) )
+        self.assertEqual(cache.hits(), hits + 1)
+        self.assertTrue(feed.get_series('atr2') is feed.get_series('atr'))
+        self.assertRaises(Exception, panel.insert, ATR(name='atr', period=21))
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -19,6 +19,8 @@ import datetime
 import test_util
 
 import os
+import shutil
+import tempfile
 
 class Test(unittest.TestCase):
 
@@ -27,13 +29,14 @@ class Test(unittest.TestCase):
         # we are using a special data set that triggers a trade on the last bar
         manifest = '%s/data/manifest2.csv' % os.path.dirname(__file__)        
         self._db = InstrumentDb.Instance()
-        self._db.load(manifest)
+        self._cachedir = tempfile.mkdtemp()
+        self._db.load(manifest, cache=self._cachedir)
         
     def setupFeed(self, barFeed):
         barFeed.register_feed(Feed(self._db.get('RR')))
 
     def tearDown(self):
-        pass
+        shutil.rmtree(self._cachedir)
 
     def testControllerPosAlerts(self):
         plog = '%s/positions.csv' % os.path.dirname(__file__)
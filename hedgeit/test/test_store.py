@@ -0,0 +1,69 @@
+'''
+Created on Oct 18, 2026
+
+@author: rtw
+'''
+import unittest
+import os
+import shutil
+import tempfile
+import numpy
+from hedgeit.feeds.db import InstrumentDb
+from hedgeit.feeds.feed import Feed
+from hedgeit.feeds.multifeed import MultiFeed
+from hedgeit.feeds.store import FeedStore
+from hedgeit.feeds.indicators.atr import ATR
+
+class Test(unittest.TestCase):
+
+
+    def setUp(self):
+        manifest = '%s/data/manifest1.csv' % os.path.dirname(__file__)        
+        self._tmpdir = tempfile.mkdtemp()
+        InstrumentDb.Instance().load(manifest, cache=os.path.join(self._tmpdir, 'cache'))
+        self._store = FeedStore(self._tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+    def testAttach(self):
+        f = Feed(InstrumentDb.Instance().get('AC'))
+        f.insert( ATR(name='atr', period=10) )
+        self._store.write(f, indicators=True)
+        self.assertEqual(self._store.symbols(), ['AC'])
+        self.assertEqual(self._store.series_names('AC'), 
+                         ['Datetime','Open','High','Low','Close','Volume','atr'])
+
+        a = Feed(InstrumentDb.Instance().get('AC'), store=self._store)
+        self.assertEqual(a.len(), f.len())
+        self.assertEqual(a.get_series('Datetime'), f.get_series('Datetime'))
+        for name in ['Open','High','Low','Close','Volume']:
+            self.assertTrue(numpy.array_equal(a.get_series(name), f.get_series(name)))
+            self.assertFalse(a.get_series(name).flags.writeable)
+        self.assertTrue(numpy.allclose(a.get_series('atr'), f.get_series('atr'), equal_nan=True))
+        self.assertEqual(a.indicator_names(), ['atr'])
+
+        # bars from an attached feed carry the stored indicator
+        b = a.get_current_bar()
+        self.assertEqual(b.close(), f.get_current_bar().close())
+        self.assertTrue(numpy.isnan(b.atr()))
+
+        # we can still insert new indicators computed from the shared series
+        a.insert( ATR(name='atr20', period=20) )
+        f.insert( ATR(name='atr20', period=20) )
+        self.assertAlmostEqual(a.get_series('atr20')[251], f.get_series('atr20')[251])
+
+    def testMultiFeed(self):
+        for sym in ['AC','LC']:
+            self._store.write(Feed(InstrumentDb.Instance().get(sym)))
+        mf = MultiFeed(store=self._store)
+        self.assertEqual(sorted(mf.symbols()), ['AC','LC'])
+        self.assertEqual(mf.get_feed('LC').get_series('Close')[0], 
+                         Feed(InstrumentDb.Instance().get('LC')).get_series('Close')[0])
+
+        with self.assertRaisesRegexp(Exception,"does not have symbol"):
+            Feed(InstrumentDb.Instance().get('RR'), store=self._store)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
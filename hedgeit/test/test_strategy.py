@@ -16,6 +16,8 @@ from hedgeit.analyzer import trades
 from hedgeit.feeds.db import InstrumentDb
 
 import os
+import shutil
+import tempfile
 
 class MyStrategy(Strategy):
     def __init__(self, barFeed, cash = 1000000, broker_ = None):
@@ -42,12 +44,13 @@ class Test(unittest.TestCase):
     def setUp(self):
         manifest = '%s/data/manifest.csv' % os.path.dirname(__file__)        
         self._db = InstrumentDb.Instance()
-        self._db.load(manifest)
+        self._cachedir = tempfile.mkdtemp()
+        self._db.load(manifest, cache=self._cachedir)
         self._feed = Feed(self._db.get('AC'))
 
 
     def tearDown(self):
-        pass
+        shutil.rmtree(self._cachedir)
 
 
     def testBasic(self):
@@ -19,6 +19,8 @@ from hedgeit.feeds.db import InstrumentDb
 import numpy
 
 import os
+import shutil
+import tempfile
 
 class MyStrategy(Strategy):
     def __init__(self, barFeed, cash = 1000000, broker_ = None):
@@ -75,7 +77,8 @@ class Test(unittest.TestCase):
     def setUp(self):
         manifest = '%s/data/manifest1.csv' % os.path.dirname(__file__)        
         self._db = InstrumentDb.Instance()
-        self._db.load(manifest)
+        self._cachedir = tempfile.mkdtemp()
+        self._db.load(manifest, cache=self._cachedir)
         self._feed = Feed(self._db.get('AC'))
         self._feed.insert( talibfunc.SMA('SMA50',self._feed,50) )
         self._feed.insert( talibfunc.SMA('SMA100',self._feed,100) )
@@ -85,7 +88,7 @@ class Test(unittest.TestCase):
 
 
     def tearDown(self):
-        pass
+        shutil.rmtree(self._cachedir)
 
 
     def testBasic(self):
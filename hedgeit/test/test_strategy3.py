@@ -20,6 +20,8 @@ import numpy
 import test_util
 
 import os
+import shutil
+import tempfile
 
 class MyStrategy(Strategy):
     def __init__(self, barFeed, cash = 1000000):
@@ -75,11 +77,14 @@ class MyStrategy(Strategy):
             if self._position.isLong():
                 if acbar.close() > self._tradeHigh:
                     self._tradeHigh = acbar.close()
-                self.exitPosition(self._position, stopPrice=self._tradeHigh-3*acbar.ATR10(), goodTillCanceled=True)
+                self.trailStop(self._tradeHigh-3*acbar.ATR10())
             else:
                 if acbar.close() < self._tradeLow:
                     self._tradeLow = acbar.close()
-                self.exitPosition(self._position, stopPrice=self._tradeLow+3*acbar.ATR10(), goodTillCanceled=True)
+                self.trailStop(self._tradeLow+3*acbar.ATR10())
+
+    def trailStop(self, stopPrice):
+        self.exitPosition(self._position, stopPrice=stopPrice, goodTillCanceled=True)
          
     def exitPositions(self):
         if self._position != None:
@@ -87,13 +92,24 @@ class MyStrategy(Strategy):
         self.getBroker().executeSessionClose()      
                 
             
+class AmendStrategy(MyStrategy):
+    def __init__(self, barFeed, cash = 1000000):
+        MyStrategy.__init__(self, barFeed, cash)
+        self.exitOrders = set()
+
+    def trailStop(self, stopPrice):
+        if not self._position.amendStop(stopPrice, goodTillCanceled=True):
+            MyStrategy.trailStop(self, stopPrice)
+        self.exitOrders.add(self._position.getExitOrder())
+
 class Test(unittest.TestCase):
 
 
     def setUp(self):
         manifest = '%s/data/manifest1.csv' % os.path.dirname(__file__)        
         self._db = InstrumentDb.Instance()
-        self._db.load(manifest)
+        self._cachedir = tempfile.mkdtemp()
+        self._db.load(manifest, cache=self._cachedir)
         self._feed = Feed(self._db.get('RR'))
         self._feed.insert( talibfunc.SMA('SMA50',self._feed,50) )
         self._feed.insert( talibfunc.SMA('SMA100',self._feed,100) )
@@ -103,7 +119,7 @@ class Test(unittest.TestCase):
 
 
     def tearDown(self):
-        pass
+        shutil.rmtree(self._cachedir)
 
 
     def testBasic(self):
@@ -135,6 +151,46 @@ class Test(unittest.TestCase):
         self.assertTrue(test_util.file_compare('%s/trade1.reflog' % os.path.dirname(__file__), tlog))
         os.remove(tlog)
 
+    def testAmendStop(self):
+        # trailing the stop in place gives the same trades with one exit 
+        # order per trade
+        mf = MultiFeed()
+        mf.register_feed(self._feed)
+        strat = AmendStrategy(mf)
+        tradesAnalyzer = trades.Trades()
+        strat.attachAnalyzer(tradesAnalyzer)
+        mf.start()
+        strat.exitPositions()
+
+        self.assertAlmostEqual(strat.getResult(),996193.19,places=2)
+        self.assertEqual(tradesAnalyzer.getCount(),2)
+        self.assertEqual(len(strat.exitOrders),2)
+        tlog = '%s/trade.log' % os.path.dirname(__file__)
+        tradesAnalyzer.writeTradeLog(tlog)
+        self.assertTrue(test_util.file_compare('%s/trade1.reflog' % os.path.dirname(__file__), tlog))
+        os.remove(tlog)
+
+    def testAmendStopModifiesOrder(self):
+        # every amendment, including goodTillCanceled, goes through the 
+        # broker so that it can requeue the order
+        mf = MultiFeed()
+        mf.register_feed(self._feed)
+        strat = AmendStrategy(mf)
+        modified = []
+        modifyOrder = strat.getBroker().modifyOrder
+        def spy(order, **kwargs):
+            modified.append((order, kwargs))
+            modifyOrder(order, **kwargs)
+        strat.getBroker().modifyOrder = spy
+        mf.start()
+        strat.exitPositions()
+
+        self.assertTrue(len(modified) > 0)
+        for (order, kwargs) in modified:
+            self.assertTrue(order in strat.exitOrders)
+            self.assertEqual(kwargs['goodTillCanceled'], True)
+            self.assertTrue(order.getGoodTillCanceled())
+
 
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testBasic']
@@ -0,0 +1,101 @@
+'''
+Created on Oct 18, 2026
+
+@author: rtw
+'''
+import unittest
+import os
+import numpy
+try:
+    import talib
+except ImportError:
+    talib = None
+from hedgeit.feeds.feed import Feed
+from hedgeit.feeds.instrument import Instrument
+from hedgeit.feeds.indicators import kernels
+from hedgeit.feeds.indicators import streaming
+
+class Test(unittest.TestCase):
+
+
+    def setUp(self):
+        datafile = '%s/data/LC___CCB.csv' % os.path.dirname(__file__)
+        feed = Feed(Instrument('LC',datafile))
+        self._high = feed.get_series('High')
+        self._low = feed.get_series('Low')
+        self._close = feed.get_series('Close')
+        self._nans = self._close.copy()
+        self._nans[:7] = numpy.nan
+        self._nans[60] = numpy.nan
+
+    def tearDown(self):
+        pass
+
+    def assertIdentical(self, expected, actual):
+        # bit for bit, apart from NAN
+        self.assertEqual(len(expected), len(actual))
+        self.assertTrue(numpy.array_equal(numpy.isnan(expected), numpy.isnan(actual)))
+        mask = ~numpy.isnan(expected)
+        self.assertTrue(numpy.array_equal(expected[mask], actual[mask]))
+
+    def checkStream(self, expected, make, series):
+        # prime with the first m values and stream the rest
+        for m in [0, 1, 5, 50, 150, len(series) - 1]:
+            state = make()
+            state.prime(series[:m])
+            actual = numpy.array([state.update(v) for v in series[m:]])
+            self.assertIdentical(expected[m:], actual)
+
+    def testRollingSum(self):
+        for period in [1, 3, 32, 33, 100]:
+            for partial in [False, True]:
+                for series in [self._close, self._nans]:
+                    self.checkStream(kernels.rolling_sum(series, period, partial=partial),
+                                     lambda: streaming.RollingSum(period, partial), series)
+
+    def testRunningSum(self):
+        for period in [1, 3, 32, 33, 100]:
+            self.checkStream(kernels.running_sum(self._close, period),
+                             lambda: streaming.RunningSum(period), self._close)
+
+    def testLinRegress(self):
+        for period in [2, 10, 32, 33, 60]:
+            for series in [self._close, self._nans]:
+                expected = kernels.rolling_linregress(series, period)
+                for k in range(0, 3):
+                    state = streaming.LinRegress(period)
+                    state.prime(series[:40])
+                    actual = numpy.array([state.update(v)[k] for v in series[40:]])
+                    self.assertIdentical(expected[k][40:], actual)
+
+    def testTrueRange(self):
+        expected = kernels.true_range(self._high, self._low, self._close)
+        for m in [0, 1, 100]:
+            state = streaming.TrueRange()
+            state.prime(self._high[:m], self._low[:m], self._close[:m])
+            actual = numpy.array([state.update(self._high[i], self._low[i], self._close[i])
+                                  for i in range(m, len(self._close))])
+            self.assertIdentical(expected[m:], actual)
+
+    def checkFuncs(self, sma, max_, min_, rsi):
+        for period in [2, 3, 13, 14, 33, 50, 100]:
+            self.checkStream(sma(self._close, period), lambda: streaming.SMA(period), self._close)
+            self.checkStream(max_(self._close, period), lambda: streaming.MAX(period), self._close)
+            self.checkStream(min_(self._close, period), lambda: streaming.MIN(period), self._close)
+            self.checkStream(rsi(self._close, period), lambda: streaming.RSI(period), self._close)
+        # no movement, so the gains and losses decay towards 0
+        flat = numpy.ones(1200)
+        flat[:5] = [1.0, 2.0, 1.5, 1.7, 1.0]
+        for period in [2, 3, 14]:
+            self.checkStream(rsi(flat, period), lambda: streaming.RSI(period), flat)
+
+    def testKernels(self):
+        self.checkFuncs(kernels.sma, kernels.rolling_max, kernels.rolling_min, kernels.rsi)
+
+    @unittest.skipIf(talib == None, 'TA-Lib is not installed')
+    def testTalib(self):
+        self.checkFuncs(talib.SMA, talib.MAX, talib.MIN, talib.RSI)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
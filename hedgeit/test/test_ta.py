@@ -0,0 +1,98 @@
+'''
+Created on Oct 18, 2026
+
+@author: rtw
+'''
+import unittest
+import os
+import numpy
+from hedgeit.feeds.feed import Feed
+from hedgeit.feeds.instrument import Instrument
+from hedgeit.feeds.indicators import ta
+from hedgeit.feeds.indicators import talibfunc
+try:
+    import talib
+except ImportError:
+    talib = None
+
+class Test(unittest.TestCase):
+
+
+    def setUp(self):
+        datafile = '%s/data/LC___CCB.csv' % os.path.dirname(__file__)
+        self._inst = Instrument('LC',datafile)
+        feed = Feed(self._inst)
+        self._high = feed.get_series('High')
+        self._low = feed.get_series('Low')
+        self._close = feed.get_series('Close')
+        # a long flat stretch, where the RSI gains and losses decay to 0
+        self._flat = self._close.copy()
+        self._flat[100:] = self._flat[100]
+
+    def tearDown(self):
+        ta.set_backend(None)
+
+    def assertIdentical(self, expected, actual):
+        # bit for bit, apart from NAN
+        self.assertEqual(len(expected), len(actual))
+        self.assertTrue(numpy.array_equal(numpy.isnan(expected), numpy.isnan(actual)))
+        mask = ~numpy.isnan(expected)
+        self.assertTrue(numpy.array_equal(expected[mask], actual[mask]))
+
+    def calc(self, backend, func, *args):
+        ta.set_backend(backend)
+        return func(*args)
+
+    def testBackend(self):
+        ta.set_backend('numpy')
+        self.assertEqual(ta.backend(), 'numpy')
+        with self.assertRaisesRegexp(Exception, 'Unknown indicator backend'):
+            ta.set_backend('fortran')
+        ta.set_backend(None)
+        self.assertEqual(ta.backend(), 'numpy' if talib == None else 'talib')
+
+    def testNumpy(self):
+        ta.set_backend('numpy')
+        sma = ta.SMA(self._close, 10)
+        self.assertTrue(numpy.isnan(sma[8]))
+        self.assertAlmostEqual(sma[9], self._close[:10].mean(), places=10)
+        self.assertEqual(ta.MAX(self._close, 20)[100], self._close[81:101].max())
+        self.assertEqual(ta.MIN(self._close, 20)[100], self._close[81:101].min())
+        rsi = ta.RSI(self._flat, 14)
+        self.assertTrue(numpy.isnan(rsi[13]))
+        self.assertTrue(((rsi[14:] >= 0.0) & (rsi[14:] <= 100.0)).all())
+        # no movement at all
+        self.assertTrue((ta.RSI(numpy.ones(20), 14)[14:] == 0.0).all())
+        atr = ta.ATR(self._high, self._low, self._close, 14)
+        self.assertTrue(numpy.isnan(atr[13]))
+        self.assertFalse(numpy.isnan(atr[14:]).any())
+
+    @unittest.skipIf(talib == None, 'TA-Lib is not installed')
+    def testParity(self):
+        for period in [2, 3, 13, 14, 33, 50, 100]:
+            for series in [self._close, self._flat]:
+                for func in [ta.SMA, ta.MAX, ta.MIN, ta.RSI]:
+                    self.assertIdentical(self.calc('talib', func, series, period),
+                                         self.calc('numpy', func, series, period))
+            # TA-Lib smooths ATR with a fused multiply-add
+            expected = self.calc('talib', ta.ATR, self._high, self._low, self._close, period)
+            actual = self.calc('numpy', ta.ATR, self._high, self._low, self._close, period)
+            self.assertTrue(numpy.array_equal(numpy.isnan(expected), numpy.isnan(actual)))
+            mask = ~numpy.isnan(expected)
+            self.assertTrue(numpy.allclose(expected[mask], actual[mask], rtol=1e-12, atol=0))
+
+    @unittest.skipIf(talib == None, 'TA-Lib is not installed')
+    def testTalibFunc(self):
+        feeds = {}
+        for backend in ['talib', 'numpy']:
+            ta.set_backend(backend)
+            feed = Feed(self._inst)
+            feed.insert( talibfunc.SMA('sma', feed, 20) )
+            feed.insert( talibfunc.RSI('rsi', feed, 14) )
+            feeds[backend] = feed
+        for name in ['sma', 'rsi']:
+            self.assertIdentical(feeds['talib'].get_series(name), feeds['numpy'].get_series(name))
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()